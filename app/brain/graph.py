@@ -1,15 +1,14 @@
-from langgraph.graph import END, START, StateGraph
-
 from app.brain.nodes import call_model_node, check_message_node
 from app.brain.state import BotState
+from app.workflows.direct_graph import END, START, new_state_graph
 
 
 def _route_after_check(state: BotState) -> str:
     return "call_model" if state.get("should_reply") else "end"
 
 
-def build_graph():
-    graph = StateGraph(BotState)
+def build_graph(engine: str | None = None):
+    graph = new_state_graph(BotState, engine)
 
     graph.add_node("check_message", check_message_node)
     graph.add_node("call_model", call_model_node)
@@ -1,16 +1,9 @@
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+import time
 
 from app.brain.state import BotState
 from app.config import settings
-
-
-_llm = ChatOpenAI(
-    api_key=settings.llm_api_key,
-    model=settings.llm_model,
-    base_url=settings.llm_base_url,
-    temperature=0.2,
-)
+from app.llm import get_llm
+from app.observability import metrics, tracing
 
 
 def check_message_node(state: BotState) -> BotState:
@@ -28,6 +21,8 @@ def check_message_node(state: BotState) -> BotState:
 
 
 def call_model_node(state: BotState) -> BotState:
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
     history = state.get("messages", [])
 
     chat_messages = [SystemMessage(content=settings.llm_system_prompt)]
@@ -41,6 +36,19 @@ def call_model_node(state: BotState) -> BotState:
 
     chat_messages.append(HumanMessage(content=state.get("incoming_text", "")))
 
-    response = _llm.invoke(chat_messages)
+    model = settings.llm_model
+    started = time.perf_counter()
+    try:
+        with tracing.span("llm", model=model):
+            response = get_llm().invoke(chat_messages)
+    except Exception:
+        metrics.LLM_ERRORS.inc(model)
+        raise
+    finally:
+        metrics.LLM_LATENCY.observe(time.perf_counter() - started, model)
+    usage = getattr(response, "usage_metadata", None) or {}
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            metrics.LLM_TOKENS.inc(model, kind.removesuffix("_tokens"), amount=usage[kind])
     state["reply_text"] = str(response.content)
     return state
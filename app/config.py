@@ -11,6 +11,17 @@ class Settings(BaseSettings):
     seatalk_group_message_path: str = "/messaging/v2/group_chat"
     seatalk_single_message_path: str = "/messaging/v2/single_chat"
     seatalk_group_typing_path: str = "/messaging/v2/group_chat_typing"
+    # Group broadcasts: parallel sends, an overall send rate cap (0 = none) and retries
+    # for throttled/5xx responses.
+    seatalk_broadcast_concurrency: int = 8
+    seatalk_broadcast_rate_per_s: float = 0.0
+    seatalk_broadcast_max_retries: int = 3
+    # Outbound images larger than the target (or than max_side px) are downscaled and
+    # recompressed; results are cached by content hash.
+    seatalk_image_optimize: bool = True
+    seatalk_image_target_bytes: int = 1_000_000
+    seatalk_image_max_side: int = 2048
+    seatalk_image_cache_size: int = 32
 
     llm_api_key: str = ""
     llm_model: str = "gpt-4o-mini"
@@ -23,8 +34,48 @@ class Settings(BaseSettings):
     bot_send_group_welcome: bool = True
     bot_send_user_welcome: bool = True
     bot_send_typing_status: bool = True
+    workflow_graph_engine: str = "direct"
     webhook_worker_count: int = 2
+    webhook_autoscale: bool = True
+    webhook_min_workers: int = 1
+    webhook_max_workers: int = 8
+    webhook_scale_interval_s: float = 2.0
+    webhook_scale_target_wait_s: float = 1.0
+    webhook_scale_up_after: int = 2
+    webhook_scale_down_after: int = 15
     webhook_queue_maxsize: int = 1000
+    webhook_queue_backend: str = "memory"
+    webhook_queue_sqlite_path: str = "data/webhook_queue.sqlite3"
+    webhook_queue_url: str = ""
+    webhook_queue_token: str = ""
+    webhook_queue_group: str = "seatalk-bot"
+    webhook_queue_visibility_timeout_s: float = 300.0
+    webhook_queue_max_attempts: int = 5
+    webhook_queue_dedup_window_s: float = 600.0
+    webhook_queue_poll_interval_s: float = 0.2
+    webhook_drain_timeout_s: float = 20.0
+    # Extra time for events already running when the drain deadline passes.
+    webhook_drain_grace_s: float = 10.0
+    webhook_spool_path: str = "data/webhook_spool.jsonl"
+    callback_batch_token: str = ""
+    callback_batch_max_events: int = 500
+    callback_batch_max_bytes: int = 8_000_000
+    backlogs_webhook_token: str = ""
+    backlogs_stream_max_bytes: int = 2_000_000_000
+    # Threads for long background jobs such as backlog imports. Imports all write the
+    # same sheet, so more than one only helps when other job kinds are added.
+    background_job_workers: int = 1
+    # Poll the Drive changes feed for new exports every N seconds (0 = disabled).
+    backlogs_drive_watch_interval_s: float = 0.0
+    backlogs_drive_watch_state_path: str = "data/backlogs_drive_watch.json"
+    # Failed imports of one export before the watcher logs it and moves past it.
+    backlogs_drive_watch_max_attempts: int = 3
+    startup_warmup: bool = False
+    admin_token: str = ""
+    trace_enabled: bool = True
+    trace_buffer_size: int = 200
+    trace_export: str = ""
+    trace_slow_threshold_ms: float = 0.0
     log_level: str = "INFO"
 
 
@@ -0,0 +1,27 @@
+import threading
+from typing import Any
+
+from app.config import settings
+
+_llm: Any = None
+_llm_lock = threading.Lock()
+
+
+def get_llm() -> Any:
+    """The chat model shared by the chat workflow and the brain graph.
+
+    Built on first use so importing the app doesn't pull in langchain_openai.
+    """
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                from langchain_openai import ChatOpenAI
+
+                _llm = ChatOpenAI(
+                    api_key=settings.llm_api_key,
+                    model=settings.llm_model,
+                    base_url=settings.llm_base_url,
+                    temperature=0.2,
+                )
+    return _llm
@@ -1,12 +1,25 @@
+import asyncio
+import hmac
+import json
 import logging
+import os
+import sys
+import time
 from contextlib import asynccontextmanager
 from typing import Any
 
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 
 from app.config import settings
+from app.observability import profiling, tracing
+from app.observability.metrics import registry as metrics_registry
 from app.processing.async_webhook import AsyncWebhookProcessor
+from app.processing.autoscale import ScalingPolicy
+from app.processing.ingest import ChunkPipe, PayloadTooLarge, decode_body, iter_stream_records, parse_event_batch
+from app.processing.jobs import SUCCEEDED, get_job_executor
+from app.processing.queue_backends import FULL, build_queue_backend
+from app.processing.spool import EventSpool
 from app.seatalk.auth import SeaTalkAuthManager
 from app.seatalk.client import SeaTalkClient
 from app.seatalk.event_types import EVENT_VERIFICATION
@@ -22,30 +35,275 @@ webhook_processor = AsyncWebhookProcessor(
     event_router=event_router,
     worker_count=settings.webhook_worker_count,
     max_queue_size=settings.webhook_queue_maxsize,
+    policy=ScalingPolicy(
+        min_workers=min(settings.webhook_min_workers, settings.webhook_worker_count),
+        max_workers=max(settings.webhook_max_workers, settings.webhook_worker_count),
+        interval_s=settings.webhook_scale_interval_s,
+        target_wait_s=settings.webhook_scale_target_wait_s,
+        up_after=settings.webhook_scale_up_after,
+        down_after=settings.webhook_scale_down_after,
+    ),
+    autoscale=settings.webhook_autoscale,
+    spool=EventSpool(settings.webhook_spool_path) if settings.webhook_spool_path else None,
+    drain_timeout_s=settings.webhook_drain_timeout_s,
+    drain_grace_s=settings.webhook_drain_grace_s,
+    backend=build_queue_backend(settings),
 )
 
 
+def _warmup() -> None:
+    started = time.perf_counter()
+    try:
+        seatalk_client.warmup()
+    except Exception:
+        logger.exception("Warmup failed to pre-fetch SeaTalk token")
+    try:
+        event_router.warmup()
+        if settings.llm_api_key:
+            # One client serves both the chat workflow and the brain graph.
+            from app.llm import get_llm
+
+            get_llm()
+    except Exception:
+        logger.exception("Warmup failed to build workflows")
+    if os.environ.get("BACKLOGS_SHEET_ID"):
+        try:
+            from app.workflows.backlogs import google_clients
+
+            google_clients.warmup()
+        except Exception:
+            logger.exception("Warmup failed to prepare Google clients")
+    if os.environ.get("BACKLOGS_PDF_RENDERER", "local") == "local":
+        try:
+            from app.workflows.backlogs.pdf_raster import get_rasterizer
+
+            get_rasterizer().warmup()
+        except ImportError:
+            logger.info("pypdfium2 not installed; skipping PDF renderer warmup")
+        except Exception:
+            logger.exception("Warmup failed to start PDF render workers")
+    logger.info("Warmup finished in %.2fs", time.perf_counter() - started)
+
+
+async def _backlogs_drive_watch_loop(interval_s: float) -> None:
+    from app.workflows.backlogs.backlogs_update import process_backlogs_update
+    from app.workflows.backlogs.drive_watch import watcher_from_env
+
+    try:
+        watcher = watcher_from_env(
+            settings.backlogs_drive_watch_state_path,
+            max_attempts=settings.backlogs_drive_watch_max_attempts,
+        )
+    except Exception:
+        logger.exception("Backlogs Drive watch disabled")
+        return
+    while True:
+        try:
+            failed: list[str] = []
+            for event in await asyncio.to_thread(watcher.poll):
+                logger.info("New backlog export %s (%s)", event.name, event.file_id)
+                job, _ = get_job_executor().submit(
+                    "backlogs_import", event.file_id, process_backlogs_update, event.file_id, event.file_meta
+                )
+                # Waiting keeps the page token from moving past an export until it is handled.
+                while not job.done:
+                    await asyncio.sleep(1.0)
+                logger.info("Backlogs import job %s for %s: %s", job.job_id, event.file_id, job.status)
+                if job.status != SUCCEEDED:
+                    failed.append(event.file_id)
+            settled = await asyncio.to_thread(watcher.settle, failed)
+            if failed and not settled:
+                # The token stays put, so the next poll offers the failed exports again.
+                logger.warning("Backlogs import failed for %s; Drive changes will be retried", failed)
+        except Exception:
+            logger.exception("Backlogs Drive watch poll failed")
+        await asyncio.sleep(interval_s)
+
+
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     await webhook_processor.start()
+    warmup_task: asyncio.Future[None] | None = None
+    if settings.startup_warmup:
+        # Runs after the app is ready so it never delays accepting callbacks.
+        warmup_task = asyncio.ensure_future(asyncio.to_thread(_warmup))
+    drive_watch_task: asyncio.Task[None] | None = None
+    if settings.backlogs_drive_watch_interval_s > 0:
+        drive_watch_task = asyncio.create_task(
+            _backlogs_drive_watch_loop(settings.backlogs_drive_watch_interval_s)
+        )
     try:
         yield
     finally:
+        if warmup_task is not None and not warmup_task.done():
+            warmup_task.cancel()
+        if drive_watch_task is not None:
+            drive_watch_task.cancel()
         await webhook_processor.stop()
+        get_job_executor().shutdown()
+        if "app.workflows.backlogs.pdf_raster" in sys.modules:
+            sys.modules["app.workflows.backlogs.pdf_raster"].shutdown_rasterizer()
 
 
 app = FastAPI(title="SeaTalk LangGraph Bot", version="0.1.0", lifespan=lifespan)
 
 
 @app.get("/healthz")
-def healthz() -> dict[str, str]:
+def healthz():
+    if webhook_processor.draining:
+        # Lets load balancers and the Cloudflare forwarder route around a draining instance.
+        return JSONResponse(status_code=503, content={"status": "draining"})
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def _require_admin(request: Request) -> None:
+    # Admin endpoints are disabled entirely unless ADMIN_TOKEN is configured.
+    if not settings.admin_token:
+        raise HTTPException(status_code=404)
+    supplied = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(supplied.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=401, detail="invalid admin token")
+
+
+@app.get("/admin/traces")
+def admin_traces(request: Request, limit: int = 50, min_total_ms: float = 0.0) -> dict[str, Any]:
+    _require_admin(request)
+    return {"traces": tracing.recorder.snapshot(limit=limit, min_total_ms=min_total_ms)}
+
+
+@app.get("/admin/backlogs/imports")
+def admin_backlog_imports(request: Request, limit: int = 20, file_id: str = "") -> dict[str, Any]:
+    _require_admin(request)
+    from app.workflows.backlogs.import_ledger import get_ledger
+
+    return {"imports": get_ledger().recent(limit=min(limit, 500), file_id=file_id)}
+
+
+@app.get("/admin/backlogs/snapshot")
+def admin_backlog_snapshot(request: Request, q: str = "") -> dict[str, Any]:
+    _require_admin(request)
+    from app.workflows.backlogs.snapshot import answer_backlog_query, current_snapshot
+
+    snapshot = current_snapshot()
+    data: dict[str, Any] = {"snapshot": snapshot.summary() if snapshot else None}
+    if q:
+        data["answer"] = answer_backlog_query(q)
+    return data
+
+
+@app.get("/admin/backlogs/dashboard")
+def admin_backlog_dashboard(request: Request, format: str = "json") -> Response:
+    _require_admin(request)
+    from app.workflows.backlogs.dashboard import aggregates_markdown, latest_aggregates, render_aggregates_png
+
+    aggregates = latest_aggregates()
+    if aggregates is None:
+        raise HTTPException(status_code=404, detail="no backlog import in this process yet")
+    if format == "png":
+        return Response(content=render_aggregates_png(aggregates), media_type="image/png")
+    if format == "markdown":
+        return PlainTextResponse(aggregates_markdown(aggregates), media_type="text/markdown")
+    return JSONResponse(content=aggregates.to_dict())
+
+
+@app.get("/admin/jobs")
+def admin_jobs(request: Request, limit: int = 50) -> dict[str, Any]:
+    _require_admin(request)
+    return {"jobs": [job.to_dict() for job in get_job_executor().list(limit=limit)]}
+
+
+@app.get("/admin/jobs/{job_id}")
+def admin_job(request: Request, job_id: str) -> dict[str, Any]:
+    _require_admin(request)
+    job = get_job_executor().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job")
+    return job.to_dict()
+
+
+@app.post("/admin/jobs/{job_id}/cancel")
+def admin_cancel_job(request: Request, job_id: str) -> dict[str, Any]:
+    _require_admin(request)
+    job = get_job_executor().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job")
+    return job.to_dict()
+
+
+@app.post("/admin/profile")
+async def admin_profile(
+    request: Request,
+    mode: str = "cpu",
+    seconds: float = 10.0,
+    top: int = 30,
+    interval_ms: float = 5.0,
+    collapsed: bool = False,
+    frames: int = 1,
+) -> PlainTextResponse:
+    _require_admin(request)
+    try:
+        if mode == "cpu":
+            report = await asyncio.to_thread(
+                profiling.sample_cpu, seconds, interval_ms / 1000, top, collapsed
+            )
+        elif mode == "memory":
+            report = await asyncio.to_thread(profiling.trace_memory, seconds, top, frames)
+        else:
+            raise HTTPException(status_code=400, detail="mode must be 'cpu' or 'memory'")
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return PlainTextResponse(report)
+
+
+@app.get("/admin/workers")
+async def admin_workers(request: Request) -> dict[str, Any]:
+    _require_admin(request)
+    return webhook_processor.scaling_status()
+
+
+@app.post("/admin/workers")
+async def admin_configure_workers(
+    request: Request,
+    min_workers: int | None = None,
+    max_workers: int | None = None,
+    target_workers: int | None = None,
+    autoscale: bool | None = None,
+) -> dict[str, Any]:
+    _require_admin(request)
+    try:
+        return webhook_processor.configure_scaling(
+            min_workers=min_workers,
+            max_workers=max_workers,
+            target_workers=target_workers,
+            autoscale=autoscale,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@app.post("/admin/drain")
+async def admin_drain(request: Request, timeout_s: float | None = None) -> dict[str, Any]:
+    _require_admin(request)
+    return await webhook_processor.drain(timeout_s)
+
+
+@app.post("/admin/resume")
+async def admin_resume(request: Request) -> dict[str, Any]:
+    _require_admin(request)
+    return await webhook_processor.resume()
+
+
 @app.post("/seatalk/callback")
 async def seatalk_callback(request: Request):
+    trace = tracing.start_trace()
+    body = await request.body()
     try:
-        payload: dict[str, Any] = await request.json()
+        payload: dict[str, Any] = json.loads(body)
     except Exception:
         return JSONResponse(status_code=400, content={"error": "invalid json"})
 
@@ -55,8 +313,128 @@ async def seatalk_callback(request: Request):
     if event_type == EVENT_VERIFICATION and challenge:
         return JSONResponse(status_code=200, content={"seatalk_challenge": challenge})
 
-    queued = webhook_processor.enqueue(payload)
+    if webhook_processor.draining:
+        return JSONResponse(
+            status_code=503,
+            content={"ok": False, "error": "draining"},
+            headers={"Retry-After": "1"},
+        )
+
+    if trace is not None:
+        trace.event_id = str(payload.get("event_id", "") or "")
+        trace.event_type = str(event_type or "")
+        trace.mark("received")
+
+    queued = await webhook_processor.enqueue(payload, size_bytes=len(body), trace=trace)
     if not queued:
         logger.error("Callback accepted but dropped from queue. event_id=%s", payload.get("event_id"))
 
     return JSONResponse(status_code=200, content={"ok": True, "queued": queued})
+
+
+@app.post("/seatalk/callback/batch")
+async def seatalk_callback_batch(request: Request):
+    """Accept many callback events in one request (JSON array or NDJSON, optionally gzip)
+    from the edge forwarder, and report a status per event."""
+    if settings.callback_batch_token:
+        supplied = request.headers.get("X-Batch-Token", "")
+        if not hmac.compare_digest(supplied.encode(), settings.callback_batch_token.encode()):
+            raise HTTPException(status_code=401, detail="invalid batch token")
+
+    if webhook_processor.draining:
+        return JSONResponse(
+            status_code=503,
+            content={"ok": False, "error": "draining"},
+            headers={"Retry-After": "1"},
+        )
+
+    body = await request.body()
+    try:
+        data = decode_body(body, request.headers.get("Content-Encoding", ""), settings.callback_batch_max_bytes)
+        entries = parse_event_batch(data, request.headers.get("Content-Type", ""))
+    except PayloadTooLarge as exc:
+        return JSONResponse(status_code=413, content={"error": str(exc)})
+    except ValueError as exc:
+        return JSONResponse(status_code=400, content={"error": str(exc)})
+    if len(entries) > settings.callback_batch_max_events:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"batch exceeds {settings.callback_batch_max_events} events"},
+        )
+
+    results: list[dict[str, Any]] = []
+    to_enqueue: list[tuple[dict[str, Any], int, Any]] = []
+    enqueue_slots: list[int] = []
+    for index, (payload, size_bytes, error) in enumerate(entries):
+        event_id = str((payload or {}).get("event_id", "") or "")
+        results.append({"index": index, "event_id": event_id, "status": "invalid" if error else ""})
+        if error:
+            results[-1]["error"] = error
+            continue
+        event_type = payload.get("event_type")
+        if event_type == EVENT_VERIFICATION:
+            # Verification is answered by the edge on the direct callback path.
+            results[-1]["status"] = "skipped"
+            continue
+        trace = tracing.start_trace(event_id, str(event_type or ""))
+        if trace is not None:
+            trace.mark("received")
+        to_enqueue.append((payload, size_bytes, trace))
+        enqueue_slots.append(index)
+
+    statuses = await webhook_processor.enqueue_many(to_enqueue) if to_enqueue else []
+    for index, status in zip(enqueue_slots, statuses):
+        results[index]["status"] = "dropped" if status == FULL else status
+    dropped = sum(1 for result in results if result["status"] == "dropped")
+    if dropped:
+        logger.error("Batch callback dropped %s of %s events from queue", dropped, len(results))
+
+    return JSONResponse(
+        status_code=200,
+        content={
+            "ok": True,
+            "accepted": sum(1 for result in results if result["status"] in ("queued", "duplicate")),
+            "results": results,
+        },
+    )
+
+
+@app.post("/webhook/backlogs_update_filtered")
+async def backlogs_update_filtered(request: Request, file_id: str | None = None):
+    """Stream pre-filtered backlog rows into Supabase.
+
+    Accepts `{"file_id": ..., "rows": [[...], ...]}`, a bare rows array, or NDJSON
+    (optional `{"file_id": ...}` line, then one row array per line), optionally gzip.
+    Rows are parsed as they arrive and written in SUPABASE_INSERT_BATCH_SIZE batches.
+    """
+    if settings.backlogs_webhook_token:
+        supplied = request.headers.get("x-webhook-token", "")
+        if not hmac.compare_digest(supplied.encode(), settings.backlogs_webhook_token.encode()):
+            raise HTTPException(status_code=401, detail="invalid webhook token")
+
+    from app.workflows.backlogs.backlogs_update import process_backlogs_filtered_stream
+
+    pipe = ChunkPipe()
+    records = iter_stream_records(
+        pipe,
+        "rows",
+        content_type=request.headers.get("Content-Type", ""),
+        content_encoding=request.headers.get("Content-Encoding", ""),
+        max_bytes=settings.backlogs_stream_max_bytes,
+    )
+    consumer = asyncio.ensure_future(asyncio.to_thread(process_backlogs_filtered_stream, records, file_id))
+    try:
+        await pipe.feed(request.stream(), consumer)
+    except Exception:
+        # The consumer sees a truncated document and reports it below.
+        logger.warning("Backlogs row upload interrupted", exc_info=True)
+    try:
+        result = await consumer
+    except PayloadTooLarge as exc:
+        return JSONResponse(status_code=413, content={"status": "failed", "error": str(exc)})
+    except ValueError as exc:
+        return JSONResponse(status_code=400, content={"status": "failed", "error": str(exc)})
+    except Exception as exc:
+        logger.exception("Backlogs filtered rows import failed")
+        return JSONResponse(status_code=502, content={"status": "failed", "error": str(exc)})
+    return result
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from typing import Callable, Iterable
+
+# Recording writes only to a per-thread shard, so the hot path takes no lock once a
+# thread has recorded its first sample. Scrapes merge shards under the registry lock.
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+LabelValues = tuple[str, ...]
+
+
+class _Sharded:
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _snapshots(self) -> list[dict]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        return [dict(shard) for shard in shards]
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def collect(self) -> dict[LabelValues, float]:
+        merged: dict[LabelValues, float] = {}
+        for snapshot in self._snapshots():
+            for labels, value in snapshot.items():
+                merged[labels] = merged.get(labels, 0.0) + value
+        return merged
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # [per-bucket counts..., +Inf count, sum]
+            series = [0] * (len(self.buckets) + 1) + [0.0]
+            shard[labels] = series
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> dict[LabelValues, list[float]]:
+        merged: dict[LabelValues, list[float]] = {}
+        for snapshot in self._snapshots():
+            for labels, series in snapshot.items():
+                current = merged.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+                for idx, value in enumerate(list(series)):
+                    current[idx] += value
+        return merged
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else _format_value(bound)
+                label_str = _format_labels(self.labelnames + ("le",), labels + (le,))
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float] | None = None) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def set_function(self, callback: Callable[[], float]) -> None:
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        if self.callback is None:
+            return []
+        try:
+            value = float(self.callback())
+        except Exception:
+            return []
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_format_value(value)}",
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram | Gauge] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], float] | None = None) -> Gauge:
+        return self._register(Gauge(name, documentation, callback))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+registry = MetricsRegistry()
+
+# Webhook queue / workers
+WEBHOOK_QUEUE_DEPTH = registry.gauge("seatalk_webhook_queue_depth", "Events waiting in the webhook queue.")
+WEBHOOK_QUEUE_BYTES = registry.gauge("seatalk_webhook_queue_bytes", "Approximate payload bytes waiting in the queue.")
+WEBHOOK_WORKERS = registry.gauge("seatalk_webhook_workers", "Live webhook worker count.")
+WEBHOOK_WORKERS_BUSY = registry.gauge("seatalk_webhook_workers_busy", "Webhook workers currently handling an event.")
+WEBHOOK_WORKER_BUSY_RATIO = registry.gauge(
+    "seatalk_webhook_worker_busy_ratio", "Busy workers divided by worker count."
+)
+WEBHOOK_WORKER_BUSY_SECONDS = registry.counter(
+    "seatalk_webhook_worker_busy_seconds_total", "Cumulative time workers spent handling events."
+)
+WEBHOOK_SCALE_EVENTS = registry.counter(
+    "seatalk_webhook_scale_events_total", "Webhook worker pool resizes.", ("direction",)
+)
+WEBHOOK_ENQUEUED = registry.counter(
+    "seatalk_webhook_enqueued_total", "Events accepted into the webhook queue.", ("event_type",)
+)
+WEBHOOK_DROPPED = registry.counter(
+    "seatalk_webhook_dropped_total", "Events dropped because the webhook queue was full.", ("event_type",)
+)
+WEBHOOK_DUPLICATES = registry.counter(
+    "seatalk_webhook_duplicates_total", "Events skipped because their event_id was already queued.", ("event_type",)
+)
+WEBHOOK_DRAIN_SPOOLED = registry.counter(
+    "seatalk_webhook_drain_spooled_total", "Events handed to the spool because a drain hit its deadline."
+)
+WEBHOOK_QUEUE_WAIT = registry.histogram(
+    "seatalk_webhook_queue_wait_seconds", "Time events spent queued before a worker picked them up.", ("event_type",)
+)
+EVENT_E2E_LATENCY = registry.histogram(
+    "seatalk_event_e2e_seconds", "Time from enqueue to handling complete.", ("event_type",)
+)
+
+# Workflows
+WORKFLOW_DURATION = registry.histogram(
+    "seatalk_workflow_process_seconds", "Workflow process() duration.", ("workflow",)
+)
+WORKFLOW_ERRORS = registry.counter("seatalk_workflow_errors_total", "Workflow process() failures.", ("workflow",))
+
+# Background jobs
+BACKGROUND_JOBS = registry.counter(
+    "seatalk_background_jobs_total", "Background job state transitions.", ("kind", "status")
+)
+BACKGROUND_JOB_DURATION = registry.histogram(
+    "seatalk_background_job_seconds",
+    "Background job run time.",
+    ("kind",),
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800),
+)
+
+# SeaTalk API
+SEATALK_API_LATENCY = registry.histogram(
+    "seatalk_api_request_seconds", "SeaTalk OpenAPI request latency.", ("path",)
+)
+SEATALK_API_RESPONSES = registry.counter(
+    "seatalk_api_responses_total", "SeaTalk OpenAPI responses by status code.", ("path", "status")
+)
+SEATALK_AUTH_REFRESHES = registry.counter(
+    "seatalk_auth_token_refresh_total", "SeaTalk access token refresh attempts.", ("result",)
+)
+SEATALK_BROADCAST_GROUPS = registry.counter(
+    "seatalk_broadcast_groups_total", "Groups reached by broadcasts, by outcome.", ("result",)
+)
+SEATALK_BROADCAST_DURATION = registry.histogram(
+    "seatalk_broadcast_seconds", "Wall time of a whole group broadcast."
+)
+SEATALK_IMAGE_CACHE = registry.counter(
+    "seatalk_image_cache_total", "Outbound image optimizer cache lookups.", ("result",)
+)
+SEATALK_IMAGE_BYTES = registry.counter(
+    "seatalk_image_bytes_total", "Outbound image bytes before and after re-encoding.", ("stage",)
+)
+
+# LLM
+LLM_LATENCY = registry.histogram("seatalk_llm_request_seconds", "LLM invoke latency.", ("model",))
+LLM_TOKENS = registry.counter("seatalk_llm_tokens_total", "LLM token usage.", ("model", "kind"))
+LLM_ERRORS = registry.counter("seatalk_llm_errors_total", "LLM invoke failures.", ("model",))
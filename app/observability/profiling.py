@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# One profiling session at a time; a second request gets a RuntimeError instead of queueing.
+_session_lock = threading.Lock()
+
+MAX_PROFILE_SECONDS = 120.0
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_cpu(seconds: float, interval: float = 0.005, top: int = 30, collapsed: bool = False) -> str:
+    """Sample every thread's stack for `seconds` and return a text report.
+
+    With `collapsed=True` the report is in folded-stack format for flamegraph tools.
+    """
+    seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+    if not _session_lock.acquire(blocking=False):
+        raise RuntimeError("A profiling session is already running")
+    try:
+        own_id = threading.get_ident()
+        leaf_counts: Counter[str] = Counter()
+        inclusive_counts: Counter[str] = Counter()
+        stack_counts: Counter[str] = Counter()
+        samples = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack: list[str] = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                samples += 1
+                leaf_counts[stack[0]] += 1
+                for label in set(stack):
+                    inclusive_counts[label] += 1
+                if collapsed:
+                    stack_counts[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+    finally:
+        _session_lock.release()
+
+    if collapsed:
+        return "\n".join(f"{stack} {count}" for stack, count in stack_counts.most_common()) + "\n"
+
+    lines = [f"CPU sampling profile: {seconds:.1f}s, interval {interval * 1000:.1f}ms, {samples} thread samples"]
+    if not samples:
+        return lines[0] + "\n"
+    lines.append("")
+    lines.append("Top self (leaf frames):")
+    for label, count in leaf_counts.most_common(top):
+        lines.append(f"{count / samples * 100:7.2f}%  {count:7d}  {label}")
+    lines.append("")
+    lines.append("Top inclusive:")
+    for label, count in inclusive_counts.most_common(top):
+        lines.append(f"{count / samples * 100:7.2f}%  {count:7d}  {label}")
+    return "\n".join(lines) + "\n"
+
+
+def trace_memory(seconds: float, top: int = 30, frames: int = 1) -> str:
+    """Diff tracemalloc snapshots taken `seconds` apart and return the top allocation sites."""
+    seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+    if not _session_lock.acquire(blocking=False):
+        raise RuntimeError("A profiling session is already running")
+    try:
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start(max(frames, 1))
+        try:
+            before = tracemalloc.take_snapshot()
+            time.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+    finally:
+        _session_lock.release()
+
+    stats = after.compare_to(before, "traceback" if frames > 1 else "lineno")
+    lines = [
+        f"tracemalloc diff over {seconds:.1f}s: traced {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB",
+        "",
+    ]
+    for stat in stats[:top]:
+        lines.append(str(stat))
+        if frames > 1:
+            lines.extend(f"    {line}" for line in stat.traceback.format())
+    return "\n".join(lines) + "\n"
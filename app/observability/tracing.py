@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from app.config import settings
+
+logger = logging.getLogger("seatalk_bot")
+
+# asyncio.to_thread copies the current context, so spans recorded inside worker threads
+# (workflows, SeaTalk sends, LLM calls) land on the trace of the event being handled.
+_current_trace: contextvars.ContextVar[EventTrace | None] = contextvars.ContextVar("event_trace", default=None)
+
+
+class EventTrace:
+    __slots__ = ("event_id", "event_type", "started_at", "_origin", "spans", "marks")
+
+    def __init__(self, event_id: str = "", event_type: str = "") -> None:
+        self.event_id = event_id
+        self.event_type = event_type
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        # (name, start offset seconds, duration seconds, attributes)
+        self.spans: list[tuple[str, float, float, dict[str, Any]]] = []
+        self.marks: list[tuple[str, float]] = []
+
+    def offset(self) -> float:
+        return time.perf_counter() - self._origin
+
+    def mark(self, name: str) -> None:
+        self.marks.append((name, self.offset()))
+
+    def add_span(self, name: str, start: float, duration: float, **attrs: Any) -> None:
+        # list.append is atomic, so spans from worker threads need no lock.
+        self.spans.append((name, start, duration, attrs))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "event_id": self.event_id,
+            "event_type": self.event_type,
+            "started_at": self.started_at,
+            "total_ms": round(self.offset() * 1000, 3),
+            "marks": [{"name": name, "at_ms": round(at * 1000, 3)} for name, at in self.marks],
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round(start * 1000, 3),
+                    "duration_ms": round(duration * 1000, 3),
+                    **({"attrs": attrs} if attrs else {}),
+                }
+                for name, start, duration, attrs in sorted(self.spans, key=lambda s: s[1])
+            ],
+        }
+
+
+class TraceRecorder:
+    """Keeps recently finished traces in memory and optionally exports them."""
+
+    def __init__(self, capacity: int = 200, export: str = "", slow_threshold_ms: float = 0.0) -> None:
+        self.recent: deque[dict[str, Any]] = deque(maxlen=max(capacity, 1))
+        self.export = export.strip()
+        self.slow_threshold_ms = slow_threshold_ms
+        self._export_lock = threading.Lock()
+
+    def finish(self, trace: EventTrace) -> None:
+        data = trace.to_dict()
+        self.recent.append(data)
+        if not self.export or data["total_ms"] < self.slow_threshold_ms:
+            return
+        line = json.dumps(data, separators=(",", ":"), default=str)
+        if self.export == "log":
+            logger.info("event_trace %s", line)
+            return
+        try:
+            with self._export_lock, open(self.export, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            logger.exception("Failed to export event trace to %s", self.export)
+
+    def snapshot(self, limit: int = 50, min_total_ms: float = 0.0) -> list[dict[str, Any]]:
+        traces = [t for t in list(self.recent) if t["total_ms"] >= min_total_ms]
+        return traces[-limit:][::-1]
+
+
+recorder = TraceRecorder(
+    capacity=settings.trace_buffer_size,
+    export=settings.trace_export,
+    slow_threshold_ms=settings.trace_slow_threshold_ms,
+)
+
+
+def start_trace(event_id: str = "", event_type: str = "") -> EventTrace | None:
+    if not settings.trace_enabled:
+        return None
+    return EventTrace(event_id=event_id, event_type=event_type)
+
+
+def current_trace() -> EventTrace | None:
+    return _current_trace.get()
+
+
+def activate(trace: EventTrace | None) -> contextvars.Token:
+    return _current_trace.set(trace)
+
+
+def deactivate(token: contextvars.Token) -> None:
+    _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = trace.offset()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start, trace.offset() - start, **attrs)
@@ -1,13 +1,29 @@
 from __future__ import annotations
 
 import asyncio
+import contextvars
 import logging
+import os
+import socket
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
+from app.observability import metrics, tracing
+from app.observability.tracing import EventTrace
+from app.processing.autoscale import ScalingPolicy, WorkerScaler
+from app.processing.queue_backends import FULL, QUEUED, Delivery, InMemoryQueueBackend, QueueBackend, conversation_key
+from app.processing.spool import EventSpool
 from app.seatalk.events import SeaTalkEventRouter
 
 logger = logging.getLogger("seatalk_bot")
 
+# Weight of the newest sample in the queue-wait / handling-latency moving averages.
+EWMA_ALPHA = 0.2
+# Traces of events consumed by another instance are never picked up locally; cap the map.
+MAX_PENDING_TRACES = 5000
+
 
 class AsyncWebhookProcessor:
     def __init__(
@@ -15,47 +31,424 @@ class AsyncWebhookProcessor:
         event_router: SeaTalkEventRouter,
         worker_count: int = 2,
         max_queue_size: int = 1000,
+        policy: ScalingPolicy | None = None,
+        autoscale: bool = False,
+        spool: EventSpool | None = None,
+        drain_timeout_s: float = 20.0,
+        drain_grace_s: float = 10.0,
+        backend: QueueBackend | None = None,
     ) -> None:
         self.event_router = event_router
-        self.worker_count = worker_count
-        self.queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(maxsize=max_queue_size)
+        self.spool = spool
+        self.drain_timeout_s = drain_timeout_s
+        self.drain_grace_s = drain_grace_s
+        self.policy = policy or ScalingPolicy(min_workers=worker_count, max_workers=worker_count)
+        self.worker_count = self.policy.clamp(worker_count)
+        self.autoscale = autoscale
+        self.scaler = WorkerScaler(self.policy)
+        self.backend = backend or InMemoryQueueBackend(max_size=max_queue_size)
+        self.consumer_name = f"{socket.gethostname()}:{os.getpid()}"
         self.workers: list[asyncio.Task[None]] = []
         self.running = False
+        self.draining = False
+        self._inflight: dict[str, Delivery] = {}
+        self._traces: OrderedDict[str, EventTrace] = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=self.policy.max_workers, thread_name_prefix="webhook")
+        self._executor_max_workers = self.policy.max_workers
+        self._scaler_task: asyncio.Task[None] | None = None
+        self._stats_task: asyncio.Task[None] | None = None
+        self._idle_workers: set[asyncio.Task[None]] = set()
+        self._retire_pending = 0
+        self._next_worker_id = 0
+        # Only touched from the event loop thread, so plain numbers are safe.
+        self.busy_workers = 0
+        self.wait_ewma_s = 0.0
+        self.latency_ewma_s = 0.0
+
+        metrics.WEBHOOK_QUEUE_DEPTH.set_function(self.backend.depth)
+        metrics.WEBHOOK_QUEUE_BYTES.set_function(self.backend.depth_bytes)
+        metrics.WEBHOOK_WORKERS.set_function(lambda: len(self.workers))
+        metrics.WEBHOOK_WORKERS_BUSY.set_function(lambda: self.busy_workers)
+        metrics.WEBHOOK_WORKER_BUSY_RATIO.set_function(
+            lambda: self.busy_workers / len(self.workers) if self.workers else 0.0
+        )
 
     async def start(self) -> None:
         if self.running:
             return
         self.running = True
-        for idx in range(self.worker_count):
-            task = asyncio.create_task(self._worker(idx))
-            self.workers.append(task)
+        self.draining = False
+        for _ in range(self.worker_count):
+            self._spawn_worker()
+        if self.autoscale:
+            self._scaler_task = asyncio.create_task(self._scale_loop())
+        if self.backend.shared:
+            self._stats_task = asyncio.create_task(self._stats_loop())
+        await self._recover_spool()
 
     async def stop(self) -> None:
         if not self.running:
             return
+        await self.drain(self.drain_timeout_s)
         self.running = False
-        for _ in self.workers:
-            await self.queue.put(None)
-        if self.workers:
-            await asyncio.gather(*self.workers, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+        await self.backend.close()
+
+    async def drain(self, timeout_s: float | None = None) -> dict[str, Any]:
+        """Stop accepting events, finish queued/in-flight work within `timeout_s`,
+        then spool the events no worker has started and stop the workers.
+
+        Events already running get up to `drain_grace_s` more to finish, since
+        spooling them would reply twice. One still running after that is spooled
+        anyway (a possible duplicate) so the drain stays bounded. `resume()` undoes
+        a drain.
+
+        With a shared backend the queued events stay in the backend for other
+        instances; only local in-flight work is waited for, and a stuck lease is
+        left to come back after its visibility timeout."""
+        timeout_s = self.drain_timeout_s if timeout_s is None else timeout_s
+        self.draining = True
+        for task in (self._scaler_task, self._stats_task):
+            if task is not None:
+                task.cancel()
+        self._scaler_task = None
+        self._stats_task = None
+
+        started = time.monotonic()
+        shared = self.backend.shared
+        pending_at_start = len(self._inflight) + (0 if shared else self.backend.depth())
+        if shared:
+            # Stop leasing: idle workers are parked in get() (a lease landing after the cancel
+            # is released), busy ones exit after their event.
+            for task in list(self._idle_workers):
+                task.cancel()
+        completed = True
+        try:
+            await asyncio.wait_for(
+                self._wait_inflight() if shared else self.backend.join(),
+                timeout=max(timeout_s, 0.0),
+            )
+        except asyncio.TimeoutError:
+            completed = False
+
+        # Events no worker has started yet.
+        leftovers: list[Delivery] = [] if shared else self.backend.drain_pending()
+
+        stuck: list[Delivery] = []
+        if self._inflight:
+            # A handler running on the executor can't be interrupted; wait for it, but not forever.
+            logger.warning("Drain deadline hit; waiting up to %ss for %s in-flight events",
+                           self.drain_grace_s, len(self._inflight))
+            try:
+                await asyncio.wait_for(self._wait_inflight(), timeout=max(self.drain_grace_s, 0.0))
+            except asyncio.TimeoutError:
+                stuck = list(self._inflight.values())
+                logger.error(
+                    "Drain grace period over; %s still-running events may be handled twice: %s",
+                    len(stuck),
+                    [item.payload.get("event_id") for item in stuck],
+                )
+                if not shared:
+                    # Handed to the spool; a shared backend redelivers the lease after its
+                    # visibility timeout instead.
+                    leftovers.extend(stuck)
+                    for delivery in stuck:
+                        await self.backend.ack(delivery)
+
+        workers = list(self.workers)
+        for task in workers:
+            task.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
         self.workers.clear()
+        self._idle_workers.clear()
+        self._retire_pending = 0
+        self._inflight.clear()
+
+        spooled = 0
+        if leftovers:
+            payloads = [item.payload for item in leftovers]
+            if self.spool is not None:
+                try:
+                    spooled = await asyncio.to_thread(self.spool.append_many, payloads)
+                except Exception:
+                    logger.exception("Failed to spool %s undrained events", len(payloads))
+            else:
+                logger.error("Drain deadline hit with %s events and no spool configured; dropping", len(payloads))
+            metrics.WEBHOOK_DRAIN_SPOOLED.inc(amount=spooled)
+
+        result = {
+            "completed": completed,
+            "backend": self.backend.name,
+            "pending_at_start": pending_at_start,
+            "spooled": spooled,
+            "stuck": len(stuck),
+            "dropped": 0 if shared else len(leftovers) - spooled,
+            "duration_s": round(time.monotonic() - started, 3),
+        }
+        logger.info("Webhook drain finished: %s", result)
+        return result
+
+    async def resume(self) -> dict[str, Any]:
+        """Undo a drain: accept events again and restart the workers."""
+        if not self.running or not self.draining:
+            return self.scaling_status()
+        self.draining = False
+        for _ in range(self.worker_count):
+            self._spawn_worker()
+        if self.autoscale:
+            self._scaler_task = asyncio.create_task(self._scale_loop())
+        if self.backend.shared:
+            self._stats_task = asyncio.create_task(self._stats_loop())
+        await self._recover_spool()
+        logger.info("Webhook processing resumed with %s workers", self.worker_count)
+        return self.scaling_status()
+
+    async def _wait_inflight(self) -> None:
+        while self._inflight:
+            await asyncio.sleep(0.05)
+
+    async def _recover_spool(self) -> None:
+        if self.spool is None:
+            return
+        try:
+            payloads = await asyncio.to_thread(self.spool.take)
+        except Exception:
+            logger.exception("Failed to read webhook spool")
+            return
+        if not payloads:
+            return
+        overflow = [payload for payload in payloads if not await self.enqueue(payload)]
+        if overflow:
+            self.spool.append_many(overflow)
+        self.spool.commit_take()
+        logger.info("Recovered %s spooled events (%s re-spooled)", len(payloads) - len(overflow), len(overflow))
+
+    async def enqueue(
+        self,
+        payload: dict[str, Any],
+        size_bytes: int = 0,
+        trace: EventTrace | None = None,
+    ) -> bool:
+        """Queue an event; returns False when draining or the backend is full/unavailable.
+        A duplicate event_id within the dedup window counts as accepted."""
+        return (await self.enqueue_many([(payload, size_bytes, trace)]))[0] != FULL
 
-    def enqueue(self, payload: dict[str, Any]) -> bool:
+    async def enqueue_many(self, events: list[tuple[dict[str, Any], int, EventTrace | None]]) -> list[str]:
+        """Queue several events in one backend call; returns QUEUED/DUPLICATE/FULL per event."""
+        if self.draining:
+            return [FULL] * len(events)
+        items = [
+            (payload, conversation_key(payload), size_bytes, str(payload.get("event_id", "") or ""))
+            for payload, size_bytes, _ in events
+        ]
         try:
-            self.queue.put_nowait(payload)
-            return True
-        except asyncio.QueueFull:
-            logger.error("Webhook queue is full. Dropping event_id=%s", payload.get("event_id"))
-            return False
+            statuses = await self.backend.put_many(items)
+        except Exception:
+            logger.exception("Queue backend rejected %s events", len(items))
+            statuses = [FULL] * len(items)
+        for (payload, _, trace), status in zip(events, statuses):
+            event_type = str(payload.get("event_type", "") or "")
+            if status == FULL:
+                logger.error("Webhook queue is full. Dropping event_id=%s", payload.get("event_id"))
+                metrics.WEBHOOK_DROPPED.inc(event_type)
+            elif status == QUEUED:
+                metrics.WEBHOOK_ENQUEUED.inc(event_type)
+                if trace is not None:
+                    trace.mark("enqueued")
+                    self._remember_trace(payload, trace)
+            else:
+                logger.info("Skipping duplicate event_id=%s", payload.get("event_id"))
+                metrics.WEBHOOK_DUPLICATES.inc(event_type)
+        return statuses
+
+    def _remember_trace(self, payload: dict[str, Any], trace: EventTrace) -> None:
+        event_id = str(payload.get("event_id", "") or "")
+        if not event_id:
+            return
+        self._traces[event_id] = trace
+        while len(self._traces) > MAX_PENDING_TRACES:
+            self._traces.popitem(last=False)
+
+    def scaling_status(self) -> dict[str, Any]:
+        return {
+            "autoscale": self.autoscale,
+            "draining": self.draining,
+            "workers": len(self.workers),
+            "target_workers": self.worker_count,
+            "busy_workers": self.busy_workers,
+            "idle_workers": len(self._idle_workers),
+            "retire_pending": self._retire_pending,
+            "min_workers": self.policy.min_workers,
+            "max_workers": self.policy.max_workers,
+            "queue_backend": self.backend.name,
+            "queue_depth": self.backend.depth(),
+            "queue_wait_ewma_ms": round(self.wait_ewma_s * 1000, 3),
+            "handle_latency_ewma_ms": round(self.latency_ewma_s * 1000, 3),
+        }
+
+    def configure_scaling(
+        self,
+        min_workers: int | None = None,
+        max_workers: int | None = None,
+        target_workers: int | None = None,
+        autoscale: bool | None = None,
+    ) -> dict[str, Any]:
+        new_min = self.policy.min_workers if min_workers is None else min_workers
+        new_max = self.policy.max_workers if max_workers is None else max_workers
+        if new_min < 1 or new_max < new_min:
+            raise ValueError("require 1 <= min_workers <= max_workers")
+        self.policy.min_workers = new_min
+        self.policy.max_workers = new_max
+        if new_max > self._executor_max_workers:
+            # ThreadPoolExecutor can't grow in place; in-flight work finishes on the old pool.
+            old_executor = self.executor
+            self.executor = ThreadPoolExecutor(max_workers=new_max, thread_name_prefix="webhook")
+            self._executor_max_workers = new_max
+            old_executor.shutdown(wait=False)
+
+        if target_workers is not None:
+            # A pinned size disables autoscaling until it is explicitly re-enabled.
+            self.autoscale = False
+            self._resize(self.policy.clamp(target_workers))
+        else:
+            self._resize(self.policy.clamp(self.worker_count))
+
+        if autoscale is not None:
+            self.autoscale = autoscale
+        if self.running and not self.draining and self.autoscale and self._scaler_task is None:
+            self._scaler_task = asyncio.create_task(self._scale_loop())
+        elif not self.autoscale and self._scaler_task is not None:
+            self._scaler_task.cancel()
+            self._scaler_task = None
+        return self.scaling_status()
+
+    def _spawn_worker(self) -> None:
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        task = asyncio.create_task(self._worker(worker_id))
+        self.workers.append(task)
+        task.add_done_callback(self._on_worker_done)
+
+    def _on_worker_done(self, task: asyncio.Task[None]) -> None:
+        self._idle_workers.discard(task)
+        if task in self.workers:
+            self.workers.remove(task)
+
+    def _resize(self, target: int) -> None:
+        self.worker_count = target
+        if not self.running or self.draining:
+            return
+        live = len(self.workers) - self._retire_pending
+        if target > live:
+            # Cancel outstanding retirements first, then add fresh workers.
+            reuse = min(self._retire_pending, target - live)
+            self._retire_pending -= reuse
+            for _ in range(target - live - reuse):
+                self._spawn_worker()
+            metrics.WEBHOOK_SCALE_EVENTS.inc("up")
+        elif target < live:
+            for _ in range(live - target):
+                idle = next(iter(self._idle_workers), None)
+                if idle is not None:
+                    # Idle workers are parked in backend.get(); shared backends release a
+                    # lease that lands after the cancel.
+                    self._idle_workers.discard(idle)
+                    idle.cancel()
+                else:
+                    self._retire_pending += 1
+            metrics.WEBHOOK_SCALE_EVENTS.inc("down")
+
+    async def _scale_loop(self) -> None:
+        while self.running:
+            await asyncio.sleep(self.policy.interval_s)
+            if not self.autoscale:
+                continue
+            current = len(self.workers) - self._retire_pending
+            desired = self.scaler.decide(
+                current=current,
+                queue_depth=self.backend.depth(),
+                busy=self.busy_workers,
+                wait_ewma_s=self.wait_ewma_s,
+                latency_ewma_s=self.latency_ewma_s,
+            )
+            if desired != current:
+                logger.info(
+                    "Scaling webhook workers %s -> %s (queue=%s wait_ewma=%.3fs latency_ewma=%.3fs)",
+                    current,
+                    desired,
+                    self.backend.depth(),
+                    self.wait_ewma_s,
+                    self.latency_ewma_s,
+                )
+                self._resize(desired)
+            if self.backend.depth() == 0:
+                # Let the wait average decay while idle so a past spike doesn't pin the pool size.
+                self.wait_ewma_s *= 1 - EWMA_ALPHA
+
+    async def _stats_loop(self) -> None:
+        # Shared backends only know their depth by asking; keep gauges and the scaler current.
+        while self.running:
+            try:
+                await self.backend.refresh_stats()
+            except Exception:
+                logger.warning("Failed to refresh %s queue stats", self.backend.name, exc_info=True)
+            await asyncio.sleep(self.policy.interval_s)
 
     async def _worker(self, worker_id: int) -> None:
+        task = asyncio.current_task()
+        consumer = f"{self.consumer_name}:{worker_id}"
         while True:
-            payload = await self.queue.get()
+            if self.draining and self.backend.shared:
+                return
+            self._idle_workers.add(task)
+            try:
+                delivery = await self.backend.get(consumer)
+            finally:
+                self._idle_workers.discard(task)
             try:
-                if payload is None:
-                    return
-                await asyncio.to_thread(self.event_router.handle_event, payload)
+                await self._handle(delivery)
             except Exception:
                 logger.exception("Worker %s failed processing callback", worker_id)
-            finally:
-                self.queue.task_done()
+            try:
+                await self.backend.ack(delivery)
+            except Exception:
+                logger.exception("Failed to ack message_id=%s", delivery.message_id)
+            if self._retire_pending > 0:
+                self._retire_pending -= 1
+                return
+
+    async def _handle(self, delivery: Delivery) -> None:
+        self._inflight[delivery.message_id] = delivery
+        payload = delivery.payload
+        event_type = str(payload.get("event_type", "") or "")
+        started = time.monotonic()
+        # Wall clock: the event may have been enqueued by another instance.
+        waited = max(time.time() - delivery.enqueued_at, 0.0)
+        self.wait_ewma_s += EWMA_ALPHA * (waited - self.wait_ewma_s)
+        metrics.WEBHOOK_QUEUE_WAIT.observe(waited, event_type)
+        trace = self._traces.pop(str(payload.get("event_id", "") or ""), None)
+        if trace is None:
+            # Enqueued by another instance: the timeline starts at dequeue.
+            trace = tracing.start_trace(str(payload.get("event_id", "") or ""), event_type)
+        if trace is not None:
+            trace.mark("dequeued")
+            trace.add_span("queue_wait", trace.offset() - waited, waited, attempts=delivery.attempts)
+        self.busy_workers += 1
+        token = tracing.activate(trace)
+        try:
+            # Copy the context so spans recorded in the worker thread attach to this trace.
+            ctx = contextvars.copy_context()
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, ctx.run, self.event_router.handle_event, payload)
+        finally:
+            self._inflight.pop(delivery.message_id, None)
+            tracing.deactivate(token)
+            self.busy_workers -= 1
+            finished = time.monotonic()
+            self.latency_ewma_s += EWMA_ALPHA * (finished - started - self.latency_ewma_s)
+            metrics.WEBHOOK_WORKER_BUSY_SECONDS.inc(amount=finished - started)
+            metrics.EVENT_E2E_LATENCY.observe(waited + finished - started, event_type)
+            if trace is not None:
+                trace.mark("handled")
+                tracing.recorder.finish(trace)
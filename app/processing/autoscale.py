@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+
+@dataclass
+class ScalingPolicy:
+    min_workers: int = 1
+    max_workers: int = 8
+    interval_s: float = 2.0
+    # Queue wait above this counts as pressure even when the queue is short.
+    target_wait_s: float = 1.0
+    # Consecutive pressured/idle checks required before acting (hysteresis).
+    up_after: int = 2
+    down_after: int = 15
+    idle_ratio: float = 0.25
+    max_step: int = 2
+
+    def clamp(self, workers: int) -> int:
+        return max(self.min_workers, min(self.max_workers, workers))
+
+
+class WorkerScaler:
+    """Decides the desired worker count from queue depth, queue wait and handling latency."""
+
+    def __init__(self, policy: ScalingPolicy) -> None:
+        self.policy = policy
+        self.up_streak = 0
+        self.down_streak = 0
+
+    def decide(
+        self,
+        current: int,
+        queue_depth: int,
+        busy: int,
+        wait_ewma_s: float,
+        latency_ewma_s: float,
+    ) -> int:
+        policy = self.policy
+        current = max(current, 0)
+        pressured = queue_depth > current or wait_ewma_s > policy.target_wait_s
+        idle = queue_depth == 0 and (current == 0 or busy / current <= policy.idle_ratio)
+
+        if pressured:
+            self.up_streak += 1
+            self.down_streak = 0
+            if self.up_streak >= policy.up_after:
+                self.up_streak = 0
+                # Enough workers to drain the backlog within target_wait at current latency.
+                needed = math.ceil(queue_depth * max(latency_ewma_s, 0.001) / policy.target_wait_s)
+                step = max(1, min(policy.max_step, needed - busy))
+                return policy.clamp(current + step)
+        elif idle:
+            self.down_streak += 1
+            self.up_streak = 0
+            if self.down_streak >= policy.down_after:
+                self.down_streak = 0
+                return policy.clamp(current - 1)
+        else:
+            self.up_streak = 0
+            self.down_streak = 0
+        return policy.clamp(current)
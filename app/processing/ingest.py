@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import asyncio
+import codecs
+import itertools
+import json
+import queue
+import zlib
+from collections.abc import AsyncIterator, Iterable, Iterator
+from typing import Any
+
+GZIP_MAGIC = b"\x1f\x8b"
+JSON_WHITESPACE = " \t\r\n"
+# Largest single JSON value / NDJSON line accepted from a stream.
+MAX_STREAM_VALUE_BYTES = 1_000_000
+
+
+class PayloadTooLarge(ValueError):
+    pass
+
+
+def is_gzip(content_encoding: str, head: bytes) -> bool:
+    return "gzip" in (content_encoding or "").lower() or head[:2] == GZIP_MAGIC
+
+
+def decode_body(body: bytes, content_encoding: str = "", max_bytes: int = 0) -> bytes:
+    """Return the request body, gunzipped if needed, refusing to inflate past `max_bytes`."""
+    if not is_gzip(content_encoding, body):
+        if max_bytes and len(body) > max_bytes:
+            raise PayloadTooLarge(f"body exceeds {max_bytes} bytes")
+        return body
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(body, max_bytes + 1 if max_bytes else 0)
+    except zlib.error as exc:
+        raise ValueError(f"invalid gzip body: {exc}") from exc
+    if max_bytes and (len(data) > max_bytes or decompressor.unconsumed_tail):
+        raise PayloadTooLarge(f"decompressed body exceeds {max_bytes} bytes")
+    return data
+
+
+def is_ndjson(content_type: str, data: bytes) -> bool:
+    content_type = (content_type or "").lower()
+    if "ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type:
+        return True
+    data = data.lstrip()
+    if data[:1] != b"{":
+        return False
+    # NDJSON when the first line is a complete value and more content follows;
+    # pretty-printed JSON fails the first-line parse.
+    first_line, _, rest = data.partition(b"\n")
+    if not rest.strip():
+        return False
+    try:
+        json.loads(first_line)
+    except ValueError:
+        return False
+    return True
+
+
+def parse_event_batch(data: bytes, content_type: str = "") -> list[tuple[dict[str, Any] | None, int, str]]:
+    """Split a batch body into (payload, size_bytes, error) entries.
+
+    Accepts a JSON array, `{"events": [...]}`, or NDJSON. A bad NDJSON line only fails
+    its own entry; a malformed JSON array fails the whole batch with ValueError.
+    """
+    entries: list[tuple[dict[str, Any] | None, int, str]] = []
+    if is_ndjson(content_type, data):
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                payload = json.loads(line)
+            except ValueError:
+                entries.append((None, len(line), "invalid json"))
+                continue
+            if not isinstance(payload, dict):
+                entries.append((None, len(line), "event must be an object"))
+                continue
+            entries.append((payload, len(line), ""))
+        return entries
+
+    parsed = json.loads(data)
+    if isinstance(parsed, dict):
+        parsed = parsed.get("events", [parsed])
+    if not isinstance(parsed, list):
+        raise ValueError("batch must be a JSON array, {\"events\": [...]} or NDJSON")
+    # Per-event size is only used for queue byte accounting; an even split is close enough.
+    size_each = len(data) // max(len(parsed), 1)
+    for payload in parsed:
+        if isinstance(payload, dict):
+            entries.append((payload, size_each, ""))
+        else:
+            entries.append((None, size_each, "event must be an object"))
+    return entries
+
+
+def iter_decompressed(chunks: Iterable[bytes], max_bytes: int = 0) -> Iterator[bytes]:
+    """Gunzip a chunked body incrementally, refusing to inflate past `max_bytes`."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    total = 0
+    try:
+        for chunk in chunks:
+            data = decompressor.decompress(chunk, 1 << 20)
+            while True:
+                total += len(data)
+                if max_bytes and total > max_bytes:
+                    raise PayloadTooLarge(f"decompressed body exceeds {max_bytes} bytes")
+                if data:
+                    yield data
+                if not decompressor.unconsumed_tail:
+                    break
+                data = decompressor.decompress(decompressor.unconsumed_tail, 1 << 20)
+        tail = decompressor.flush()
+    except zlib.error as exc:
+        raise ValueError(f"invalid gzip body: {exc}") from exc
+    if tail:
+        yield tail
+
+
+def iter_ndjson(chunks: Iterable[bytes]) -> Iterator[Any]:
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        if len(pending) > MAX_STREAM_VALUE_BYTES:
+            raise PayloadTooLarge(f"NDJSON line exceeds {MAX_STREAM_VALUE_BYTES} bytes")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+class _JsonStream:
+    """Cursor over a chunked JSON document that decodes one value at a time."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.eof = True
+            self.buf += self._text.decode(b"", final=True)
+        else:
+            self.buf += self._text.decode(chunk)
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in JSON_WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} in JSON stream, found {found or 'end of input'!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as exc:
+                if len(self.buf) - self.pos > MAX_STREAM_VALUE_BYTES:
+                    raise PayloadTooLarge(f"JSON value exceeds {MAX_STREAM_VALUE_BYTES} bytes") from exc
+                if not self._fill():
+                    raise ValueError(f"truncated or invalid JSON: {exc}") from exc
+                continue
+            # A number or literal ending at the buffer edge may continue in the next chunk.
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def array_items(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError("expected ',' or ']' in JSON array")
+
+
+def iter_json_members(chunks: Iterable[bytes], array_key: str) -> Iterator[tuple[str, Any]]:
+    """Yield `(key, value)` for each top-level member of a JSON object, except that the
+    array under `array_key` is yielded one element at a time as `(array_key, element)`.
+    A bare top-level array is treated as the `array_key` array."""
+    stream = _JsonStream(chunks)
+    if stream.peek() == "[":
+        for item in stream.array_items():
+            yield array_key, item
+    else:
+        stream.expect("{")
+        if stream.peek() == "}":
+            stream.pos += 1
+        else:
+            while True:
+                key = stream.value()
+                if not isinstance(key, str):
+                    raise ValueError("JSON object key must be a string")
+                stream.expect(":")
+                if key == array_key and stream.peek() == "[":
+                    for item in stream.array_items():
+                        yield array_key, item
+                else:
+                    yield key, stream.value()
+                char = stream.peek()
+                stream.pos += 1
+                if char == "}":
+                    break
+                if char != ",":
+                    raise ValueError("expected ',' or '}' in JSON object")
+    if stream.peek():
+        raise ValueError("unexpected data after JSON document")
+
+
+def iter_stream_records(
+    chunks: Iterable[bytes],
+    array_key: str,
+    content_type: str = "",
+    content_encoding: str = "",
+    max_bytes: int = 0,
+) -> Iterator[tuple[str, Any]]:
+    """Decode a streamed upload (JSON object/array or NDJSON, optionally gzip) into
+    `(key, value)` records without materializing the body; see iter_json_members.
+
+    NDJSON lines that are arrays are yielded as `(array_key, line)`; object lines
+    yield their members the same way a JSON object does."""
+    chunks = iter(chunks)
+    first = next((chunk for chunk in chunks if chunk), b"")
+    chunks = itertools.chain([first], chunks)
+    if is_gzip(content_encoding, first):
+        chunks = iter(iter_decompressed(chunks, max_bytes))
+        first = next((chunk for chunk in chunks if chunk), b"")
+        chunks = itertools.chain([first], chunks)
+
+    if not is_ndjson(content_type, first):
+        yield from iter_json_members(chunks, array_key)
+        return
+    for line in iter_ndjson(chunks):
+        if isinstance(line, list):
+            yield array_key, line
+        elif isinstance(line, dict):
+            for key, value in line.items():
+                if key == array_key and isinstance(value, list):
+                    for item in value:
+                        yield array_key, item
+                else:
+                    yield key, value
+        else:
+            raise ValueError("NDJSON lines must be arrays or objects")
+
+
+class ChunkPipe:
+    """Hands request body chunks from the event loop to a consumer thread, with a
+    bounded buffer so a slow consumer applies backpressure to the upload."""
+
+    def __init__(self, maxsize: int = 8) -> None:
+        self._queue: queue.Queue[bytes | None] = queue.Queue(maxsize=maxsize)
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    async def _put(self, item: bytes | None, consumer: asyncio.Future[Any]) -> bool:
+        while not consumer.done():
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                await asyncio.sleep(0.005)
+        return False
+
+    async def feed(self, chunks: AsyncIterator[bytes], consumer: asyncio.Future[Any]) -> None:
+        """Copy `chunks` into the pipe until exhausted or `consumer` finishes early."""
+        try:
+            async for chunk in chunks:
+                if chunk and not await self._put(chunk, consumer):
+                    return
+        finally:
+            await self._put(None, consumer)
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.observability import metrics
+
+logger = logging.getLogger("seatalk_bot")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@dataclass(slots=True, eq=False)
+class Job:
+    job_id: str
+    kind: str
+    key: str
+    created_at: float = field(default_factory=time.time)
+    status: str = QUEUED
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    result: Any = None
+    error: str = ""
+    cancel_requested: threading.Event = field(default_factory=threading.Event)
+    future: Future[Any] | None = None
+    callbacks: list[Callable[[Job], None]] = field(default_factory=list)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    def to_dict(self) -> dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "key": self.key,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at or None,
+            "finished_at": self.finished_at or None,
+            "cancel_requested": self.cancel_requested.is_set(),
+            "result": self.result,
+            "error": self.error,
+        }
+        if self.started_at:
+            data["queued_s"] = round(self.started_at - self.created_at, 3)
+        if self.finished_at and self.started_at:
+            data["duration_s"] = round(self.finished_at - self.started_at, 3)
+        return data
+
+
+_current_job: contextvars.ContextVar[Job | None] = contextvars.ContextVar("current_job", default=None)
+
+
+def check_cancelled() -> None:
+    """Raise JobCancelled if the job running on this thread has been asked to stop.
+
+    Long-running job code calls this between phases; it is a no-op outside a job.
+    """
+    job = _current_job.get()
+    if job is not None and job.cancel_requested.is_set():
+        raise JobCancelled(f"job {job.job_id} cancelled")
+
+
+class JobExecutor:
+    """Runs long jobs (e.g. backlog imports) on a dedicated thread pool, away from the
+    webhook workers.
+
+    Jobs are single-flight per (kind, key): submitting while one is queued or running
+    returns the existing job and adds the new completion callback to it. Cancellation
+    drops a queued job immediately and asks a running one to stop at its next
+    `check_cancelled()`.
+    """
+
+    def __init__(self, max_workers: int = 1, history: int = 200, name: str = "jobs") -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._active: dict[tuple[str, str], Job] = {}
+        self._history = history
+
+    def submit(
+        self,
+        kind: str,
+        key: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_done: Callable[[Job], None] | None = None,
+        **kwargs: Any,
+    ) -> tuple[Job, bool]:
+        """Returns `(job, created)`; `created` is False when an identical job was already active."""
+        with self._lock:
+            active = self._active.get((kind, key))
+            if active is not None and not active.done:
+                if on_done is not None:
+                    active.callbacks.append(on_done)
+                return active, False
+            job = Job(job_id=uuid.uuid4().hex[:12], kind=kind, key=key)
+            if on_done is not None:
+                job.callbacks.append(on_done)
+            self._active[(kind, key)] = job
+            self._jobs[job.job_id] = job
+            self._prune()
+            job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+        metrics.BACKGROUND_JOBS.inc(kind, QUEUED)
+        return job, True
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict[str, Any]) -> Any:
+        with self._lock:
+            if job.done:
+                return None
+            job.status = RUNNING
+            job.started_at = time.time()
+        token = _current_job.set(job)
+        try:
+            check_cancelled()
+            job.result = fn(*args, **kwargs)
+            status = SUCCEEDED
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as exc:
+            logger.exception("Job %s (%s %s) failed", job.job_id, job.kind, job.key)
+            job.error = str(exc) or type(exc).__name__
+            status = FAILED
+        finally:
+            _current_job.reset(token)
+        self._finish(job, status)
+        return job.result
+
+    def _finish(self, job: Job, status: str) -> None:
+        with self._lock:
+            job.status = status
+            job.finished_at = time.time()
+            if self._active.get((job.kind, job.key)) is job:
+                del self._active[(job.kind, job.key)]
+            callbacks = list(job.callbacks)
+        metrics.BACKGROUND_JOBS.inc(job.kind, status)
+        if job.started_at:
+            metrics.BACKGROUND_JOB_DURATION.observe(job.finished_at - job.started_at, job.kind)
+        for callback in callbacks:
+            try:
+                callback(job)
+            except Exception:
+                logger.exception("Completion callback failed for job %s", job.job_id)
+
+    def _prune(self) -> None:
+        while len(self._jobs) > self._history:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.done:
+                break
+            del self._jobs[oldest_id]
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, limit: int = 50) -> list[Job]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return jobs[::-1][: max(1, limit)]
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        job.cancel_requested.set()
+        if job.future is not None and job.future.cancel():
+            # Still queued: it will never start, so finish it here.
+            self._finish(job, CANCELLED)
+        return job
+
+    def shutdown(self) -> None:
+        """Cancel queued jobs and ask running ones to stop; does not wait for them."""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if not job.done]
+        for job in jobs:
+            self.cancel(job.job_id)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor: JobExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_job_executor() -> JobExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from app.config import settings
+
+            _executor = JobExecutor(max_workers=settings.background_job_workers, name="background-job")
+        return _executor
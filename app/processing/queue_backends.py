@@ -0,0 +1,691 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from typing import Any
+
+logger = logging.getLogger("seatalk_bot")
+
+# put() outcomes
+QUEUED = "queued"
+DUPLICATE = "duplicate"
+FULL = "full"
+
+# (payload, conversation key, size_bytes, dedup_id)
+PutItem = tuple[dict[str, Any], str, int, str]
+
+
+@dataclass(slots=True)
+class Delivery:
+    message_id: str
+    payload: dict[str, Any]
+    enqueued_at: float
+    size_bytes: int = 0
+    conv_key: str = ""
+    attempts: int = 1
+    lease_token: str = ""
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Delivery:
+        return cls(
+            message_id=str(data["message_id"]),
+            payload=data["payload"],
+            enqueued_at=float(data["enqueued_at"]),
+            size_bytes=int(data.get("size_bytes", 0)),
+            conv_key=str(data.get("conv_key", "")),
+            attempts=int(data.get("attempts", 1)),
+            lease_token=str(data.get("lease_token", "")),
+        )
+
+
+def conversation_key(payload: dict[str, Any]) -> str:
+    """Key used to keep events of one chat in order (same key as chat memory)."""
+    event = payload.get("event", {}) if isinstance(payload.get("event", {}), dict) else {}
+    group = event.get("group", {}) if isinstance(event.get("group", {}), dict) else {}
+    message = event.get("message", {}) if isinstance(event.get("message", {}), dict) else {}
+    sender = message.get("sender", {}) if isinstance(message.get("sender", {}), dict) else {}
+    group_id = str(event.get("group_id", "") or group.get("group_id", "") or "")
+    if group_id:
+        return f"group:{group_id}"
+    employee_code = str(event.get("employee_code", "") or sender.get("employee_code", "") or "")
+    return f"user:{employee_code}" if employee_code else ""
+
+
+class QueueBackend(ABC):
+    """Work queue used by AsyncWebhookProcessor.
+
+    Deliveries are leased to one consumer of the backend's consumer group. Events that
+    share a conversation key are leased one at a time in enqueue order. Unacked leases
+    become visible again after the visibility timeout (shared backends only).
+    """
+
+    name = "abstract"
+    # Shared backends are visible to other instances: a drain leaves queued work in
+    # place and releases in-flight leases instead of spooling them locally.
+    shared = False
+
+    @abstractmethod
+    async def put(self, payload: dict[str, Any], key: str = "", size_bytes: int = 0, dedup_id: str = "") -> str:
+        ...
+
+    async def put_many(self, items: list[PutItem]) -> list[str]:
+        return [await self.put(payload, key, size_bytes, dedup_id) for payload, key, size_bytes, dedup_id in items]
+
+    @abstractmethod
+    async def get(self, consumer: str) -> Delivery:
+        ...
+
+    @abstractmethod
+    async def ack(self, delivery: Delivery) -> None:
+        ...
+
+    @abstractmethod
+    async def nack(self, delivery: Delivery, delay_s: float = 0.0) -> None:
+        ...
+
+    @abstractmethod
+    def depth(self) -> int:
+        ...
+
+    def depth_bytes(self) -> int:
+        return 0
+
+    async def refresh_stats(self) -> None:
+        return None
+
+    async def join(self) -> None:
+        """Wait until every local delivery has been acked (in-process backends only)."""
+        return None
+
+    def drain_pending(self) -> list[Delivery]:
+        """Remove and return deliveries nobody has leased yet (in-process backends only)."""
+        return []
+
+    async def close(self) -> None:
+        return None
+
+
+class _RecentIds:
+    def __init__(self, window_s: float) -> None:
+        self.window_s = window_s
+        self._seen: OrderedDict[str, float] = OrderedDict()
+
+    def seen(self, dedup_id: str) -> bool:
+        if not dedup_id or self.window_s <= 0:
+            return False
+        now = time.time()
+        while self._seen:
+            oldest_id, seen_at = next(iter(self._seen.items()))
+            if now - seen_at <= self.window_s:
+                break
+            self._seen.pop(oldest_id)
+        if dedup_id in self._seen:
+            return True
+        self._seen[dedup_id] = now
+        return False
+
+
+class InMemoryQueueBackend(QueueBackend):
+    """Single-process queue; must be used from the event loop thread."""
+
+    name = "memory"
+
+    def __init__(self, max_size: int = 1000, dedup_window_s: float = 0.0) -> None:
+        self.max_size = max_size
+        self._pending: deque[Delivery] = deque()
+        self._leased: dict[str, Delivery] = {}
+        self._leased_keys: set[str] = set()
+        self._bytes = 0
+        self._ids = itertools.count(1)
+        self._recent = _RecentIds(dedup_window_s)
+        self._changed = asyncio.Condition()
+        self._all_done = asyncio.Event()
+        self._all_done.set()
+
+    async def put(self, payload: dict[str, Any], key: str = "", size_bytes: int = 0, dedup_id: str = "") -> str:
+        if self.max_size > 0 and len(self._pending) >= self.max_size:
+            return FULL
+        if self._recent.seen(dedup_id):
+            return DUPLICATE
+        delivery = Delivery(str(next(self._ids)), payload, time.time(), size_bytes, key)
+        self._pending.append(delivery)
+        self._bytes += size_bytes
+        self._all_done.clear()
+        async with self._changed:
+            self._changed.notify()
+        return QUEUED
+
+    async def get(self, consumer: str) -> Delivery:
+        async with self._changed:
+            while True:
+                delivery = self._take_ready()
+                if delivery is not None:
+                    return delivery
+                await self._changed.wait()
+
+    def _take_ready(self) -> Delivery | None:
+        for idx, delivery in enumerate(self._pending):
+            if delivery.conv_key and delivery.conv_key in self._leased_keys:
+                continue
+            del self._pending[idx]
+            self._bytes -= delivery.size_bytes
+            self._leased[delivery.message_id] = delivery
+            if delivery.conv_key:
+                self._leased_keys.add(delivery.conv_key)
+            return delivery
+        return None
+
+    async def ack(self, delivery: Delivery) -> None:
+        self._release(delivery)
+        if not self._pending and not self._leased:
+            self._all_done.set()
+        # A finished conversation may unblock the next event for the same key.
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def nack(self, delivery: Delivery, delay_s: float = 0.0) -> None:
+        if self._release(delivery):
+            delivery.attempts += 1
+            self._pending.appendleft(delivery)
+            self._bytes += delivery.size_bytes
+        async with self._changed:
+            self._changed.notify_all()
+
+    def _release(self, delivery: Delivery) -> bool:
+        if self._leased.pop(delivery.message_id, None) is None:
+            return False
+        if delivery.conv_key:
+            self._leased_keys.discard(delivery.conv_key)
+        return True
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def depth_bytes(self) -> int:
+        return self._bytes
+
+    async def join(self) -> None:
+        await self._all_done.wait()
+
+    def drain_pending(self) -> list[Delivery]:
+        pending = list(self._pending)
+        self._pending.clear()
+        self._bytes = 0
+        if not self._leased:
+            self._all_done.set()
+        return pending
+
+
+_SCHEMA = """
+create table if not exists queue_groups (
+  name text primary key
+);
+create table if not exists queue_messages (
+  id integer primary key autoincrement,
+  conv_key text not null default '',
+  payload text not null,
+  size_bytes integer not null default 0,
+  enqueued_at real not null
+);
+create table if not exists queue_deliveries (
+  group_name text not null,
+  message_id integer not null,
+  conv_key text not null default '',
+  visible_at real not null default 0,
+  leased_by text,
+  lease_token text,
+  attempts integer not null default 0,
+  primary key (group_name, message_id)
+);
+create index if not exists idx_queue_deliveries_ready
+  on queue_deliveries (group_name, visible_at, message_id);
+create index if not exists idx_queue_deliveries_conv
+  on queue_deliveries (group_name, conv_key, message_id);
+create table if not exists queue_dedup (
+  dedup_id text primary key,
+  seen_at real not null
+);
+create table if not exists queue_dead_letters (
+  group_name text not null,
+  message_id integer not null,
+  payload text not null,
+  attempts integer not null,
+  failed_at real not null
+);
+"""
+
+
+class SQLiteQueueStore:
+    """Synchronous SQLite-backed queue shared by every process that opens the same file.
+
+    `put` fans a message out to every registered consumer group; within a group each
+    delivery is leased to a single consumer until acked or its visibility timeout passes.
+    Only the oldest delivery of a conversation key is leasable, which keeps per-chat order.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        group: str = "default",
+        visibility_timeout_s: float = 300.0,
+        max_attempts: int = 5,
+        dedup_window_s: float = 600.0,
+        max_size: int = 0,
+    ) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.group = group
+        self.visibility_timeout_s = visibility_timeout_s
+        self.max_attempts = max_attempts
+        self.dedup_window_s = dedup_window_s
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=normal")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute("insert or ignore into queue_groups (name) values (?)", (group,))
+        self._last_dedup_prune = 0.0
+
+    def put(self, payload: dict[str, Any], key: str = "", size_bytes: int = 0, dedup_id: str = "") -> tuple[str, str]:
+        return self.put_many([(payload, key, size_bytes, dedup_id)])[0]
+
+    def put_many(self, items: list[PutItem]) -> list[tuple[str, str]]:
+        """Insert several messages in one transaction; returns (status, message_id) per item."""
+        now = time.time()
+        results: list[tuple[str, str]] = []
+        with self._lock:
+            conn = self._conn
+            conn.execute("begin immediate")
+            try:
+                depth = 0
+                if self.max_size > 0:
+                    (depth,) = conn.execute(
+                        "select count(*) from queue_deliveries where group_name = ?", (self.group,)
+                    ).fetchone()
+                if self.dedup_window_s > 0 and now - self._last_dedup_prune > 60:
+                    conn.execute("delete from queue_dedup where seen_at < ?", (now - self.dedup_window_s,))
+                    self._last_dedup_prune = now
+                for payload, key, size_bytes, dedup_id in items:
+                    if self.max_size > 0 and depth >= self.max_size:
+                        results.append((FULL, ""))
+                        continue
+                    if dedup_id and self.dedup_window_s > 0:
+                        inserted = conn.execute(
+                            "insert or ignore into queue_dedup (dedup_id, seen_at) values (?, ?)", (dedup_id, now)
+                        ).rowcount
+                        if not inserted:
+                            results.append((DUPLICATE, ""))
+                            continue
+                    cursor = conn.execute(
+                        "insert into queue_messages (conv_key, payload, size_bytes, enqueued_at) values (?, ?, ?, ?)",
+                        (key, json.dumps(payload, ensure_ascii=False, separators=(",", ":")), size_bytes, now),
+                    )
+                    message_id = cursor.lastrowid
+                    conn.execute(
+                        "insert into queue_deliveries (group_name, message_id, conv_key) "
+                        "select name, ?, ? from queue_groups",
+                        (message_id, key),
+                    )
+                    depth += 1
+                    results.append((QUEUED, str(message_id)))
+                conn.execute("commit")
+            except Exception:
+                conn.execute("rollback")
+                raise
+        return results
+
+    def lease(self, consumer: str, limit: int = 1) -> list[Delivery]:
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute("begin immediate")
+            try:
+                self._dead_letter_exhausted(now)
+                rows = conn.execute(
+                    """
+                    select d.message_id, m.payload, m.enqueued_at, m.size_bytes, d.conv_key, d.attempts
+                    from queue_deliveries d
+                    join queue_messages m on m.id = d.message_id
+                    where d.group_name = ?
+                      and d.visible_at <= ?
+                      and (
+                        d.conv_key = ''
+                        or d.message_id = (
+                          select min(d2.message_id) from queue_deliveries d2
+                          where d2.group_name = d.group_name and d2.conv_key = d.conv_key
+                        )
+                      )
+                    order by d.message_id
+                    limit ?
+                    """,
+                    (self.group, now, max(limit, 1)),
+                ).fetchall()
+                deliveries: list[Delivery] = []
+                for message_id, payload, enqueued_at, size_bytes, conv_key, attempts in rows:
+                    token = uuid.uuid4().hex
+                    conn.execute(
+                        "update queue_deliveries set visible_at = ?, leased_by = ?, lease_token = ?, "
+                        "attempts = attempts + 1 where group_name = ? and message_id = ?",
+                        (now + self.visibility_timeout_s, consumer, token, self.group, message_id),
+                    )
+                    deliveries.append(
+                        Delivery(
+                            message_id=str(message_id),
+                            payload=json.loads(payload),
+                            enqueued_at=enqueued_at,
+                            size_bytes=size_bytes,
+                            conv_key=conv_key,
+                            attempts=attempts + 1,
+                            lease_token=token,
+                        )
+                    )
+                conn.execute("commit")
+            except Exception:
+                conn.execute("rollback")
+                raise
+        return deliveries
+
+    def _dead_letter_exhausted(self, now: float) -> None:
+        if self.max_attempts <= 0:
+            return
+        exhausted = self._conn.execute(
+            """
+            select d.message_id, m.payload, d.attempts
+            from queue_deliveries d join queue_messages m on m.id = d.message_id
+            where d.group_name = ? and d.visible_at <= ? and d.attempts >= ?
+            """,
+            (self.group, now, self.max_attempts),
+        ).fetchall()
+        for message_id, payload, attempts in exhausted:
+            logger.error("Dead-lettering message_id=%s after %s attempts", message_id, attempts)
+            self._conn.execute(
+                "insert into queue_dead_letters (group_name, message_id, payload, attempts, failed_at) "
+                "values (?, ?, ?, ?, ?)",
+                (self.group, message_id, payload, attempts, now),
+            )
+            self._delete_delivery(message_id)
+
+    def _delete_delivery(self, message_id: int | str) -> None:
+        self._conn.execute(
+            "delete from queue_deliveries where group_name = ? and message_id = ?", (self.group, message_id)
+        )
+        self._conn.execute(
+            "delete from queue_messages where id = ? and not exists "
+            "(select 1 from queue_deliveries where message_id = ?)",
+            (message_id, message_id),
+        )
+
+    def ack(self, message_id: str, lease_token: str) -> bool:
+        with self._lock:
+            conn = self._conn
+            conn.execute("begin immediate")
+            try:
+                owned = conn.execute(
+                    "select 1 from queue_deliveries where group_name = ? and message_id = ? and lease_token = ?",
+                    (self.group, message_id, lease_token),
+                ).fetchone()
+                if owned:
+                    self._delete_delivery(message_id)
+                conn.execute("commit")
+            except Exception:
+                conn.execute("rollback")
+                raise
+        return bool(owned)
+
+    def nack(self, message_id: str, lease_token: str, delay_s: float = 0.0) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "update queue_deliveries set visible_at = ?, leased_by = null, lease_token = null "
+                "where group_name = ? and message_id = ? and lease_token = ?",
+                (time.time() + max(delay_s, 0.0), self.group, message_id, lease_token),
+            )
+        return cursor.rowcount > 0
+
+    def stats(self) -> tuple[int, int]:
+        with self._lock:
+            count, size = self._conn.execute(
+                "select count(*), coalesce(sum(m.size_bytes), 0) from queue_deliveries d "
+                "join queue_messages m on m.id = d.message_id where d.group_name = ?",
+                (self.group,),
+            ).fetchone()
+        return int(count), int(size)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class _PollingBackend(QueueBackend):
+    shared = True
+
+    def __init__(self, poll_interval_s: float = 0.2) -> None:
+        self.poll_interval_s = poll_interval_s
+        self._depth = 0
+        self._bytes = 0
+        self._wakeup = asyncio.Event()
+        self._releases: set[asyncio.Task[None]] = set()
+
+    async def _lease(self, fn: Any, *args: Any) -> list[Delivery]:
+        """Run a blocking lease call in a thread. If the caller is cancelled while the
+        call is still running (a worker being retired), whatever it leases is released
+        right away instead of waiting out its visibility timeout."""
+        call = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+        try:
+            return await asyncio.shield(call)
+        except asyncio.CancelledError:
+            call.add_done_callback(self._release_orphaned)
+            raise
+
+    def _release_orphaned(self, call: asyncio.Future) -> None:
+        if call.cancelled() or call.exception() is not None:
+            return
+        for delivery in call.result():
+            task = asyncio.ensure_future(self._release_quietly(delivery))
+            self._releases.add(task)
+            task.add_done_callback(self._releases.discard)
+
+    async def _release_quietly(self, delivery: Delivery) -> None:
+        try:
+            await self.nack(delivery)
+        except Exception:
+            logger.exception("Failed to release message_id=%s; it returns after its visibility timeout",
+                             delivery.message_id)
+
+    def _notify_local(self) -> None:
+        # Wake local consumers immediately instead of waiting for the next poll.
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    async def _wait_for_work(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_s)
+        except asyncio.TimeoutError:
+            pass
+
+    def _count_queued(self, items: list[PutItem], statuses: list[str]) -> None:
+        queued = [item for item, status in zip(items, statuses) if status == QUEUED]
+        if queued:
+            self._depth += len(queued)
+            self._bytes += sum(item[2] for item in queued)
+            self._notify_local()
+
+    def _leased(self, delivery: Delivery) -> Delivery:
+        # Local estimate between refresh_stats() calls.
+        self._depth = max(self._depth - 1, 0)
+        self._bytes = max(self._bytes - delivery.size_bytes, 0)
+        return delivery
+
+    def depth(self) -> int:
+        return self._depth
+
+    def depth_bytes(self) -> int:
+        return self._bytes
+
+
+class SQLiteQueueBackend(_PollingBackend):
+    name = "sqlite"
+
+    def __init__(self, store: SQLiteQueueStore, poll_interval_s: float = 0.2) -> None:
+        super().__init__(poll_interval_s)
+        self.store = store
+
+    async def put(self, payload: dict[str, Any], key: str = "", size_bytes: int = 0, dedup_id: str = "") -> str:
+        return (await self.put_many([(payload, key, size_bytes, dedup_id)]))[0]
+
+    async def put_many(self, items: list[PutItem]) -> list[str]:
+        results = await asyncio.to_thread(self.store.put_many, items)
+        statuses = [status for status, _ in results]
+        self._count_queued(items, statuses)
+        return statuses
+
+    async def get(self, consumer: str) -> Delivery:
+        while True:
+            deliveries = await self._lease(self.store.lease, consumer, 1)
+            if deliveries:
+                return self._leased(deliveries[0])
+            await self._wait_for_work()
+
+    async def ack(self, delivery: Delivery) -> None:
+        await asyncio.to_thread(self.store.ack, delivery.message_id, delivery.lease_token)
+        self._notify_local()
+
+    async def nack(self, delivery: Delivery, delay_s: float = 0.0) -> None:
+        await asyncio.to_thread(self.store.nack, delivery.message_id, delivery.lease_token, delay_s)
+        self._notify_local()
+
+    async def refresh_stats(self) -> None:
+        self._depth, self._bytes = await asyncio.to_thread(self.store.stats)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self.store.close)
+
+
+class HttpQueueBackend(_PollingBackend):
+    """Client for the queue service in `app.processing.queue_server`."""
+
+    name = "http"
+
+    def __init__(
+        self,
+        base_url: str,
+        group: str = "default",
+        token: str = "",
+        long_poll_s: float = 10.0,
+        timeout_s: float = 15.0,
+    ) -> None:
+        super().__init__(poll_interval_s=0.0)
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.group = group
+        self.long_poll_s = long_poll_s
+        self.timeout_s = timeout_s
+        self.session = requests.Session()
+        if token:
+            self.session.headers["X-Queue-Token"] = token
+
+    def _call(self, path: str, body: dict[str, Any], timeout_s: float | None = None) -> dict[str, Any]:
+        response = self.session.post(
+            f"{self.base_url}{path}",
+            json={"group": self.group, **body},
+            timeout=timeout_s or self.timeout_s,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def put(self, payload: dict[str, Any], key: str = "", size_bytes: int = 0, dedup_id: str = "") -> str:
+        return (await self.put_many([(payload, key, size_bytes, dedup_id)]))[0]
+
+    async def put_many(self, items: list[PutItem]) -> list[str]:
+        messages = [
+            {"payload": payload, "key": key, "size_bytes": size_bytes, "dedup_id": dedup_id}
+            for payload, key, size_bytes, dedup_id in items
+        ]
+        data = await asyncio.to_thread(self._call, "/v1/put", {"messages": messages})
+        statuses = [str(status) for status in data.get("statuses", [])]
+        statuses += [FULL] * (len(items) - len(statuses))
+        self._count_queued(items, statuses)
+        return statuses
+
+    def _lease_call(self, consumer: str) -> list[Delivery]:
+        data = self._call(
+            "/v1/lease",
+            {"consumer": consumer, "limit": 1, "wait_s": self.long_poll_s},
+            self.long_poll_s + self.timeout_s,
+        )
+        return [Delivery.from_dict(item) for item in data.get("deliveries") or []]
+
+    async def get(self, consumer: str) -> Delivery:
+        while True:
+            try:
+                deliveries = await self._lease(self._lease_call, consumer)
+            except Exception:
+                logger.exception("Queue lease request failed; retrying")
+                await asyncio.sleep(1.0)
+                continue
+            if deliveries:
+                return self._leased(deliveries[0])
+
+    async def ack(self, delivery: Delivery) -> None:
+        await asyncio.to_thread(
+            self._call, "/v1/ack", {"message_id": delivery.message_id, "lease_token": delivery.lease_token}
+        )
+
+    async def nack(self, delivery: Delivery, delay_s: float = 0.0) -> None:
+        await asyncio.to_thread(
+            self._call,
+            "/v1/nack",
+            {"message_id": delivery.message_id, "lease_token": delivery.lease_token, "delay_s": delay_s},
+        )
+
+    async def refresh_stats(self) -> None:
+        data = await asyncio.to_thread(self._call, "/v1/stats", {})
+        self._depth = int(data.get("depth", 0))
+        self._bytes = int(data.get("bytes", 0))
+
+    async def close(self) -> None:
+        self.session.close()
+
+
+def build_queue_backend(settings: Any) -> QueueBackend:
+    kind = settings.webhook_queue_backend.strip().lower()
+    if kind == "sqlite":
+        store = SQLiteQueueStore(
+            settings.webhook_queue_sqlite_path,
+            group=settings.webhook_queue_group,
+            visibility_timeout_s=settings.webhook_queue_visibility_timeout_s,
+            max_attempts=settings.webhook_queue_max_attempts,
+            dedup_window_s=settings.webhook_queue_dedup_window_s,
+            max_size=settings.webhook_queue_maxsize,
+        )
+        return SQLiteQueueBackend(store, poll_interval_s=settings.webhook_queue_poll_interval_s)
+    if kind == "http":
+        if not settings.webhook_queue_url:
+            raise RuntimeError("WEBHOOK_QUEUE_URL must be set for the http queue backend")
+        return HttpQueueBackend(
+            settings.webhook_queue_url,
+            group=settings.webhook_queue_group,
+            token=settings.webhook_queue_token,
+        )
+    if kind != "memory":
+        raise RuntimeError(f"Unknown WEBHOOK_QUEUE_BACKEND: {settings.webhook_queue_backend}")
+    return InMemoryQueueBackend(
+        max_size=settings.webhook_queue_maxsize,
+        dedup_window_s=settings.webhook_queue_dedup_window_s,
+    )
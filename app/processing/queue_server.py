@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import argparse
+import hmac
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from app.processing.queue_backends import SQLiteQueueStore
+
+logger = logging.getLogger("seatalk_bot")
+
+
+class QueueService:
+    """Shared webhook queue for several bot instances, served over HTTP by `serve()`.
+
+    Backed by SQLiteQueueStore, so delivery semantics (consumer groups, visibility
+    timeouts, per-conversation ordering, dedup) match WEBHOOK_QUEUE_BACKEND=sqlite.
+    """
+
+    def __init__(self, path: str, visibility_timeout_s: float = 300.0, max_attempts: int = 5,
+                 dedup_window_s: float = 600.0, max_size: int = 0, token: str = "") -> None:
+        self.path = path
+        self.token = token
+        self._options = {
+            "visibility_timeout_s": visibility_timeout_s,
+            "max_attempts": max_attempts,
+            "dedup_window_s": dedup_window_s,
+            "max_size": max_size,
+        }
+        self._stores: dict[str, SQLiteQueueStore] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+
+    def store(self, group: str) -> SQLiteQueueStore:
+        with self._lock:
+            store = self._stores.get(group)
+            if store is None:
+                store = SQLiteQueueStore(self.path, group=group, **self._options)
+                self._stores[group] = store
+            return store
+
+    def handle(self, route: str, body: dict[str, Any]) -> dict[str, Any] | None:
+        store = self.store(str(body.get("group") or "default"))
+        if route == "/v1/put":
+            messages = body.get("messages")
+            if messages is None:
+                messages = [body]
+            results = store.put_many([
+                (
+                    message.get("payload") or {},
+                    str(message.get("key", "")),
+                    int(message.get("size_bytes", 0)),
+                    str(message.get("dedup_id", "")),
+                )
+                for message in messages
+            ])
+            self._notify()
+            return {
+                "statuses": [status for status, _ in results],
+                "message_ids": [message_id for _, message_id in results],
+            }
+        if route == "/v1/lease":
+            return {"deliveries": [d.to_dict() for d in self._lease(store, body)]}
+        if route == "/v1/ack":
+            acked = store.ack(str(body["message_id"]), str(body.get("lease_token", "")))
+            self._notify()
+            return {"ok": acked}
+        if route == "/v1/nack":
+            released = store.nack(
+                str(body["message_id"]), str(body.get("lease_token", "")), float(body.get("delay_s", 0.0))
+            )
+            self._notify()
+            return {"ok": released}
+        if route == "/v1/stats":
+            depth, size = store.stats()
+            return {"depth": depth, "bytes": size}
+        return None
+
+    def _lease(self, store: SQLiteQueueStore, body: dict[str, Any]):
+        consumer = str(body.get("consumer", ""))
+        limit = int(body.get("limit", 1))
+        deadline = time.monotonic() + min(max(float(body.get("wait_s", 0.0)), 0.0), 30.0)
+        while True:
+            deliveries = store.lease(consumer, limit)
+            remaining = deadline - time.monotonic()
+            if deliveries or remaining <= 0:
+                return deliveries
+            # Long poll: woken by put/ack/nack, with a timeout for expiring leases.
+            with self._changed:
+                self._changed.wait(timeout=min(remaining, 1.0))
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+
+def _make_handler(service: QueueService) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            if service.token and not hmac.compare_digest(self.headers.get("X-Queue-Token", ""), service.token):
+                self._reply(401, {"error": "unauthorized"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", "0"))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                result = service.handle(self.path, body)
+            except (KeyError, ValueError) as exc:
+                self._reply(400, {"error": f"bad request: {exc}"})
+                return
+            except Exception as exc:
+                logger.exception("Queue request failed: %s", self.path)
+                self._reply(500, {"error": str(exc)})
+                return
+            if result is None:
+                self._reply(404, {"error": "not found"})
+            else:
+                self._reply(200, result)
+
+        def _reply(self, status: int, content: dict[str, Any]) -> None:
+            data = json.dumps(content, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug("queue %s - %s", self.address_string(), format % args)
+
+    return Handler
+
+
+def serve(service: QueueService, host: str = "127.0.0.1", port: int = 8790) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the shared webhook queue service.")
+    parser.add_argument("--path", default="data/webhook_queue.sqlite3")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--token", default="")
+    parser.add_argument("--visibility-timeout", type=float, default=300.0)
+    parser.add_argument("--max-attempts", type=int, default=5)
+    parser.add_argument("--max-size", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+    service = QueueService(
+        args.path,
+        visibility_timeout_s=args.visibility_timeout,
+        max_attempts=args.max_attempts,
+        max_size=args.max_size,
+        token=args.token,
+    )
+    server = serve(service, args.host, args.port)
+    logger.info("Queue service listening on %s:%s (%s)", args.host, args.port, args.path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
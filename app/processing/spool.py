@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from typing import Any
+
+logger = logging.getLogger("seatalk_bot")
+
+
+class EventSpool:
+    """Append-only JSONL store for events handed off during a drain.
+
+    `take()` atomically claims the current file by renaming it, so a crash while
+    re-enqueueing leaves a `.claimed` file that is picked up on the next start.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append_many(self, payloads: list[dict[str, Any]]) -> int:
+        if not payloads:
+            return 0
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                for payload in payloads:
+                    f.write(json.dumps(payload, ensure_ascii=False, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        return len(payloads)
+
+    def take(self) -> list[dict[str, Any]]:
+        claimed = f"{self.path}.claimed"
+        payloads: list[dict[str, Any]] = []
+        with self._lock:
+            sources = [p for p in (claimed, self.path) if os.path.exists(p)]
+            for source in sources:
+                with open(source, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            payloads.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            logger.error("Skipping corrupt spool line in %s", source)
+            if not sources:
+                return []
+            # Re-write everything into the claim file before removing the originals.
+            tmp = f"{claimed}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for payload in payloads:
+                    f.write(json.dumps(payload, ensure_ascii=False, separators=(",", ":")) + "\n")
+            os.replace(tmp, claimed)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        return payloads
+
+    def commit_take(self) -> None:
+        with self._lock:
+            claimed = f"{self.path}.claimed"
+            if os.path.exists(claimed):
+                os.remove(claimed)
@@ -5,13 +5,15 @@ from typing import Any
 import requests
 
 from app.config import settings
+from app.observability import metrics
 
 
 class SeaTalkAuthManager:
-    def __init__(self) -> None:
+    def __init__(self, session: requests.Session | None = None) -> None:
         self._access_token: str | None = None
         self._expires_at: float = 0.0
         self._lock = threading.Lock()
+        self.session = session or requests.Session()
 
     def get_token(self) -> str:
         with self._lock:
@@ -24,7 +26,11 @@ class SeaTalkAuthManager:
                 "app_id": settings.seatalk_app_id,
                 "app_secret": settings.seatalk_app_secret,
             }
-            data = self._fetch_token_payload(payload)
+            try:
+                data = self._fetch_token_payload(payload)
+            except Exception:
+                metrics.SEATALK_AUTH_REFRESHES.inc("error")
+                raise
 
             token = (
                 data.get("app_access_token")
@@ -44,8 +50,10 @@ class SeaTalkAuthManager:
                 )
 
             if not token:
+                metrics.SEATALK_AUTH_REFRESHES.inc("error")
                 raise RuntimeError(f"SeaTalk auth response missing token: {data}")
 
+            metrics.SEATALK_AUTH_REFRESHES.inc("ok")
             self._access_token = str(token)
             self._expires_at = now + int(expires_in)
             return self._access_token
@@ -62,14 +70,14 @@ class SeaTalkAuthManager:
         fallback_url = "https://openapi.seatalk.io/auth/app_access_token"
 
         try:
-            response = requests.post(primary_url, json=payload, timeout=15)
+            response = self.session.post(primary_url, json=payload, timeout=15)
             response.raise_for_status()
             return response.json()
         except requests.HTTPError as exc:
             status_code = exc.response.status_code if exc.response is not None else None
             # Compatibility fallback for outdated auth URL configuration.
             if status_code == 404 and primary_url != fallback_url:
-                response = requests.post(fallback_url, json=payload, timeout=15)
+                response = self.session.post(fallback_url, json=payload, timeout=15)
                 response.raise_for_status()
                 return response.json()
             raise
@@ -1,21 +1,105 @@
+import random
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Any
+from urllib.parse import urlsplit
 
 import requests
+import urllib3
 
 from app.config import settings
+from app.observability import metrics, tracing
 from app.seatalk.auth import SeaTalkAuthManager
+from app.seatalk.images import get_image_optimizer
+
+
+# Throttled (429) or refused while overloaded (503): the message was not delivered, so
+# resending is safe. Other 5xx and read timeouts may follow a delivered message, and
+# retrying them could post it to the group twice.
+BROADCAST_RETRY_STATUSES = {429, 503}
+# requests' default per-host connection pool; more threads would just queue for a socket.
+MAX_BROADCAST_CONCURRENCY = 10
+
+
+@dataclass(slots=True)
+class BroadcastResult:
+    group_id: str
+    ok: bool = False
+    sent: int = 0
+    attempts: int = 0
+    status_code: int | None = None
+    error: str = ""
+    seconds: float = 0.0
+    responses: list[dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "group_id": self.group_id,
+            "ok": self.ok,
+            "sent": self.sent,
+            "attempts": self.attempts,
+            "status_code": self.status_code,
+            "error": self.error,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def _failed_before_send(exc: requests.ConnectionError) -> bool:
+    """True when the connection could not be opened, so no request reached SeaTalk."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+class _RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads (rate <= 0 disables)."""
+
+    def __init__(self, rate_per_s: float) -> None:
+        self.interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _prepare_message(message: dict[str, Any]) -> dict[str, Any]:
+    """Shrink image payloads (see app.seatalk.images) before they are sent."""
+    image = message.get("image")
+    if message.get("tag") != "image" or not isinstance(image, dict) or not settings.seatalk_image_optimize:
+        return message
+    content = image.get("content")
+    if not isinstance(content, str) or not content:
+        return message
+    optimized = get_image_optimizer().optimize_base64(content)
+    if optimized is content:
+        return message
+    return {**message, "image": {**image, "content": optimized}}
 
 
 class SeaTalkClient:
-    def __init__(self, auth_manager: SeaTalkAuthManager) -> None:
+    def __init__(self, auth_manager: SeaTalkAuthManager, session: requests.Session | None = None) -> None:
         self.auth_manager = auth_manager
+        # Shares the auth session by default so token fetches warm the same connection pool.
+        self.session = session or auth_manager.session
 
     def send_group_message(self, group_id: str, message: dict[str, Any]) -> dict[str, Any]:
         endpoint = (
             f"{settings.seatalk_api_base_url.rstrip('/')}"
             f"{settings.seatalk_group_message_path}"
         )
-        payload: dict[str, Any] = {"group_id": group_id, "message": message}
+        payload: dict[str, Any] = {"group_id": group_id, "message": _prepare_message(message)}
         return self._post(endpoint, payload)
 
     def send_single_message(self, employee_code: str, message: dict[str, Any]) -> dict[str, Any]:
@@ -23,7 +107,7 @@ class SeaTalkClient:
             f"{settings.seatalk_api_base_url.rstrip('/')}"
             f"{settings.seatalk_single_message_path}"
         )
-        payload: dict[str, Any] = {"employee_code": employee_code, "message": message}
+        payload: dict[str, Any] = {"employee_code": employee_code, "message": _prepare_message(message)}
         return self._post(endpoint, payload)
 
     def send_group_text(self, group_id: str, content: str, thread_id: str = "") -> dict[str, Any]:
@@ -119,12 +203,141 @@ class SeaTalkClient:
             payload["thread_id"] = thread_id
         return self._post(endpoint, payload)
 
-    def _post(self, url: str, payload: dict[str, Any]) -> dict[str, Any]:
-        token = self.auth_manager.get_token()
+    def broadcast_group_messages(
+        self,
+        group_ids: Iterable[str],
+        messages: list[dict[str, Any]],
+        concurrency: int | None = None,
+        rate_per_s: float | None = None,
+        max_retries: int | None = None,
+    ) -> list[BroadcastResult]:
+        """Send `messages`, in order, to every group, with up to `concurrency` groups in
+        flight over the shared session and one access token.
+
+        Only failures where the message cannot have been delivered are retried with
+        backoff, honouring Retry-After: 429 and 503 responses (BROADCAST_RETRY_STATUSES)
+        and connections that could not be opened. Other 5xx responses and read timeouts
+        are not, since resending could post the message twice. A group that still fails
+        stops receiving its remaining messages, but the others carry on. Results come
+        back in `group_ids` order.
+        """
+        group_ids = list(dict.fromkeys(g for g in group_ids if g))
+        if not group_ids or not messages:
+            return [BroadcastResult(group_id=g, ok=True) for g in group_ids]
+        concurrency = concurrency or settings.seatalk_broadcast_concurrency
+        concurrency = max(1, min(concurrency, MAX_BROADCAST_CONCURRENCY, len(group_ids)))
+        limiter = _RateLimiter(settings.seatalk_broadcast_rate_per_s if rate_per_s is None else rate_per_s)
+        retries = settings.seatalk_broadcast_max_retries if max_retries is None else max_retries
+        endpoint = f"{settings.seatalk_api_base_url.rstrip('/')}{settings.seatalk_group_message_path}"
+        # Encode images once for the whole broadcast, not once per group.
+        messages = [_prepare_message(message) for message in messages]
+
+        started = time.perf_counter()
+        with tracing.span("seatalk:auth"):
+            token = self.auth_manager.get_token()
+
+        def send_all(group_id: str) -> BroadcastResult:
+            result = BroadcastResult(group_id=group_id)
+            group_started = time.perf_counter()
+            try:
+                for message in messages:
+                    response = self._post_with_retry(
+                        endpoint, {"group_id": group_id, "message": message}, token, limiter, retries, result
+                    )
+                    result.responses.append(response)
+                    # SeaTalk reports some failures (e.g. bot not in the group) as a non-zero code.
+                    code = response.get("code")
+                    if code not in (None, 0):
+                        raise RuntimeError(f"SeaTalk error code {code}: {response.get('message', '')}".strip())
+                    result.sent += 1
+                result.ok = True
+            except requests.HTTPError as exc:
+                result.status_code = exc.response.status_code if exc.response is not None else None
+                result.error = str(exc)
+            except Exception as exc:
+                result.error = str(exc) or type(exc).__name__
+            result.seconds = time.perf_counter() - group_started
+            metrics.SEATALK_BROADCAST_GROUPS.inc("ok" if result.ok else "failed")
+            return result
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="seatalk-broadcast") as pool:
+            results = list(pool.map(send_all, group_ids))
+        metrics.SEATALK_BROADCAST_DURATION.observe(time.perf_counter() - started)
+        return results
+
+    def broadcast_group_text(self, group_ids: Iterable[str], content: str, **kwargs: Any) -> list[BroadcastResult]:
+        message = {"tag": "text", "text": {"format": 2, "content": content}}
+        return self.broadcast_group_messages(group_ids, [message], **kwargs)
+
+    def broadcast_group_image(
+        self, group_ids: Iterable[str], base64_content: str, **kwargs: Any
+    ) -> list[BroadcastResult]:
+        message = {"tag": "image", "image": {"content": base64_content}}
+        return self.broadcast_group_messages(group_ids, [message], **kwargs)
+
+    def broadcast_group_file(
+        self, group_ids: Iterable[str], base64_content: str, filename: str, **kwargs: Any
+    ) -> list[BroadcastResult]:
+        message = {"tag": "file", "file": {"content": base64_content, "filename": filename}}
+        return self.broadcast_group_messages(group_ids, [message], **kwargs)
+
+    def _post_with_retry(
+        self,
+        url: str,
+        payload: dict[str, Any],
+        token: str,
+        limiter: _RateLimiter,
+        max_retries: int,
+        result: BroadcastResult,
+    ) -> dict[str, Any]:
+        attempt = 0
+        while True:
+            attempt += 1
+            result.attempts += 1
+            limiter.wait()
+            try:
+                response = self._post(url, payload, token=token)
+                result.status_code = 200
+                return response
+            except requests.HTTPError as exc:
+                status = exc.response.status_code if exc.response is not None else None
+                if status not in BROADCAST_RETRY_STATUSES or attempt > max_retries:
+                    raise
+                retry_after = exc.response.headers.get("Retry-After") if exc.response is not None else None
+            except requests.ConnectionError as exc:
+                if not _failed_before_send(exc) or attempt > max_retries:
+                    raise
+                retry_after = None
+            try:
+                delay = float(retry_after) if retry_after is not None else None
+            except ValueError:
+                delay = None
+            if delay is None:
+                delay = min(10.0, 0.5 * 2 ** (attempt - 1)) + random.uniform(0, 0.25)
+            time.sleep(delay)
+
+    def warmup(self) -> None:
+        # Fetching the token opens a pooled connection to the SeaTalk API host.
+        self.auth_manager.get_token()
+
+    def _post(self, url: str, payload: dict[str, Any], token: str | None = None) -> dict[str, Any]:
+        if token is None:
+            with tracing.span("seatalk:auth"):
+                token = self.auth_manager.get_token()
         headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
         }
-        response = requests.post(url, json=payload, headers=headers, timeout=15)
+        path = urlsplit(url).path
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"seatalk:{path}"):
+                response = self.session.post(url, json=payload, headers=headers, timeout=15)
+        except requests.RequestException:
+            metrics.SEATALK_API_RESPONSES.inc(path, "error")
+            raise
+        finally:
+            metrics.SEATALK_API_LATENCY.observe(time.perf_counter() - started, path)
+        metrics.SEATALK_API_RESPONSES.inc(path, str(response.status_code))
         response.raise_for_status()
         return response.json() if response.content else {"ok": True}
@@ -1,19 +1,51 @@
 from __future__ import annotations
 
 import logging
-from typing import Any
+import threading
+import time
+from typing import TYPE_CHECKING, Any
 
+from app.observability import metrics, tracing
 from app.seatalk.client import SeaTalkClient
-from app.workflows.chat.workflow import ChatWorkflow
-from app.workflows.manager import AutomationWorkflowManager
+
+if TYPE_CHECKING:
+    from app.workflows.chat.workflow import ChatWorkflow
+    from app.workflows.manager import AutomationWorkflowManager
 
 logger = logging.getLogger("seatalk_bot")
 
 
 class SeaTalkEventRouter:
     def __init__(self, seatalk_client: SeaTalkClient) -> None:
-        self.automation_workflow_manager = AutomationWorkflowManager(seatalk_client)
-        self.chat_workflow = ChatWorkflow(seatalk_client)
+        self.seatalk_client = seatalk_client
+        self._automation_workflow_manager: AutomationWorkflowManager | None = None
+        self._chat_workflow: ChatWorkflow | None = None
+        self._init_lock = threading.Lock()
+
+    # Workflows are built on first use (or by warmup) to keep app import and startup fast.
+    @property
+    def automation_workflow_manager(self) -> AutomationWorkflowManager:
+        if self._automation_workflow_manager is None:
+            with self._init_lock:
+                if self._automation_workflow_manager is None:
+                    from app.workflows.manager import AutomationWorkflowManager
+
+                    self._automation_workflow_manager = AutomationWorkflowManager(self.seatalk_client)
+        return self._automation_workflow_manager
+
+    @property
+    def chat_workflow(self) -> ChatWorkflow:
+        if self._chat_workflow is None:
+            with self._init_lock:
+                if self._chat_workflow is None:
+                    from app.workflows.chat.workflow import ChatWorkflow
+
+                    self._chat_workflow = ChatWorkflow(self.seatalk_client)
+        return self._chat_workflow
+
+    def warmup(self) -> None:
+        _ = self.automation_workflow_manager
+        _ = self.chat_workflow
 
     def handle_event(self, payload: dict[str, Any]) -> None:
         event_type = str(payload.get("event_type", "") or "")
@@ -26,9 +58,14 @@ class SeaTalkEventRouter:
 
         # Chat workflow handles AI conversational response events.
         if self.chat_workflow.supports(event_type):
+            started = time.perf_counter()
             try:
-                self.chat_workflow.process(payload)
+                with tracing.span("workflow:chat"):
+                    self.chat_workflow.process(payload)
             except Exception:
+                metrics.WORKFLOW_ERRORS.inc("chat")
                 logger.exception("chat_workflow failed for event_type=%s", event_type)
+            finally:
+                metrics.WORKFLOW_DURATION.observe(time.perf_counter() - started, "chat")
         else:
             logger.info("No chat workflow for event_type=%s", event_type)
@@ -0,0 +1,134 @@
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import threading
+from collections import OrderedDict
+
+from app.observability import metrics
+
+logger = logging.getLogger("seatalk_bot")
+
+# JPEG qualities tried, best first, when a palette PNG is still over the target.
+JPEG_QUALITIES = (85, 75, 65)
+# Each further round shrinks the image by this factor, at most MAX_SHRINK_ROUNDS times.
+SHRINK_FACTOR = 0.8
+MAX_SHRINK_ROUNDS = 4
+
+
+class ImageOptimizer:
+    """Downscales and recompresses outbound base64 images to about `target_bytes`.
+
+    Results are cached by a hash of the input, so a dashboard broadcast to many
+    groups, or re-sent later, is encoded once. Images that already fit are passed
+    through untouched. Without Pillow everything is passed through.
+    """
+
+    def __init__(self, target_bytes: int = 1_000_000, max_side: int = 2048, cache_size: int = 32) -> None:
+        self.target_bytes = max(1, target_bytes)
+        self.max_side = max(1, max_side)
+        self.cache_size = max(0, cache_size)
+        self._cache: OrderedDict[bytes, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def optimize_base64(self, content: str) -> str:
+        key = hashlib.blake2b(content.encode("ascii", "ignore"), digest_size=16).digest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        if cached is not None:
+            metrics.SEATALK_IMAGE_CACHE.inc("hit")
+            return cached
+        metrics.SEATALK_IMAGE_CACHE.inc("miss")
+
+        optimized = self._encode(content)
+        if self.cache_size:
+            with self._lock:
+                self._cache[key] = optimized
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return optimized
+
+    def _encode(self, content: str) -> str:
+        try:
+            raw = base64.b64decode(content, validate=True)
+        except (binascii.Error, ValueError):
+            return content
+        try:
+            from PIL import Image
+        except ImportError:
+            return content
+        try:
+            image = Image.open(io.BytesIO(raw))
+            image.load()
+        except Exception:
+            logger.warning("Outbound image is not decodable; sending it unchanged")
+            return content
+        if len(raw) <= self.target_bytes and max(image.size) <= self.max_side:
+            return content
+
+        best = raw
+        image = _flatten(image)
+        if max(image.size) > self.max_side:
+            image.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+        for _ in range(MAX_SHRINK_ROUNDS + 1):
+            for candidate in _candidates(image):
+                if len(candidate) < len(best):
+                    best = candidate
+                if len(candidate) <= self.target_bytes:
+                    return self._finish(raw, candidate)
+            width, height = image.size
+            size = (max(1, int(width * SHRINK_FACTOR)), max(1, int(height * SHRINK_FACTOR)))
+            image = image.resize(size, Image.LANCZOS)
+        return self._finish(raw, best)
+
+    @staticmethod
+    def _finish(raw: bytes, encoded: bytes) -> str:
+        metrics.SEATALK_IMAGE_BYTES.inc("in", amount=len(raw))
+        metrics.SEATALK_IMAGE_BYTES.inc("out", amount=len(encoded))
+        return base64.b64encode(encoded).decode("ascii")
+
+
+def _flatten(image):
+    """RGB copy of `image`, with any transparency composited onto white."""
+    from PIL import Image
+
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _candidates(image):
+    """Encodings from best-looking to smallest. Dashboards and charts are flat colour,
+    so a 256-colour palette PNG is usually both lossless-looking and the smallest."""
+    out = io.BytesIO()
+    image.quantize(colors=256).save(out, format="PNG", optimize=True)
+    yield out.getvalue()
+    for quality in JPEG_QUALITIES:
+        out = io.BytesIO()
+        image.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+        yield out.getvalue()
+
+
+_optimizer: ImageOptimizer | None = None
+_optimizer_lock = threading.Lock()
+
+
+def get_image_optimizer() -> ImageOptimizer:
+    global _optimizer
+    with _optimizer_lock:
+        if _optimizer is None:
+            from app.config import settings
+
+            _optimizer = ImageOptimizer(
+                target_bytes=settings.seatalk_image_target_bytes,
+                max_side=settings.seatalk_image_max_side,
+                cache_size=settings.seatalk_image_cache_size,
+            )
+        return _optimizer
@@ -1,5 +1,3 @@
-from langgraph.graph import END, START, StateGraph
-
 from app.workflows.automation.nodes import (
     noop_node,
     route_event_node,
@@ -8,14 +6,15 @@ from app.workflows.automation.nodes import (
     set_typing_node,
 )
 from app.workflows.automation.state import AutomationState
+from app.workflows.direct_graph import END, START, new_state_graph
 
 
 def _route_action(state: AutomationState) -> str:
     return str(state.get("action", "noop") or "noop")
 
 
-def build_automation_graph():
-    graph = StateGraph(AutomationState)
+def build_automation_graph(engine: str | None = None):
+    graph = new_state_graph(AutomationState, engine)
 
     graph.add_node("route_event", route_event_node)
     graph.add_node("noop", noop_node)
@@ -1,3 +1,17 @@
-from app.workflows.backlogs.workflow import BacklogsWorkflow
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.workflows.backlogs.workflow import BacklogsWorkflow
 
 __all__ = ["BacklogsWorkflow"]
+
+
+def __getattr__(name: str):
+    # Lazy so parse worker processes importing backlogs_update skip the SeaTalk client.
+    if name == "BacklogsWorkflow":
+        from app.workflows.backlogs.workflow import BacklogsWorkflow
+
+        return BacklogsWorkflow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
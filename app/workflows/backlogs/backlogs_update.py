@@ -1,55 +1,85 @@
+import asyncio
+import bisect
 import csv
 import io
+import itertools
 import logging
+import multiprocessing
+import operator
 import os
+import tempfile
 import zipfile
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from typing import Any
 
 from dotenv import load_dotenv
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload
 
+from app.processing.jobs import check_cancelled
+from app.workflows.backlogs.dashboard import compute_aggregates, publish_aggregates
+from app.workflows.backlogs.env import get_env
+from app.workflows.backlogs.google_clients import drive_client, sheets_client
+from app.workflows.backlogs.import_ledger import FAILED, OK, SKIPPED, get_ledger
+from app.workflows.backlogs.sheet_sync import (
+    DEFAULT_DIFF_MAX_RATIO,
+    SheetSnapshot,
+    load_snapshot,
+    plan_sync,
+    row_fingerprint,
+    save_snapshot,
+)
+from app.workflows.backlogs.sheets_writer import (
+    DEFAULT_CHUNK_BYTES,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_MAX_RETRIES,
+    SheetsRangeWriter,
+    plan_chunks,
+)
+from app.workflows.backlogs.snapshot import SnapshotBuilder, parse_export_datetime, publish_snapshot
+
 logger = logging.getLogger("backlogs_update")
 
 load_dotenv()
 
-SCOPES = [
-    "https://www.googleapis.com/auth/drive.readonly",
-    "https://www.googleapis.com/auth/spreadsheets",
-]
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Below this much uncompressed CSV, process start-up costs more than it saves.
+PARALLEL_PARSE_MIN_BYTES = 32 * 1024 * 1024
 
+# Config-sheet cell holding the token of the snapshot matching the data sheet.
+SNAPSHOT_TOKEN_CELL = "G1"
 
-def _get_env(name, default=None):
-    value = os.environ.get(name)
-    return value if value not in (None, "") else default
+# Export columns written to the sheet / Supabase, in output order.
+OUTPUT_COLUMNS = (
+    "TO Number",
+    "SPX Tracking Number",
+    "Receiver Name",
+    "TO Order Quantity",
+    "Operator",
+    "Create Time",
+    "Complete Time",
+    "Remark",
+    "Receive Status",
+    "Staging Area ID",
+)
+OPTIONAL_COLUMNS = {"Remark"}
+# Rows are kept when receiver type == "station" and current station == "soc 5".
+FILTER_COLUMNS = ("Receiver type", "Current Station")
 
 
-def _load_credentials():
-    cred_path = _get_env("GOOGLE_SERVICE_ACCOUNT_FILE", "service_account.json")
-    if not os.path.exists(cred_path):
-        raise RuntimeError(
-            f"Service account file not found at {cred_path}. "
-            "Set GOOGLE_SERVICE_ACCOUNT_FILE to the correct path."
-        )
-    try:
-        return service_account.Credentials.from_service_account_file(
-            cred_path, scopes=SCOPES
-        )
-    except Exception as exc:
-        raise RuntimeError(
-            "Invalid service account JSON. Ensure the file is a Google "
-            "service account key (type=service_account)."
-        ) from exc
+def _truthy(value: str) -> bool:
+    return value.lower() not in ("0", "false", "no")
 
 
-def _build_drive_service(creds):
-    return build("drive", "v3", credentials=creds, cache_discovery=False)
-
-
-def _build_sheets_service(creds):
-    return build("sheets", "v4", credentials=creds, cache_discovery=False)
+def _snapshot_enabled(streamed: bool = False) -> bool:
+    """BACKLOGS_SNAPSHOT (on by default) covers Drive imports. Building one from a
+    streamed upload keeps every row in memory, so that also needs BACKLOGS_STREAM_SNAPSHOT=1."""
+    enabled = _truthy(get_env("BACKLOGS_SNAPSHOT", "1"))
+    if streamed:
+        enabled = enabled and _truthy(get_env("BACKLOGS_STREAM_SNAPSHOT", "0"))
+    return enabled
 
 
 def _looks_utf16le(buf: bytes) -> bool:
@@ -62,157 +92,317 @@ def _looks_utf16le(buf: bytes) -> bool:
     return nulls > probe_len * 0.2
 
 
-def _normalize_text(text: str) -> str:
-    return text.replace("\x00", "").replace("\r\n", "\n").replace("\r", "\n")
-
-
 def _strip_bom(s: str) -> str:
     return s.replace("\ufeff", "", 1) if isinstance(s, str) else s
 
 
-def _find_key(row: dict, wanted: str):
-    w = wanted.replace(" ", "").replace("_", "").lower()
-    for k in row.keys():
-        nk = _strip_bom(k).replace(" ", "").replace("_", "").lower()
-        if nk == w:
-            return k
-    return None
+def _normalize_column(name: str) -> str:
+    return _strip_bom(name).replace(" ", "").replace("_", "").lower()
 
 
-def _local_datetime(tz_name: str) -> str:
+def _resolve_columns(header: list[str]) -> tuple[int, int, tuple[int, ...]]:
+    """Map the export header to (receiver type idx, current station idx, output idxs).
+
+    Names match ignoring BOM, spaces, underscores and case; optional output columns
+    that are missing map to -1."""
+    positions: dict[str, int] = {}
+    for idx, name in enumerate(header):
+        positions.setdefault(_normalize_column(name), idx)
+
+    def index_of(name: str) -> int:
+        return positions.get(_normalize_column(name), -1)
+
+    missing = [
+        name
+        for name in OUTPUT_COLUMNS + FILTER_COLUMNS
+        if name not in OPTIONAL_COLUMNS and index_of(name) < 0
+    ]
+    if missing:
+        raise RuntimeError("Missing required columns: " + ", ".join(missing))
+    return (
+        index_of(FILTER_COLUMNS[0]),
+        index_of(FILTER_COLUMNS[1]),
+        tuple(index_of(name) for name in OUTPUT_COLUMNS),
+    )
+
+
+def _zone(tz_name: str):
     try:
         import zoneinfo
 
-        tz = zoneinfo.ZoneInfo(tz_name)
+        return zoneinfo.ZoneInfo(tz_name)
     except Exception:
-        tz = None
-    now = datetime.now(tz=tz)
+        return None
+
+
+def _local_datetime(tz_name: str) -> str:
+    now = datetime.now(tz=_zone(tz_name))
     return f"{now.month}/{now.day}/{now.year} {now.hour}:{now.minute:02d}:{now.second:02d}"
 
 
-def _download_drive_file(drive, file_id: str) -> bytes:
+def _download_drive_file_to(drive, file_id: str, fh) -> int:
+    """Download a Drive file into the binary file object `fh` in bounded chunks."""
     request = drive.files().get_media(fileId=file_id)
-    fh = io.BytesIO()
-    downloader = MediaIoBaseDownload(fh, request)
+    downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
     done = False
     while not done:
+        check_cancelled()
         _, done = downloader.next_chunk()
-    return fh.getvalue()
-
-
-def _iter_csv_rows(csv_bytes: bytes):
-    encoding = "utf-16le" if _looks_utf16le(csv_bytes) else "utf-8"
-    text = _normalize_text(csv_bytes.decode(encoding, errors="replace"))
-    reader = csv.DictReader(io.StringIO(text))
+    fh.flush()
+    size = fh.tell()
+    fh.seek(0)
+    return size
+
+
+def _open_csv_text(raw) -> io.TextIOWrapper:
+    # ZipExtFile.peek() returns buffered bytes without consuming them.
+    probe = raw.peek(200)[:200]
+    encoding = "utf-16le" if _looks_utf16le(probe) else "utf-8"
+    return io.TextIOWrapper(raw, encoding=encoding, errors="replace", newline="")
+
+
+def _iter_filtered_csv(raw, max_rows: int, positions: list[int] | None = None):
+    """Yield output tuples for rows of one CSV stream that pass the backlog filter.
+
+    Column indices are resolved once from the header; the two filter fields are
+    tested on the raw values before anything else is read. Returns the number of
+    data rows consumed (at most `max_rows`). When `positions` is given, the data-row
+    index of every yielded row is appended to it.
+    """
+    text = _open_csv_text(raw)
+    lines = (line.replace("\x00", "") if "\x00" in line else line for line in text)
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return 0
+    rt_idx, cs_idx, out_idxs = _resolve_columns(header)
+    filter_width = max(rt_idx, cs_idx) + 1
+    width = max(out_idxs) + 1
+    if min(out_idxs) >= 0:
+        project = operator.itemgetter(*out_idxs)
+    else:
+        def project(row):
+            return tuple(row[i] if i >= 0 else "" for i in out_idxs)
+
+    consumed = 0
     for row in reader:
-        yield row
-
-
-def _collect_values_from_zip(zip_bytes: bytes, max_rows: int):
-    values = []
-    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
-        csv_names = [n for n in zf.namelist() if n.lower().endswith(".csv")]
-        if not csv_names:
-            raise RuntimeError("ZIP contains no CSV files.")
-
-        for name in sorted(csv_names):
-            with zf.open(name) as f:
-                csv_bytes = f.read()
-            for row in _iter_csv_rows(csv_bytes):
-                values.append(row)
-                if len(values) >= max_rows:
-                    return values
-    return values
-
-
-def _filter_and_map_rows(rows: list[dict]):
-    if not rows:
-        return []
-
-    first = rows[0]
-    k = {
-        "toNumber": _find_key(first, "TO Number"),
-        "spxTracking": _find_key(first, "SPX Tracking Number"),
-        "receiverName": _find_key(first, "Receiver Name"),
-        "toQty": _find_key(first, "TO Order Quantity"),
-        "operator": _find_key(first, "Operator"),
-        "createTime": _find_key(first, "Create Time"),
-        "completeTime": _find_key(first, "Complete Time"),
-        "remark": _find_key(first, "Remark"),
-        "receiveStatus": _find_key(first, "Receive Status"),
-        "stagingAreaId": _find_key(first, "Staging Area ID"),
-        "receiverType": _find_key(first, "Receiver type"),
-        "currentStation": _find_key(first, "Current Station"),
-    }
+        if consumed >= max_rows:
+            break
+        consumed += 1
+        if len(row) < filter_width:
+            continue
+        rt = row[rt_idx]
+        if rt != "Station" and rt.strip().lower() != "station":
+            continue
+        cs = row[cs_idx]
+        if cs != "SOC 5" and cs.strip().lower() != "soc 5":
+            continue
+        if len(row) < width:
+            row = row + [""] * (width - len(row))
+        if positions is not None:
+            positions.append(consumed - 1)
+        yield project(row)
+    return consumed
+
+
+def _zip_csv_members(zf: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+    members = sorted(
+        (info for info in zf.infolist() if info.filename.lower().endswith(".csv")),
+        key=lambda info: info.filename,
+    )
+    if not members:
+        raise RuntimeError("ZIP contains no CSV files.")
+    return members
+
+
+def _iter_zip_filtered_rows(zip_file, max_rows: int):
+    """Yield filtered output tuples from every CSV member of `zip_file` (path or
+    seekable file) in name order, stopping after `max_rows` data rows in total."""
+    remaining = max_rows
+    with zipfile.ZipFile(zip_file) as zf:
+        for info in _zip_csv_members(zf):
+            with zf.open(info) as raw:
+                remaining -= yield from _iter_filtered_csv(raw, remaining)
+            if remaining <= 0:
+                return
+
+
+def _parse_zip_member(zip_path: str, name: str, max_rows: int) -> tuple[list[tuple], list[int], int]:
+    """Process-pool task: filtered rows of one member, their data-row positions, and
+    the number of data rows consumed."""
+    rows: list[tuple] = []
+    positions: list[int] = []
+    with zipfile.ZipFile(zip_path) as zf, zf.open(name) as raw:
+        parser = _iter_filtered_csv(raw, max_rows, positions)
+        while True:
+            try:
+                rows.append(next(parser))
+            except StopIteration as stop:
+                return rows, positions, stop.value
+
+
+def _iter_zip_filtered_rows_parallel(zip_path: str, max_rows: int, workers: int):
+    """Same output as _iter_zip_filtered_rows, with members parsed in a process pool.
+
+    Results are merged in member-name order. Once the members merged so far reach
+    `max_rows` data rows, the last one is cut at that row and queued members are cancelled.
+    """
+    with zipfile.ZipFile(zip_path) as zf:
+        names = [info.filename for info in _zip_csv_members(zf)]
+    # spawn: the caller is usually a threaded web worker, where fork is unsafe.
+    executor = ProcessPoolExecutor(
+        max_workers=max(1, min(workers, len(names))),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    try:
+        futures = [executor.submit(_parse_zip_member, zip_path, name, max_rows) for name in names]
+        remaining = max_rows
+        for future in futures:
+            rows, positions, consumed = future.result()
+            if consumed >= remaining:
+                yield from rows[: bisect.bisect_left(positions, remaining)]
+                return
+            yield from rows
+            remaining -= consumed
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_workers(zip_path: str) -> int:
+    """BACKLOGS_PARSE_WORKERS: 1 parses sequentially, N uses up to N processes, and
+    0/unset picks the CPU count when the export is large enough to pay for the pool."""
+    configured = int(get_env("BACKLOGS_PARSE_WORKERS", "0"))
+    if configured > 0:
+        return configured
+    with zipfile.ZipFile(zip_path) as zf:
+        members = _zip_csv_members(zf)
+    if len(members) < 2 or sum(info.file_size for info in members) < PARALLEL_PARSE_MIN_BYTES:
+        return 1
+    return os.cpu_count() or 1
+
+
+def _iter_backlog_rows(zip_path: str, max_rows: int):
+    workers = _parse_workers(zip_path)
+    if workers > 1:
+        logger.info("Parsing backlog export with %s processes", workers)
+        return _iter_zip_filtered_rows_parallel(zip_path, max_rows, workers)
+    return _iter_zip_filtered_rows(zip_path, max_rows)
+
+
+def _sync_data_sheet(sheets, sheet_id: str, data_sheet: str, config_sheet: str, values: list):
+    """Bring `data_sheet!A2:J` in line with `values`, writing only changed ranges when
+    the local snapshot of the last write is still valid for the sheet.
+
+    Returns `(write_report, summary)`; `write_report` is None when nothing was written.
+    """
+    mode = get_env("BACKLOGS_SHEET_SYNC", "diff").lower()
+    snapshot_path = get_env("BACKLOGS_SHEET_SNAPSHOT_PATH", "data/backlogs_sheet_snapshot.json")
+    max_ratio = float(get_env("BACKLOGS_SHEET_DIFF_MAX_RATIO", str(DEFAULT_DIFF_MAX_RATIO)))
+    chunk_bytes = int(get_env("BACKLOGS_SHEETS_CHUNK_BYTES", str(DEFAULT_CHUNK_BYTES)))
+    writer = SheetsRangeWriter(
+        sheets_client,
+        sheet_id,
+        concurrency=int(get_env("BACKLOGS_SHEETS_CONCURRENCY", str(DEFAULT_CONCURRENCY))),
+        max_retries=int(get_env("BACKLOGS_SHEETS_MAX_RETRIES", str(DEFAULT_MAX_RETRIES))),
+        max_request_bytes=chunk_bytes,
+    )
+    token_range = f"{config_sheet}!{SNAPSHOT_TOKEN_CELL}"
+
+    plan = None
+    fallback_reason = "disabled" if mode != "diff" else ""
+    if mode == "diff":
+        snapshot = load_snapshot(snapshot_path, sheet_id, data_sheet)
+        token_resp = sheets.spreadsheets().values().get(spreadsheetId=sheet_id, range=token_range).execute()
+        sheet_token = (token_resp.get("values") or [[""]])[0][0] if token_resp else ""
+        if snapshot is None:
+            fallback_reason = "no_snapshot"
+        elif not sheet_token or sheet_token != snapshot.token:
+            fallback_reason = "snapshot_stale"
+        else:
+            plan = plan_sync(snapshot.fingerprints, values)
+            if plan.changed_rows > max_ratio * max(len(values), 1):
+                fallback_reason = "diff_too_large"
+                logger.info("Sheet diff touches %d of %d rows; rewriting in full.", plan.changed_rows, len(values))
+                plan = None
+
+    # Invalidate the sheet token first so an interrupted write forces a full rewrite next time.
+    sheets.spreadsheets().values().update(
+        spreadsheetId=sheet_id,
+        range=token_range,
+        valueInputOption="RAW",
+        body={"majorDimension": "ROWS", "values": [[""]]},
+    ).execute()
 
-    required = [
-        ("TO Number", k["toNumber"]),
-        ("SPX Tracking Number", k["spxTracking"]),
-        ("Receiver Name", k["receiverName"]),
-        ("TO Order Quantity", k["toQty"]),
-        ("Operator", k["operator"]),
-        ("Create Time", k["createTime"]),
-        ("Complete Time", k["completeTime"]),
-        ("Receive Status", k["receiveStatus"]),
-        ("Staging Area ID", k["stagingAreaId"]),
-        ("Receiver type", k["receiverType"]),
-        ("Current Station", k["currentStation"]),
-    ]
-    missing = [name for name, key in required if not key]
-    if missing:
-        raise RuntimeError("Missing required columns: " + ", ".join(missing))
+    if plan is not None:
+        layout = plan.layout
+        chunks = [
+            chunk
+            for run in plan.runs
+            for chunk in plan_chunks(layout, data_sheet, start_row=2, last_col="J", max_bytes=chunk_bytes, span=run)
+        ]
+        fingerprints = plan.fingerprints
+        summary = {"mode": "diff", **plan.summary()}
+        # Leftover rows below the new end; nothing to clear when the sheet did not shrink.
+        clear_range = (
+            f"{data_sheet}!A{2 + len(layout)}:J{1 + plan.previous_rows}"
+            if plan.previous_rows > len(layout)
+            else None
+        )
+    else:
+        layout = values
+        chunks = list(plan_chunks(values, data_sheet, start_row=2, last_col="J", max_bytes=chunk_bytes))
+        fingerprints = [row_fingerprint(row) for row in values]
+        summary = {"mode": "full", "reason": fallback_reason, "rows_written": len(values)}
+        clear_range = f"{data_sheet}!A{2 + len(values)}:J"
+
+    # New rows are written before the stale tail is cleared, so readers never see an empty sheet.
+    write_report = writer.write(layout, chunks) if chunks else None
+    if write_report is not None:
+        logger.info("Sheets write: %s", write_report.summary())
+        for timing in write_report.chunks:
+            logger.debug("Sheets chunk %s", timing)
+    if clear_range:
+        sheets.spreadsheets().values().clear(spreadsheetId=sheet_id, range=clear_range, body={}).execute()
+
+    snapshot = SheetSnapshot(sheet_id, data_sheet, fingerprints)
+    if mode == "diff":
+        try:
+            save_snapshot(snapshot_path, snapshot)
+        except OSError:
+            logger.exception("Failed to save sheet snapshot to %s", snapshot_path)
+        else:
+            sheets.spreadsheets().values().update(
+                spreadsheetId=sheet_id,
+                range=token_range,
+                valueInputOption="RAW",
+                body={"majorDimension": "ROWS", "values": [[snapshot.token]]},
+            ).execute()
+    logger.info("Sheet sync: %s", summary)
+    return write_report, summary
 
-    def norm(v):
-        return str(v or "").strip().lower()
-
-    out = []
-    for row in rows:
-        rt = norm(row.get(k["receiverType"]))
-        cs = norm(row.get(k["currentStation"]))
-        if rt == "station" and cs == "soc 5":
-            out.append(
-                [
-                    row.get(k["toNumber"], ""),
-                    row.get(k["spxTracking"], ""),
-                    row.get(k["receiverName"], ""),
-                    row.get(k["toQty"], ""),
-                    row.get(k["operator"], ""),
-                    row.get(k["createTime"], ""),
-                    row.get(k["completeTime"], ""),
-                    row.get(k["remark"], "") if k["remark"] else "",
-                    row.get(k["receiveStatus"], ""),
-                    row.get(k["stagingAreaId"], ""),
-                ]
-            )
-    return out
-
-
-def _chunk_values(values: list[list], chunk_size: int):
-    for offset in range(0, len(values), chunk_size):
-        yield values[offset : offset + chunk_size], offset
-
-
-def process_backlogs_update(file_id: str) -> dict:
+
+def process_backlogs_update(file_id: str, file_meta: dict | None = None) -> dict:
     if not file_id:
         raise RuntimeError("file_id is required")
 
-    creds = _load_credentials()
-    drive = _build_drive_service(creds)
-    sheets = _build_sheets_service(creds)
+    with drive_client() as drive, sheets_client() as sheets:
+        return _run_backlogs_update(file_id, drive, sheets, file_meta)
+
 
-    folder_id = _get_env("BACKLOGS_DRIVE_FOLDER_ID")
-    sheet_id = _get_env("BACKLOGS_SHEET_ID")
-    data_sheet = _get_env("BACKLOGS_DATA_SHEET_NAME", "socpacked_generated_data")
-    config_sheet = _get_env("BACKLOGS_CONFIG_SHEET_NAME", "config")
-    tz = _get_env("NOTIF_TZ", "Asia/Manila")
-    max_rows = int(_get_env("MAX_ROW_COUNT", "500000"))
-    batch_size = int(_get_env("BATCH_UPDATE_SIZE", "10"))
+def _run_backlogs_update(file_id: str, drive, sheets, file_meta: dict | None = None) -> dict:
+    folder_id = get_env("BACKLOGS_DRIVE_FOLDER_ID")
+    sheet_id = get_env("BACKLOGS_SHEET_ID")
+    data_sheet = get_env("BACKLOGS_DATA_SHEET_NAME", "socpacked_generated_data")
+    config_sheet = get_env("BACKLOGS_CONFIG_SHEET_NAME", "config")
+    tz = get_env("NOTIF_TZ", "Asia/Manila")
+    max_rows = int(get_env("MAX_ROW_COUNT", "500000"))
 
     if not folder_id or not sheet_id:
         raise RuntimeError("BACKLOGS_DRIVE_FOLDER_ID and BACKLOGS_SHEET_ID must be set")
 
-    # Fetch file metadata
-    file_meta = drive.files().get(fileId=file_id, fields="id,name,mimeType,parents").execute()
+    # Fetch file metadata (the Drive watcher already has it from the changes feed)
+    if file_meta is None:
+        file_meta = drive.files().get(fileId=file_id, fields="id,name,mimeType,parents,md5Checksum,size").execute()
     if folder_id not in (file_meta.get("parents") or []):
         logger.info("File %s not in target folder; skipping.", file_id)
         return {"status": "skipped", "reason": "not_in_folder"}
@@ -223,15 +413,44 @@ def process_backlogs_update(file_id: str) -> dict:
         logger.info("File %s is not a ZIP; skipping.", file_id)
         return {"status": "skipped", "reason": "not_zip"}
 
-    # Check last processed file ID
-    last_resp = sheets.spreadsheets().values().get(
-        spreadsheetId=sheet_id, range=f"{config_sheet}!B1"
-    ).execute()
-    last_id = (last_resp.get("values") or [[""]])[0][0] if last_resp else ""
-    if last_id == file_id:
-        logger.info("Duplicate file %s; skipping.", file_id)
-        return {"status": "skipped", "reason": "duplicate"}
+    # Skip exports already imported under this file id or with identical content
+    # (re-uploads), before anything is downloaded.
+    ledger = get_ledger()
+    previous = ledger.find_completed(file_id, file_meta)
+    if previous:
+        logger.info("Duplicate file %s (already imported as %s); skipping.", file_id, previous["file_id"])
+        result = {
+            "status": "skipped",
+            "reason": "duplicate",
+            "duplicate_of": previous["file_id"],
+            "imported_at": previous["finished_at"],
+        }
+        ledger.record(file_id, file_meta, SKIPPED, result)
+        return result
+
+    # A fresh ledger (new instance or disk) falls back to the last file id kept in the sheet.
+    if ledger.is_empty():
+        last_resp = sheets.spreadsheets().values().get(
+            spreadsheetId=sheet_id, range=f"{config_sheet}!B1"
+        ).execute()
+        last_id = (last_resp.get("values") or [[""]])[0][0] if last_resp else ""
+        if last_id == file_id:
+            logger.info("Duplicate file %s; skipping.", file_id)
+            return {"status": "skipped", "reason": "duplicate"}
 
+    run_id = ledger.start(file_id, file_meta)
+    try:
+        result = _import_backlogs_file(file_id, drive, sheets, sheet_id, data_sheet, config_sheet, tz, max_rows)
+    except Exception as exc:
+        ledger.finish(run_id, FAILED, error=str(exc))
+        raise
+    ledger.finish(run_id, OK, result)
+    return result
+
+
+def _import_backlogs_file(
+    file_id: str, drive, sheets, sheet_id: str, data_sheet: str, config_sheet: str, tz: str, max_rows: int
+) -> dict:
     start_time = datetime.now()
 
     # Mark running
@@ -243,40 +462,16 @@ def process_backlogs_update(file_id: str) -> dict:
     ).execute()
 
     try:
-        zip_bytes = _download_drive_file(drive, file_id)
-        rows = _collect_values_from_zip(zip_bytes, max_rows)
-        values = _filter_and_map_rows(rows)
+        # Spool the export to disk and stream it; only the filtered rows are kept.
+        with tempfile.TemporaryDirectory(prefix="backlogs_") as tmp_dir:
+            zip_path = os.path.join(tmp_dir, "export.zip")
+            with open(zip_path, "w+b") as zip_file:
+                _download_drive_file_to(drive, file_id, zip_file)
+            values = list(_iter_backlog_rows(zip_path, max_rows))
 
-        # Clear existing data
-        sheets.spreadsheets().values().clear(
-            spreadsheetId=sheet_id, range=f"{data_sheet}!A2:J", body={}
-        ).execute()
-
-        if values:
-            # Chunk + batch update
-            if len(values) >= 100000:
-                chunk_size = 2000
-            elif len(values) >= 50000:
-                chunk_size = 3000
-            else:
-                chunk_size = 5000
-
-            chunk_payloads = []
-            for chunk, offset in _chunk_values(values, chunk_size):
-                start_row = 2 + offset
-                end_row = start_row + len(chunk) - 1
-                rng = f"{data_sheet}!A{start_row}:J{end_row}"
-                chunk_payloads.append({"range": rng, "values": chunk})
-
-            # group ranges for batchUpdate
-            for i in range(0, len(chunk_payloads), batch_size):
-                body = {
-                    "valueInputOption": "RAW",
-                    "data": chunk_payloads[i : i + batch_size],
-                }
-                sheets.spreadsheets().values().batchUpdate(
-                    spreadsheetId=sheet_id, body=body
-                ).execute()
+        # Last point a cancelled job can stop without touching the sheet.
+        check_cancelled()
+        write_report, sync_summary = _sync_data_sheet(sheets, sheet_id, data_sheet, config_sheet, values)
 
         # Only log if rows exist
         if values:
@@ -327,8 +522,13 @@ def process_backlogs_update(file_id: str) -> dict:
             body={"majorDimension": "ROWS", "values": [["IDLE"]]},
         ).execute()
 
+    # Bot lookups and the dashboard are served from this import until the next one.
+    dashboard = None
+    if _snapshot_enabled():
+        dashboard = _publish_snapshot(SnapshotBuilder(file_id, _zone(tz)).extend(values))
+
     # Trigger Pipeline B after completion (optional)
-    notify_url = _get_env("BACKLOGS_NOTIFY_WEBHOOK_URL")
+    notify_url = get_env("BACKLOGS_NOTIFY_WEBHOOK_URL")
     if notify_url:
         try:
             import httpx
@@ -337,56 +537,143 @@ def process_backlogs_update(file_id: str) -> dict:
         except Exception:
             logger.exception("Failed to trigger backlogs notify webhook")
 
-    return {"status": "ok", "rows_written": len(values)}
+    result = {"status": "ok", "rows_written": len(values), "sheet_sync": sync_summary}
+    if write_report is not None:
+        result["sheet_write"] = write_report.summary()
+    if dashboard is not None:
+        result["dashboard"] = dashboard
+    if _truthy(get_env("BACKLOGS_NOTIFY_DASHBOARD", "0")):
+        result["notify"] = _notify_dashboard()
+    return result
 
 
-def process_backlogs_filtered_rows(rows: list[list], source_file_id: str | None = None) -> dict:
-    from app.workflows.backlogs.supabase_client import insert_backlogs_rows
-    batch_size = int(_get_env("SUPABASE_INSERT_BATCH_SIZE", "2000"))
+def _notify_dashboard() -> dict:
+    """Send the dashboard to the registered groups (Pipeline B) in-process. Runs on the
+    import's worker thread, so it gets its own event loop."""
+    from app.workflows.backlogs.pipeline_b import notify_backlogs_dashboard
 
-    if not rows:
-        return {"status": "ok", "rows_written": 0}
+    try:
+        return asyncio.run(notify_backlogs_dashboard())
+    except Exception as exc:
+        # The import itself succeeded; a failed notification must not fail the job.
+        logger.exception("Failed to send the backlogs dashboard notification")
+        return {"status": "error", "error": str(exc)}
 
-    if not source_file_id:
-        source_file_id = "unknown"
 
-    payload = []
-    for r in rows:
-        payload.append(
-            {
-                "source_file_id": source_file_id,
-                "to_number": r[0] if len(r) > 0 else "",
-                "spx_tracking_number": r[1] if len(r) > 1 else "",
-                "receiver_name": r[2] if len(r) > 2 else "",
-                "to_order_quantity": r[3] if len(r) > 3 else "",
-                "operator": r[4] if len(r) > 4 else "",
-                "create_time": r[5] if len(r) > 5 else "",
-                "complete_time": r[6] if len(r) > 6 else "",
-                "remark": r[7] if len(r) > 7 else "",
-                "receive_status": r[8] if len(r) > 8 else "",
-                "staging_area_id": r[9] if len(r) > 9 else "",
-            }
-        )
+def _publish_snapshot(builder: SnapshotBuilder) -> dict:
+    """Swap in the snapshot and dashboard aggregates; returns the aggregate totals."""
+    snapshot = builder.build()
+    publish_snapshot(snapshot)
+    aggregates = compute_aggregates(snapshot)
+    publish_aggregates(aggregates)
+    return {"rows": aggregates.rows, "quantity": aggregates.quantity, "seconds": round(aggregates.seconds, 3)}
 
-    inserted = insert_backlogs_rows(payload, batch_size=batch_size)
-    return {"status": "ok", "rows_written": inserted}
 
+def _parse_quantity(value) -> int | None:
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value or "").strip().replace(",", "")
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return int(float(text))
+        except ValueError:
+            return None
+
+
+def _parse_timestamp(value, tz) -> str | None:
+    """ISO 8601 with offset for a timestamptz column; naive export times are in `tz`."""
+    parsed = parse_export_datetime(value, tz)
+    return parsed.isoformat() if parsed is not None else None
+
+
+def _filtered_row_record(r: list, source_file_id: str, import_date: str, tz=None) -> dict:
+    """Map an output row onto the typed backlogs_rows columns; blanks become NULL."""
+    r = list(r[:10]) + [""] * (10 - len(r))
+    return {
+        "source_file_id": source_file_id,
+        "import_date": import_date,
+        "to_number": r[0],
+        "spx_tracking_number": r[1],
+        "receiver_name": r[2],
+        "to_order_quantity": _parse_quantity(r[3]),
+        "operator": r[4],
+        "create_time": _parse_timestamp(r[5], tz),
+        "complete_time": _parse_timestamp(r[6], tz),
+        "remark": r[7],
+        "receive_status": r[8],
+        "staging_area_id": r[9],
+    }
 
-def get_latest_drive_file_id() -> str | None:
-    creds = _load_credentials()
-    drive = _build_drive_service(creds)
-    folder_id = _get_env("BACKLOGS_DRIVE_FOLDER_ID")
-    if not folder_id:
-        raise RuntimeError("BACKLOGS_DRIVE_FOLDER_ID must be set")
 
-    query = f"'{folder_id}' in parents and trashed = false"
-    resp = drive.files().list(
-        q=query,
-        fields="files(id,name,createdTime,mimeType,parents)",
-        orderBy="createdTime desc",
-        pageSize=1,
-    ).execute()
-    files = resp.get("files", [])
-    if not files:
-        return None
-    return files[0].get("id") or None
+def process_backlogs_filtered_rows(rows: Iterable[list], source_file_id: str | None = None) -> dict:
+    """Write filtered rows to Supabase in batches; `rows` may be a lazy iterator.
+
+    Rows land in today's import_date partition (created on demand), or in the one an
+    earlier import of the same file used, so a retry keeps the upsert key stable across
+    midnight. Afterwards partitions older than SUPABASE_RETENTION_DAYS are dropped (0
+    keeps everything).
+    """
+    from app.workflows.backlogs.supabase_client import (
+        ensure_backlogs_partition,
+        existing_import_date,
+        insert_backlogs_rows,
+        prune_backlogs_rows,
+    )
+    batch_size = int(get_env("SUPABASE_INSERT_BATCH_SIZE", "2000"))
+    retain_days = int(get_env("SUPABASE_RETENTION_DAYS", "14"))
+    tz = _zone(get_env("NOTIF_TZ", "Asia/Manila"))
+
+    if not source_file_id:
+        source_file_id = "unknown"
+
+    import_day = None if source_file_id == "unknown" else existing_import_date(source_file_id)
+    if import_day is None:
+        import_day = datetime.now(tz=tz).date()
+    ensure_backlogs_partition(import_day)
+    import_date = import_day.isoformat()
+    builder = SnapshotBuilder(source_file_id, tz) if _snapshot_enabled(streamed=True) else None
+    received = 0
+
+    def records():
+        nonlocal received
+        for r in rows:
+            if not isinstance(r, (list, tuple)):
+                continue
+            received += 1
+            if builder is not None:
+                builder.add(r)
+            yield _filtered_row_record(r, source_file_id, import_date, tz)
+
+    inserted = insert_backlogs_rows(records(), batch_size=batch_size)
+    result = {"status": "ok", "rows_written": inserted, "rows_received": received, "import_date": import_date}
+    if builder is not None:
+        result["dashboard"] = _publish_snapshot(builder)
+    if retain_days > 0:
+        try:
+            result["partitions_pruned"] = prune_backlogs_rows(retain_days)
+        except Exception:
+            # Retention is housekeeping; the rows are already written.
+            logger.exception("Failed to prune old Supabase backlog partitions")
+    return result
+
+
+def process_backlogs_filtered_stream(records: Iterable[tuple[str, Any]], source_file_id: str | None = None) -> dict:
+    """Consume `(key, value)` records from a streamed upload (see
+    app.processing.ingest.iter_stream_records): `file_id` metadata followed by `rows`.
+    Metadata that arrives after the first row is ignored."""
+    records = iter(records)
+    first_rows = []
+    for key, value in records:
+        if key == "rows":
+            first_rows.append(value)
+            break
+        if key in ("file_id", "id") and value and not source_file_id:
+            source_file_id = str(value)
+    rows = itertools.chain(first_rows, (value for key, value in records if key == "rows"))
+    result = process_backlogs_filtered_rows(rows, source_file_id)
+    result["source_file_id"] = source_file_id or "unknown"
+    return result
@@ -0,0 +1,187 @@
+import io
+import math
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any
+
+from app.workflows.backlogs.snapshot import BacklogSnapshot
+
+# Upper bounds (hours since create time) of the aging buckets; the last bucket is open.
+AGING_BOUNDS_H = (4, 8, 24, 48, 72)
+DEFAULT_TOP = 10
+
+CHART_WIDTH = 720
+_BG = (255, 255, 255)
+_FG = (33, 37, 41)
+_MUTED = (108, 117, 125)
+_BAR = (238, 77, 45)
+_BAR_ALT = (52, 98, 168)
+
+
+def _aging_labels() -> list[str]:
+    labels = []
+    lower = 0
+    for upper in AGING_BOUNDS_H:
+        labels.append(f"{lower}-{upper}h")
+        lower = upper
+    labels.append(f">{lower}h")
+    return labels
+
+
+@dataclass(slots=True)
+class BacklogAggregates:
+    source_file_id: str
+    generated_at: float
+    rows: int
+    quantity: int
+    by_status: list[tuple[str, int, int]]
+    by_receiver: list[tuple[str, int, int]]
+    by_area: list[tuple[str, int, int]]
+    aging: list[tuple[str, int]]
+    no_create_time: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        groups = ("by_status", "by_receiver", "by_area")
+        data: dict[str, Any] = {
+            "source_file_id": self.source_file_id,
+            "generated_at": self.generated_at,
+            "rows": self.rows,
+            "quantity": self.quantity,
+            "aging": dict(self.aging),
+            "no_create_time": self.no_create_time,
+            "seconds": round(self.seconds, 3),
+        }
+        for name in groups:
+            data[name] = [{"value": v, "rows": n, "quantity": q} for v, n, q in getattr(self, name)]
+        return data
+
+
+def compute_aggregates(
+    snapshot: BacklogSnapshot, now: float | None = None, top: int = DEFAULT_TOP
+) -> BacklogAggregates:
+    """Dashboard numbers from one pass over each encoded column of the snapshot."""
+    started = time.perf_counter()
+    now = time.time() if now is None else now
+
+    def ranked(name: str, limit: int | None) -> list[tuple[str, int, int]]:
+        totals = sorted(snapshot.group_totals(name), key=lambda item: (-item[1], item[0]))
+        return totals if limit is None else totals[:limit]
+
+    bounds = [now - hours * 3600 for hours in reversed(AGING_BOUNDS_H)]
+    # bisect over ascending cutoffs: index 0 is the oldest bucket.
+    buckets = [0] * (len(AGING_BOUNDS_H) + 1)
+    missing = 0
+    for created in snapshot.created:
+        if math.isnan(created):
+            missing += 1
+        else:
+            buckets[bisect_right(bounds, created)] += 1
+    labels = _aging_labels()
+    aging = [(labels[i], buckets[len(buckets) - 1 - i]) for i in range(len(buckets))]
+
+    return BacklogAggregates(
+        source_file_id=snapshot.source_file_id,
+        generated_at=now,
+        rows=snapshot.rows,
+        quantity=snapshot.quantity(),
+        by_status=ranked("receive_status", None),
+        by_receiver=ranked("receiver_name", top),
+        by_area=ranked("staging_area_id", top),
+        aging=aging,
+        no_create_time=missing,
+        seconds=time.perf_counter() - started,
+    )
+
+
+def _md_cell(value: Any) -> str:
+    return str(value if value not in ("", None) else "(blank)").replace("|", "\\|")
+
+
+def aggregates_markdown(agg: BacklogAggregates, title: str = "Backlog summary") -> str:
+    lines = [f"**{title}**: {agg.rows:,} TOs, qty {agg.quantity:,}", ""]
+
+    def table(header: str, items: list[tuple[str, int, int]]) -> None:
+        lines.extend([f"| {header} | TOs | Qty |", "|---|---:|---:|"])
+        lines.extend(f"| {_md_cell(v)} | {n:,} | {q:,} |" for v, n, q in items)
+        lines.append("")
+
+    table("Status", agg.by_status)
+    table("Staging area", agg.by_area)
+    table("Receiver", agg.by_receiver)
+    lines.extend(["| Age | TOs |", "|---|---:|"])
+    lines.extend(f"| {label} | {n:,} |" for label, n in agg.aging)
+    if agg.no_create_time:
+        lines.append(f"| no create time | {agg.no_create_time:,} |")
+    return "\n".join(lines).rstrip()
+
+
+def _font(size: int):
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 only has the fixed bitmap font.
+        return ImageFont.load_default()
+
+
+def render_aggregates_png(agg: BacklogAggregates, title: str = "Backlog summary") -> bytes:
+    """Compact bar chart (status, aging, top staging areas) as PNG bytes. Needs Pillow."""
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError as exc:
+        raise RuntimeError("Pillow is required to render the backlog chart") from exc
+
+    sections = [
+        ("Status", [(v, n) for v, n, _ in agg.by_status], _BAR),
+        ("Age since create time", list(agg.aging), _BAR_ALT),
+        ("Top staging areas", [(v, n) for v, n, _ in agg.by_area], _BAR),
+    ]
+    row_h, pad, label_w = 20, 12, 170
+    height = pad * 2 + 44 + sum(28 + row_h * len(items) for _, items, _ in sections)
+    image = Image.new("RGB", (CHART_WIDTH, height), _BG)
+    draw = ImageDraw.Draw(image)
+    title_font, font = _font(18), _font(13)
+
+    stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(agg.generated_at))
+    draw.text((pad, pad), title, fill=_FG, font=title_font)
+    draw.text((pad, pad + 24), f"{agg.rows:,} TOs  |  qty {agg.quantity:,}  |  {stamp}", fill=_MUTED, font=font)
+    y = pad + 44
+    bar_x = pad + label_w
+    bar_max = CHART_WIDTH - bar_x - pad - 70
+    for heading, items, color in sections:
+        draw.text((pad, y + 6), heading, fill=_FG, font=font)
+        y += 28
+        peak = max((n for _, n in items), default=0) or 1
+        for label, count in items:
+            text = str(label or "(blank)")
+            if len(text) > 24:
+                text = text[:21] + "..."
+            draw.text((pad, y + 3), text, fill=_FG, font=font)
+            width = max(1, round(bar_max * count / peak)) if count else 0
+            if width:
+                draw.rectangle((bar_x, y + 3, bar_x + width, y + row_h - 3), fill=color)
+            draw.text((bar_x + width + 6, y + 3), f"{count:,}", fill=_MUTED, font=font)
+            y += row_h
+
+    out = io.BytesIO()
+    # A palette image is a fraction of the size for a flat chart like this.
+    image.quantize(colors=32).save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+_latest: BacklogAggregates | None = None
+_latest_lock = threading.Lock()
+
+
+def publish_aggregates(agg: BacklogAggregates) -> None:
+    global _latest
+    with _latest_lock:
+        _latest = agg
+
+
+def latest_aggregates() -> BacklogAggregates | None:
+    return _latest
@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+from collections.abc import Callable, Iterable
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from typing import Any
+
+from app.workflows.backlogs.env import get_env
+from app.workflows.backlogs.google_clients import drive_client
+
+logger = logging.getLogger("backlogs_update")
+
+STATE_VERSION = 1
+CHANGE_FIELDS = (
+    "nextPageToken,newStartPageToken,"
+    "changes(fileId,removed,time,file(id,name,mimeType,parents,trashed,createdTime,md5Checksum,size))"
+)
+ZIP_MIME_TYPES = ("application/zip", "application/x-zip-compressed")
+# File ids already emitted; Drive reports a change for every metadata touch of a file.
+REMEMBERED_FILES = 500
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def is_backlog_export(file_meta: dict[str, Any], folder_id: str) -> bool:
+    name = str(file_meta.get("name") or "")
+    mime = str(file_meta.get("mimeType") or "")
+    return (
+        not file_meta.get("trashed")
+        and folder_id in (file_meta.get("parents") or [])
+        and (name.lower().endswith(".zip") or mime in ZIP_MIME_TYPES)
+    )
+
+
+@dataclass(slots=True)
+class DriveFileEvent:
+    file_id: str
+    name: str
+    file_meta: dict[str, Any]
+
+
+class DriveChangesWatcher:
+    """Follows the Drive changes feed for new backlog exports in one folder.
+
+    `poll()` returns new exports since the saved page token; `settle()` persists the
+    token once the caller has handled them, so a crash re-delivers instead of losing
+    events. A failed export keeps the token in place and is offered again on the next
+    poll, up to `max_attempts` times, after which it is logged and skipped. The Drive
+    client comes from `lease_drive`, which tests can point at a stub exposing
+    `changes().getStartPageToken()` and `changes().list()`.
+    """
+
+    def __init__(
+        self,
+        folder_id: str,
+        state_path: str,
+        lease_drive: Callable[[], AbstractContextManager[Any]] = drive_client,
+        page_size: int = 100,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> None:
+        if not folder_id:
+            raise RuntimeError("BACKLOGS_DRIVE_FOLDER_ID must be set")
+        self.folder_id = folder_id
+        self.state_path = state_path
+        self.page_size = page_size
+        self.max_attempts = max(1, max_attempts)
+        self._lease_drive = lease_drive
+        state = self._load_state()
+        self.page_token: str | None = state.get("page_token")
+        self._recent: list[str] = list(state.get("recent") or [])
+        # file_id -> failed imports so far, kept across restarts.
+        self._failures: dict[str, int] = dict(state.get("failures") or {})
+        self._pending_token: str | None = None
+        self._pending_ids: list[str] = []
+
+    def _load_state(self) -> dict[str, Any]:
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except Exception:
+            logger.warning("Ignoring unreadable Drive watch state at %s", self.state_path)
+            return {}
+        if state.get("version") != STATE_VERSION or state.get("folder_id") != self.folder_id:
+            return {}
+        return state
+
+    def _save_state(self) -> None:
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": STATE_VERSION,
+                    "folder_id": self.folder_id,
+                    "page_token": self.page_token,
+                    "recent": self._recent[-REMEMBERED_FILES:],
+                    "failures": self._failures,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.state_path)
+
+    def poll(self) -> list[DriveFileEvent]:
+        """One round trip per page of changes (normally a single call)."""
+        with self._lease_drive() as drive:
+            if not self.page_token:
+                # First run: start from "now"; existing files are not replayed.
+                resp = drive.changes().getStartPageToken(supportsAllDrives=True).execute()
+                self.page_token = resp["startPageToken"]
+                self._save_state()
+                return []
+
+            events: list[DriveFileEvent] = []
+            seen = set(self._recent)
+            page = self.page_token
+            while True:
+                resp = drive.changes().list(
+                    pageToken=page,
+                    pageSize=self.page_size,
+                    fields=CHANGE_FIELDS,
+                    spaces="drive",
+                    includeRemoved=False,
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True,
+                ).execute()
+                for change in resp.get("changes") or []:
+                    file_meta = change.get("file") or {}
+                    file_id = file_meta.get("id") or change.get("fileId")
+                    if change.get("removed") or not file_id or file_id in seen:
+                        continue
+                    if not is_backlog_export(file_meta, self.folder_id):
+                        continue
+                    seen.add(file_id)
+                    events.append(DriveFileEvent(file_id, str(file_meta.get("name") or ""), file_meta))
+                if resp.get("nextPageToken"):
+                    page = resp["nextPageToken"]
+                    continue
+                self._pending_token = resp.get("newStartPageToken") or page
+                break
+        self._pending_ids = [event.file_id for event in events]
+        return events
+
+    def settle(self, failed: Iterable[str] = ()) -> bool:
+        """Record the outcome of the last poll; `failed` holds the file ids whose import
+        failed. Returns True when the page token moved on.
+
+        Handled exports are remembered right away, so a retried poll only offers the
+        failed ones again. An export that has failed `max_attempts` times is logged and
+        skipped so it cannot pin the token forever."""
+        if self._pending_token is None:
+            return False
+        failed = set(failed)
+        retry: list[str] = []
+        for file_id in self._pending_ids:
+            if file_id not in failed:
+                self._failures.pop(file_id, None)
+                self._recent.append(file_id)
+                continue
+            attempts = self._failures.get(file_id, 0) + 1
+            if attempts >= self.max_attempts:
+                logger.error("Giving up on backlog export %s after %d failed imports", file_id, attempts)
+                self._failures.pop(file_id, None)
+                self._recent.append(file_id)
+            else:
+                self._failures[file_id] = attempts
+                retry.append(file_id)
+        committed = not retry
+        if committed:
+            self.page_token = self._pending_token
+        self._pending_token = None
+        self._pending_ids = []
+        self._save_state()
+        return committed
+
+
+def watcher_from_env(state_path: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> DriveChangesWatcher:
+    return DriveChangesWatcher(get_env("BACKLOGS_DRIVE_FOLDER_ID", ""), state_path, max_attempts=max_attempts)
@@ -0,0 +1,7 @@
+import os
+
+
+def get_env(name, default=None):
+    """Environment variable `name`, treating an empty value as unset."""
+    value = os.environ.get(name)
+    return value if value not in (None, "") else default
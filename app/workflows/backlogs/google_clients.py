@@ -0,0 +1,135 @@
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import requests
+from google.auth.transport.requests import Request as GoogleRequest
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+from app.workflows.backlogs.env import get_env
+
+SCOPES = [
+    "https://www.googleapis.com/auth/drive.readonly",
+    "https://www.googleapis.com/auth/spreadsheets",
+]
+# Idle clients kept per API; matches the default Sheets write concurrency plus the caller.
+MAX_IDLE_CLIENTS = 8
+
+# Loading the key, building discovery clients and fetching a token are done once and
+# reused: credentials reload only when the key file changes, tokens refresh only when
+# expired, and built clients (each with a kept-alive HTTP connection) are pooled.
+_lock = threading.Lock()
+_credentials = None
+_credentials_key: tuple[str, float] | None = None
+_token_session: requests.Session | None = None
+
+
+def get_credentials():
+    """Service-account credentials, loaded once per key file (reloaded if it changes)."""
+    global _credentials, _credentials_key
+    cred_path = get_env("GOOGLE_SERVICE_ACCOUNT_FILE", "service_account.json")
+    if not os.path.exists(cred_path):
+        raise RuntimeError(
+            f"Service account file not found at {cred_path}. "
+            "Set GOOGLE_SERVICE_ACCOUNT_FILE to the correct path."
+        )
+    key = (os.path.abspath(cred_path), os.path.getmtime(cred_path))
+    with _lock:
+        if _credentials is None or _credentials_key != key:
+            try:
+                _credentials = service_account.Credentials.from_service_account_file(
+                    cred_path, scopes=SCOPES
+                )
+            except Exception as exc:
+                raise RuntimeError(
+                    "Invalid service account JSON. Ensure the file is a Google "
+                    "service account key (type=service_account)."
+                ) from exc
+            _credentials_key = key
+        return _credentials
+
+
+def get_access_token() -> str:
+    """Bearer token for raw HTTP calls (e.g. sheet exports); refreshed only when expired."""
+    global _token_session
+    creds = get_credentials()
+    with _lock:
+        if not creds.valid:
+            if _token_session is None:
+                _token_session = requests.Session()
+            creds.refresh(GoogleRequest(session=_token_session))
+        return creds.token
+
+
+class _ClientPool:
+    """Built discovery clients for one API. googleapiclient clients are not
+    thread-safe, so each is leased to one caller at a time."""
+
+    def __init__(self, api: str, version: str) -> None:
+        self.api = api
+        self.version = version
+        self._idle: list[tuple[Any, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self) -> Iterator[Any]:
+        creds = get_credentials()
+        client = None
+        with self._lock:
+            # Clients built for credentials that have since been reloaded are dropped.
+            self._idle = [(c, svc) for c, svc in self._idle if c is creds]
+            if self._idle:
+                _, client = self._idle.pop()
+        if client is None:
+            # e.g. GOOGLE_DRIVE_API_ENDPOINT=http://127.0.0.1:8085/ to run against a local stub.
+            endpoint = get_env(f"GOOGLE_{self.api.upper()}_API_ENDPOINT")
+            client = build(
+                self.api,
+                self.version,
+                credentials=creds,
+                cache_discovery=False,
+                client_options={"api_endpoint": endpoint} if endpoint else None,
+            )
+        # A client whose caller raised may hold a broken connection; only clean leases go back.
+        yield client
+        with self._lock:
+            if len(self._idle) < MAX_IDLE_CLIENTS:
+                self._idle.append((creds, client))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._idle.clear()
+
+
+_drive_pool = _ClientPool("drive", "v3")
+_sheets_pool = _ClientPool("sheets", "v4")
+
+
+def drive_client():
+    """`with drive_client() as drive:` leases a pooled Drive v3 client."""
+    return _drive_pool.lease()
+
+
+def sheets_client():
+    """`with sheets_client() as sheets:` leases a pooled Sheets v4 client."""
+    return _sheets_pool.lease()
+
+
+def warmup() -> None:
+    """Load credentials, fetch a token and build one client per API ahead of the first run."""
+    get_access_token()
+    with drive_client(), sheets_client():
+        pass
+
+
+def reset() -> None:
+    """Forget cached credentials and clients (e.g. after rotating the key in place)."""
+    global _credentials, _credentials_key
+    with _lock:
+        _credentials = None
+        _credentials_key = None
+    _drive_pool.clear()
+    _sheets_pool.clear()
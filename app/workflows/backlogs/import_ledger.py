@@ -0,0 +1,150 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+_SCHEMA = """
+create table if not exists backlog_imports (
+    id integer primary key autoincrement,
+    file_id text not null,
+    name text not null default '',
+    md5 text not null default '',
+    size integer not null default 0,
+    status text not null,
+    reason text not null default '',
+    rows_written integer,
+    started_at real not null,
+    finished_at real,
+    error text not null default '',
+    result text not null default ''
+);
+create index if not exists backlog_imports_content on backlog_imports (md5, size, status);
+create index if not exists backlog_imports_file on backlog_imports (file_id, status);
+"""
+
+DEFAULT_LEDGER_PATH = "data/backlogs_imports.sqlite3"
+
+RUNNING = "running"
+OK = "ok"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+def content_key(file_meta: dict[str, Any]) -> tuple[str, int]:
+    """(md5Checksum, size) from Drive metadata; ("", 0) when Drive has no checksum."""
+    md5 = str(file_meta.get("md5Checksum") or "")
+    try:
+        size = int(file_meta.get("size") or 0)
+    except (TypeError, ValueError):
+        size = 0
+    return md5, size
+
+
+class ImportLedger:
+    """Local record of backlog imports keyed on Drive content (md5Checksum + size) and
+    file id, so a re-upload of an export that was already imported is skipped before
+    downloading it."""
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.executescript(_SCHEMA)
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("select 1 from backlog_imports limit 1").fetchone() is None
+
+    def find_completed(self, file_id: str, file_meta: dict[str, Any]) -> dict[str, Any] | None:
+        """The latest successful import of the same file id or the same content."""
+        md5, size = content_key(file_meta)
+        with self._lock:
+            row = self._conn.execute(
+                """
+                select * from backlog_imports
+                where status = ? and (file_id = ? or (md5 != '' and md5 = ? and size = ?))
+                order by id desc limit 1
+                """,
+                (OK, file_id, md5, size),
+            ).fetchone()
+        return _row_dict(row) if row else None
+
+    def start(self, file_id: str, file_meta: dict[str, Any]) -> int:
+        md5, size = content_key(file_meta)
+        with self._lock:
+            cur = self._conn.execute(
+                "insert into backlog_imports (file_id, name, md5, size, status, started_at) values (?, ?, ?, ?, ?, ?)",
+                (file_id, str(file_meta.get("name") or ""), md5, size, RUNNING, time.time()),
+            )
+            return int(cur.lastrowid)
+
+    def finish(self, run_id: int, status: str, result: dict[str, Any] | None = None, error: str = "") -> None:
+        result = result or {}
+        with self._lock:
+            self._conn.execute(
+                """
+                update backlog_imports
+                set status = ?, reason = ?, rows_written = ?, finished_at = ?, error = ?, result = ?
+                where id = ?
+                """,
+                (
+                    status,
+                    str(result.get("reason") or ""),
+                    result.get("rows_written"),
+                    time.time(),
+                    error[:2000],
+                    json.dumps(result, default=str),
+                    run_id,
+                ),
+            )
+
+    def record(self, file_id: str, file_meta: dict[str, Any], status: str, result: dict[str, Any]) -> int:
+        """Start and finish in one go, for runs decided without importing (skips)."""
+        run_id = self.start(file_id, file_meta)
+        self.finish(run_id, status, result)
+        return run_id
+
+    def recent(self, limit: int = 20, file_id: str = "") -> list[dict[str, Any]]:
+        query = "select * from backlog_imports"
+        params: tuple[Any, ...] = ()
+        if file_id:
+            query += " where file_id = ?"
+            params = (file_id,)
+        query += " order by id desc limit ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*params, max(1, limit))).fetchall()
+        return [_row_dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _row_dict(row: sqlite3.Row) -> dict[str, Any]:
+    data = dict(row)
+    data["result"] = json.loads(data["result"]) if data.get("result") else None
+    if data.get("finished_at"):
+        data["duration_s"] = round(data["finished_at"] - data["started_at"], 3)
+    return data
+
+
+_ledgers: dict[str, ImportLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(path: str | None = None) -> ImportLedger:
+    """One shared ledger connection per path for the process; the path defaults to
+    BACKLOGS_IMPORT_LEDGER_PATH."""
+    path = path or os.environ.get("BACKLOGS_IMPORT_LEDGER_PATH") or DEFAULT_LEDGER_PATH
+    with _ledgers_lock:
+        ledger = _ledgers.get(path)
+        if ledger is None:
+            ledger = _ledgers[path] = ImportLedger(path)
+        return ledger
@@ -0,0 +1,190 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.workflows.backlogs.env import get_env
+
+logger = logging.getLogger("backlogs_pipeline_b")
+
+DEFAULT_DPI = 150
+# Added back around the content when trimming the page margins.
+TRIM_PADDING_PX = 8
+
+
+def parse_crop(value: str | None) -> tuple[float, float, float, float] | str | None:
+    """BACKLOGS_PDF_CROP: "auto" trims white margins; "left,top,right,bottom" cuts that
+    many PDF points from each side; empty or "none" renders the whole page."""
+    value = (value or "").strip().lower()
+    if value in ("", "none", "0"):
+        return None
+    if value == "auto":
+        return "auto"
+    parts = [float(part) for part in value.split(",")]
+    if len(parts) != 4 or any(part < 0 for part in parts):
+        raise ValueError("BACKLOGS_PDF_CROP must be 'auto', 'none' or four non-negative numbers")
+    return parts[0], parts[1], parts[2], parts[3]
+
+
+def render_first_page(pdf_bytes: bytes, dpi: int = DEFAULT_DPI, crop=None) -> bytes:
+    """PNG bytes of the first page of `pdf_bytes`. Runs inside the pool workers."""
+    try:
+        import pypdfium2 as pdfium
+    except ImportError as exc:
+        raise RuntimeError("pypdfium2 is required for local PDF rendering") from exc
+
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        page = pdf[0]
+        try:
+            # pdfium takes (left, bottom, right, top); the env setting reads top first.
+            box = (crop[0], crop[3], crop[2], crop[1]) if isinstance(crop, tuple) else (0, 0, 0, 0)
+            bitmap = page.render(scale=dpi / 72, crop=box)
+            image = bitmap.to_pil()
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+
+    if crop == "auto":
+        image = _trim_margins(image)
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+def _trim_margins(image):
+    from PIL import ImageChops
+
+    rgb = image.convert("RGB")
+    background = rgb.getpixel((0, 0))
+    diff = ImageChops.difference(rgb, _solid(rgb, background))
+    bbox = diff.convert("L").point(lambda v: 255 if v > 16 else 0).getbbox()
+    if not bbox:
+        return image
+    left, top, right, bottom = bbox
+    return image.crop(
+        (
+            max(0, left - TRIM_PADDING_PX),
+            max(0, top - TRIM_PADDING_PX),
+            min(image.width, right + TRIM_PADDING_PX),
+            min(image.height, bottom + TRIM_PADDING_PX),
+        )
+    )
+
+
+def _solid(image, color):
+    from PIL import Image
+
+    return Image.new(image.mode, image.size, color)
+
+
+class PdfRasterizer:
+    """Renders dashboard PDFs to PNG on a small process pool.
+
+    pdfium is not thread-safe, so each render runs in a worker process (spawned on
+    first use and kept warm). `workers=0` renders on the calling thread instead. If a
+    worker dies (e.g. OOM-killed) the pool is broken for good, so it is replaced and
+    the render retried once.
+    """
+
+    def __init__(self, workers: int = 1, dpi: int = DEFAULT_DPI, crop=None) -> None:
+        self.workers = max(0, workers)
+        self.dpi = dpi
+        self.crop = crop
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: callers are threaded web workers, where fork is unsafe.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        with self._lock:
+            # Another caller may already have replaced it.
+            if self._executor is pool:
+                self._executor = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, pdf_bytes: bytes) -> tuple[ProcessPoolExecutor, Future]:
+        pool = self._pool()
+        try:
+            return pool, pool.submit(render_first_page, pdf_bytes, self.dpi, self.crop)
+        except BrokenProcessPool:
+            self._discard(pool)
+            pool = self._pool()
+            return pool, pool.submit(render_first_page, pdf_bytes, self.dpi, self.crop)
+
+    def render(self, pdf_bytes: bytes) -> bytes:
+        if self.workers == 0:
+            return render_first_page(pdf_bytes, self.dpi, self.crop)
+        pool, future = self._submit(pdf_bytes)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            logger.warning("PDF render pool broke; retrying on a fresh pool")
+            self._discard(pool)
+            return self._submit(pdf_bytes)[1].result()
+
+    async def render_async(self, pdf_bytes: bytes) -> bytes:
+        if self.workers == 0:
+            return await asyncio.to_thread(render_first_page, pdf_bytes, self.dpi, self.crop)
+        pool, future = self._submit(pdf_bytes)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            logger.warning("PDF render pool broke; retrying on a fresh pool")
+            self._discard(pool)
+            return await asyncio.wrap_future(self._submit(pdf_bytes)[1])
+
+    def warmup(self) -> None:
+        """Start the worker processes and import pdfium in them ahead of the first render."""
+        if self.workers:
+            pool = self._pool()
+            for future in [pool.submit(_import_renderer) for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _import_renderer() -> None:
+    import pypdfium2  # noqa: F401
+    import PIL.Image  # noqa: F401
+
+
+_rasterizer: PdfRasterizer | None = None
+_rasterizer_lock = threading.Lock()
+
+
+def get_rasterizer() -> PdfRasterizer:
+    """Shared rasterizer configured from BACKLOGS_PDF_RENDER_WORKERS, BACKLOGS_PDF_DPI
+    and BACKLOGS_PDF_CROP."""
+    global _rasterizer
+    with _rasterizer_lock:
+        if _rasterizer is None:
+            _rasterizer = PdfRasterizer(
+                workers=int(get_env("BACKLOGS_PDF_RENDER_WORKERS", "1")),
+                dpi=int(get_env("BACKLOGS_PDF_DPI", str(DEFAULT_DPI))),
+                crop=parse_crop(get_env("BACKLOGS_PDF_CROP", "auto")),
+            )
+        return _rasterizer
+
+
+def shutdown_rasterizer() -> None:
+    """Stop the shared rasterizer's workers, if it was ever created."""
+    with _rasterizer_lock:
+        rasterizer = _rasterizer
+    if rasterizer is not None:
+        rasterizer.shutdown()
@@ -1,8 +1,8 @@
+import asyncio
 import base64
-import os
 import logging
-from workflows.backlogs.group_store import list_group_ids
-from utils import send_group_chat_message
+from app.workflows.backlogs.env import get_env
+from app.workflows.backlogs.group_store import list_group_ids
 import httpx
 from dotenv import load_dotenv
 
@@ -10,118 +10,135 @@ logger = logging.getLogger("backlogs_pipeline_b")
 
 load_dotenv()
 
-def _get_env(name, default=None):
-    value = os.environ.get(name)
-    return value if value not in (None, "") else default
-
 
 async def _export_dashboard_pdf() -> bytes:
-    sheet_id = _get_env("BACKLOGS_SHEET_ID")
+    sheet_id = get_env("BACKLOGS_SHEET_ID")
     if not sheet_id:
         raise RuntimeError("BACKLOGS_SHEET_ID must be set")
 
-    gid = _get_env("BACKLOGS_DASHBOARD_GID", "2030780141")
-    rng = _get_env("BACKLOGS_DASHBOARD_RANGE", "B2:R59")
+    gid = get_env("BACKLOGS_DASHBOARD_GID", "2030780141")
+    rng = get_env("BACKLOGS_DASHBOARD_RANGE", "B2:R59")
 
     url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export"
     params = {
         "format": "pdf",
         "gid": gid,
         "range": rng,
-        "scale": _get_env("BACKLOGS_DASHBOARD_SCALE", "2"),
+        "scale": get_env("BACKLOGS_DASHBOARD_SCALE", "2"),
         "sheetnames": "false",
         "printtitle": "false",
         "gridlines": "false",
     }
 
-    # Use service account auth if provided
+    # Use service account auth if provided; the token is shared with the Drive/Sheets
+    # clients and only refreshed once it expires.
     token = None
-    sa_path = _get_env("GOOGLE_SERVICE_ACCOUNT_FILE")
-    if sa_path:
-        from google.oauth2 import service_account
-        from google.auth.transport.requests import Request as GoogleRequest
+    if get_env("GOOGLE_SERVICE_ACCOUNT_FILE"):
+        from app.workflows.backlogs.google_clients import get_access_token
 
-        scopes = ["https://www.googleapis.com/auth/drive.readonly"]
-        creds = service_account.Credentials.from_service_account_file(sa_path, scopes=scopes)
-        creds.refresh(GoogleRequest())
-        token = creds.token
+        token = await asyncio.to_thread(get_access_token)
 
     headers = {}
     if token:
         headers["Authorization"] = f"Bearer {token}"
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.get(url, params=params, headers=headers)
-        resp.raise_for_status()
-        return resp.content
+    resp = await _export_client().get(url, params=params, headers=headers)
+    resp.raise_for_status()
+    return resp.content
 
 
-async def _pdf_to_png_base64(pdf_bytes: bytes) -> str:
-    renderer_url = _get_env("BACKLOGS_PDF_RENDERER_URL")
-    if not renderer_url:
-        raise RuntimeError("BACKLOGS_PDF_RENDERER_URL must be set for PDF->PNG conversion")
+_http_client: httpx.AsyncClient | None = None
+_http_client_loop: asyncio.AbstractEventLoop | None = None
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(
-            renderer_url,
-            headers={"Content-Type": "application/pdf"},
-            content=pdf_bytes,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        if "png_base64" not in data:
-            raise RuntimeError("Renderer did not return png_base64")
-        return data["png_base64"]
 
+def _export_client() -> httpx.AsyncClient:
+    # Reused across exports so the connection to docs.google.com stays open. A client is
+    # bound to its event loop, and post-import notifications run on their own loop.
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(timeout=60)
+        _http_client_loop = loop
+    return _http_client
 
-async def notify_backlogs_dashboard():
-    group_ids = list_group_ids()
-    if not group_ids:
-        logger.warning("No SeaTalk group IDs registered; skipping notify.")
-        return {"status": "skipped", "reason": "no_groups"}
 
-    text = _get_env("BACKLOGS_SEATALK_TEXT", "OB Pending for Dispatch update")
-    pdf_bytes = await _export_dashboard_pdf()
-    img_b64 = await _pdf_to_png_base64(pdf_bytes)
+async def _pdf_to_png_base64(pdf_bytes: bytes) -> str:
+    renderer_url = get_env("BACKLOGS_PDF_RENDERER_URL")
+    if get_env("BACKLOGS_PDF_RENDERER", "local") == "local":
+        from app.workflows.backlogs.pdf_raster import get_rasterizer
 
-    results = []
-    for gid in group_ids:
-        # Send text
-        res_text = await send_group_chat_message(group_id=gid, content=text)
-        # Send image
-        res_img = await _send_group_image(gid, img_b64)
-        results.append({"group_id": gid, "text": res_text, "image": res_img})
-    return {"status": "ok", "results": results}
+        try:
+            png = await get_rasterizer().render_async(pdf_bytes)
+            return base64.b64encode(png).decode("ascii")
+        except RuntimeError:
+            # pypdfium2 missing: keep notifications working through the remote renderer.
+            if not renderer_url:
+                raise
+            logger.warning("Local PDF rendering unavailable; using BACKLOGS_PDF_RENDERER_URL", exc_info=True)
+    return await _remote_pdf_to_png_base64(pdf_bytes, renderer_url)
 
 
-async def _send_group_image(group_id: str, img_b64: str):
-    token = await _get_seatalk_token()
-    if not token:
-        return {"status": "error_no_token"}
+async def _remote_pdf_to_png_base64(pdf_bytes: bytes, renderer_url: str | None) -> str:
+    if not renderer_url:
+        raise RuntimeError("BACKLOGS_PDF_RENDERER_URL must be set for PDF->PNG conversion")
 
-    webhook_id = _get_env("SEATALK_WEBHOOK_GROUP")
-    if not webhook_id:
-        return {"status": "failed_no_webhook"}
+    resp = await _export_client().post(
+        renderer_url,
+        headers={"Content-Type": "application/pdf"},
+        content=pdf_bytes,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    if "png_base64" not in data:
+        raise RuntimeError("Renderer did not return png_base64")
+    return data["png_base64"]
 
-    # Use group webhook for image
-    url = "https://openapi.seatalk.io/webhook/group/" + webhook_id
 
-    payload = {
-        "tag": "image",
-        "image_base64": {"content": img_b64},
-    }
-    headers = {"Content-Type": "application/json"}
+async def _local_dashboard_png_base64() -> str | None:
+    """Chart of the aggregates computed at the last import in this process, if any."""
+    from app.workflows.backlogs.dashboard import latest_aggregates, render_aggregates_png
+
+    aggregates = latest_aggregates()
+    if aggregates is None:
+        return None
+    png = await asyncio.to_thread(render_aggregates_png, aggregates)
+    return base64.b64encode(png).decode("ascii")
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post(url, json=payload, headers=headers)
-        try:
-            resp.raise_for_status()
-        except Exception:
-            logger.error("SeaTalk image send failed: %s %s", resp.status_code, resp.text)
-            return {"status": "failed"}
-        return {"status": "sent"}
 
+async def notify_backlogs_dashboard():
+    group_ids = list_group_ids()
+    if not group_ids:
+        logger.warning("No SeaTalk group IDs registered; skipping notify.")
+        return {"status": "skipped", "reason": "no_groups"}
 
-async def _get_seatalk_token():
-    from utils import get_seatalk_token
-    return await get_seatalk_token()
+    text = get_env("BACKLOGS_SEATALK_TEXT", "OB Pending for Dispatch update")
+    # "local" renders the import's aggregates in-process and only falls back to the
+    # sheet export (PDF + remote renderer) when no import has run here yet.
+    img_b64 = None
+    if get_env("BACKLOGS_DASHBOARD_SOURCE", "local") == "local":
+        img_b64 = await _local_dashboard_png_base64()
+    if img_b64 is None:
+        pdf_bytes = await _export_dashboard_pdf()
+        img_b64 = await _pdf_to_png_base64(pdf_bytes)
+
+    # One token and pooled connection for the whole broadcast; groups are sent to in
+    # parallel and a failing group does not hold up the others.
+    messages = [
+        {"tag": "text", "text": {"format": 2, "content": text}},
+        {"tag": "image", "image": {"content": img_b64}},
+    ]
+    results = await asyncio.to_thread(_seatalk_client().broadcast_group_messages, group_ids, messages)
+    return {"status": "ok", "results": [result.to_dict() for result in results]}
+
+
+_seatalk = None
+
+
+def _seatalk_client():
+    global _seatalk
+    if _seatalk is None:
+        from app.seatalk.auth import SeaTalkAuthManager
+        from app.seatalk.client import SeaTalkClient
+
+        _seatalk = SeaTalkClient(SeaTalkAuthManager())
+    return _seatalk
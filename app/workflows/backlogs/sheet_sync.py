@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger("backlogs_update")
+
+SNAPSHOT_VERSION = 1
+# Above this share of changed rows a diff writes almost everything anyway.
+DEFAULT_DIFF_MAX_RATIO = 0.5
+
+
+def row_fingerprint(row: Sequence[Any]) -> str:
+    """`<TO Number>\\t<hash>`; the TO Number (first column) lets a changed row be
+    rewritten in the slot its previous version occupied."""
+    digest = hashlib.blake2b("\x1f".join(map(str, row)).encode("utf-8"), digest_size=8).hexdigest()
+    return f"{row[0] if row else ''}\t{digest}"
+
+
+def _to_number(fingerprint: str) -> str:
+    return fingerprint.partition("\t")[0]
+
+
+@dataclass(slots=True)
+class SheetSnapshot:
+    """Fingerprints of the rows last written to a sheet, in sheet order."""
+
+    spreadsheet_id: str
+    sheet: str
+    fingerprints: list[str]
+
+    @property
+    def token(self) -> str:
+        """Digest of the layout; stored in the sheet too, so a snapshot that no longer
+        matches what is on the sheet (another writer, manual edits) is detected."""
+        h = hashlib.blake2b(digest_size=12)
+        h.update(f"{self.spreadsheet_id}\n{self.sheet}\n{len(self.fingerprints)}\n".encode())
+        for fp in self.fingerprints:
+            h.update(fp.encode("utf-8"))
+            h.update(b"\n")
+        return h.hexdigest()
+
+
+def load_snapshot(path: str, spreadsheet_id: str, sheet: str) -> SheetSnapshot | None:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        logger.warning("Ignoring unreadable sheet snapshot at %s", path)
+        return None
+    if (
+        data.get("version") != SNAPSHOT_VERSION
+        or data.get("spreadsheet_id") != spreadsheet_id
+        or data.get("sheet") != sheet
+    ):
+        return None
+    return SheetSnapshot(spreadsheet_id, sheet, list(data.get("fingerprints") or []))
+
+
+def save_snapshot(path: str, snapshot: SheetSnapshot) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": SNAPSHOT_VERSION,
+                "spreadsheet_id": snapshot.spreadsheet_id,
+                "sheet": snapshot.sheet,
+                "fingerprints": snapshot.fingerprints,
+            },
+            f,
+            separators=(",", ":"),
+        )
+    os.replace(tmp_path, path)
+
+
+@dataclass(slots=True)
+class SyncPlan:
+    """Target sheet layout plus the slots whose contents change.
+
+    `layout[i]` is the row for sheet slot i; only `runs` (half-open slot ranges) need
+    writing, and slots from `len(layout)` up to `previous_rows` need clearing.
+    """
+
+    layout: list[Sequence[Any]]
+    fingerprints: list[str]
+    runs: list[tuple[int, int]]
+    previous_rows: int
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    moved: int = 0
+    unchanged: int = 0
+
+    @property
+    def changed_rows(self) -> int:
+        return sum(end - start for start, end in self.runs)
+
+    def summary(self) -> dict[str, int]:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "deleted": self.deleted,
+            "moved": self.moved,
+            "unchanged": self.unchanged,
+            "rows_written": self.changed_rows,
+            "ranges": len(self.runs),
+            "rows_cleared": max(0, self.previous_rows - len(self.layout)),
+        }
+
+
+def plan_sync(previous: Sequence[str], values: Sequence[Sequence[Any]]) -> SyncPlan:
+    """Place `values` onto the slots described by `previous` fingerprints.
+
+    Unchanged rows keep their slot. A changed row takes a slot freed by the same TO
+    Number (an update), then any other freed slot, then is appended. Holes left by
+    deletions are filled from the bottom so the data stays contiguous. Row order is
+    therefore not the export order once a diff has been applied.
+    """
+    old_n = len(previous)
+    new_fps = [row_fingerprint(row) for row in values]
+
+    slots_by_fp: dict[str, list[int]] = defaultdict(list)
+    for slot in range(old_n - 1, -1, -1):
+        slots_by_fp[previous[slot]].append(slot)
+
+    placement: list[int | None] = [None] * len(values)
+    pending: list[int] = []
+    for index, fp in enumerate(new_fps):
+        slots = slots_by_fp.get(fp)
+        if slots:
+            placement[index] = slots.pop()
+        else:
+            pending.append(index)
+    unchanged = len(values) - len(pending)
+
+    # Slots whose old row is gone, by TO Number, lowest first.
+    free_by_to: dict[str, list[int]] = defaultdict(list)
+    for fp, slots in slots_by_fp.items():
+        for slot in slots:
+            free_by_to[_to_number(fp)].append(slot)
+    for slots in free_by_to.values():
+        slots.sort(reverse=True)
+
+    updated = 0
+    unplaced: list[int] = []
+    for index in pending:
+        slots = free_by_to.get(_to_number(new_fps[index]))
+        if slots:
+            placement[index] = slots.pop()
+            updated += 1
+        else:
+            unplaced.append(index)
+    free = sorted((slot for slots in free_by_to.values() for slot in slots), reverse=True)
+
+    next_slot = old_n
+    for index in unplaced:
+        if free:
+            placement[index] = free.pop()
+        else:
+            placement[index] = next_slot
+            next_slot += 1
+    inserted = len(unplaced)
+    deleted = max(0, old_n - (unchanged + updated))
+
+    new_n = len(values)
+    layout: list[Sequence[Any] | None] = [None] * max(new_n, next_slot)
+    owner: list[int | None] = [None] * len(layout)
+    for index, slot in enumerate(placement):
+        owner[slot] = index
+
+    # Compact: move rows sitting past the new end into the remaining holes.
+    moved = 0
+    holes = sorted(slot for slot in range(new_n) if owner[slot] is None)
+    tail = [slot for slot in range(new_n, len(owner)) if owner[slot] is not None]
+    for hole, slot in zip(holes, tail):
+        owner[hole], owner[slot] = owner[slot], None
+        moved += 1
+
+    dirty = [False] * new_n
+    fingerprints: list[str] = []
+    for slot in range(new_n):
+        index = owner[slot]
+        layout[slot] = values[index]
+        fp = new_fps[index]
+        fingerprints.append(fp)
+        dirty[slot] = slot >= old_n or previous[slot] != fp
+
+    runs: list[tuple[int, int]] = []
+    start = None
+    for slot, is_dirty in enumerate(dirty):
+        if is_dirty and start is None:
+            start = slot
+        elif not is_dirty and start is not None:
+            runs.append((start, slot))
+            start = None
+    if start is not None:
+        runs.append((start, new_n))
+
+    return SyncPlan(
+        layout=layout[:new_n],
+        fingerprints=fingerprints,
+        runs=runs,
+        previous_rows=old_n,
+        inserted=inserted,
+        updated=updated,
+        deleted=deleted,
+        moved=moved,
+        unchanged=unchanged,
+    )
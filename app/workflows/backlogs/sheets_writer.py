@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import AbstractContextManager
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger("backlogs_update")
+
+# Sheets recommends request bodies of at most ~2 MB; larger writes get slow and flaky.
+DEFAULT_CHUNK_BYTES = 1_000_000
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 6
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+MAX_BACKOFF_S = 64.0
+
+
+@dataclass(frozen=True, slots=True)
+class ValueChunk:
+    range: str
+    offset: int
+    rows: int
+    approx_bytes: int
+
+
+@dataclass(slots=True)
+class ChunkTiming:
+    range: str
+    ranges: int
+    rows: int
+    approx_bytes: int
+    seconds: float
+    attempts: int
+    throttled_s: float
+
+
+@dataclass(slots=True)
+class WriteReport:
+    rows: int = 0
+    approx_bytes: int = 0
+    seconds: float = 0.0
+    retries: int = 0
+    throttled_s: float = 0.0
+    concurrency: int = 0
+    chunks: list[ChunkTiming] = field(default_factory=list)
+
+    def summary(self) -> dict[str, Any]:
+        slowest = max(self.chunks, key=lambda c: c.seconds, default=None)
+        return {
+            "rows": self.rows,
+            "chunks": len(self.chunks),
+            "approx_bytes": self.approx_bytes,
+            "seconds": round(self.seconds, 3),
+            "retries": self.retries,
+            "throttled_s": round(self.throttled_s, 3),
+            "concurrency": self.concurrency,
+            "slowest_chunk": asdict(slowest) if slowest else None,
+        }
+
+
+def _row_bytes(row: Sequence[Any]) -> int:
+    # Cells are CSV strings; quotes, commas and brackets approximate the JSON encoding
+    # closely enough to size chunks without serializing every row twice.
+    return sum(len(str(cell)) for cell in row) + 4 * len(row)
+
+
+def plan_chunks(
+    values: Sequence[Sequence[Any]],
+    sheet: str,
+    start_row: int = 2,
+    first_col: str = "A",
+    last_col: str = "J",
+    max_bytes: int = DEFAULT_CHUNK_BYTES,
+    span: tuple[int, int] | None = None,
+) -> Iterator[ValueChunk]:
+    """Split `values` (or the `span` slice of it) into contiguous row ranges of at
+    most ~`max_bytes` encoded payload; `values[i]` lands on sheet row `start_row + i`."""
+    lo, hi = span if span is not None else (0, len(values))
+    offset = lo
+    size = 0
+    for index in range(lo, hi):
+        row_size = _row_bytes(values[index])
+        if index > offset and size + row_size > max_bytes:
+            yield _chunk(sheet, start_row, first_col, last_col, offset, index, size)
+            offset, size = index, 0
+        size += row_size
+    if offset < hi:
+        yield _chunk(sheet, start_row, first_col, last_col, offset, hi, size)
+
+
+def _chunk(sheet: str, start_row: int, first_col: str, last_col: str, offset: int, end: int, size: int) -> ValueChunk:
+    top = start_row + offset
+    bottom = start_row + end - 1
+    return ValueChunk(f"{sheet}!{first_col}{top}:{last_col}{bottom}", offset, end - offset, size)
+
+
+def pack_requests(chunks: Sequence[ValueChunk], max_bytes: int = DEFAULT_CHUNK_BYTES) -> list[list[ValueChunk]]:
+    """Group consecutive chunks into batchUpdate requests of up to ~`max_bytes`, so many
+    small ranges (e.g. a sparse diff) cost one request rather than one each."""
+    requests: list[list[ValueChunk]] = []
+    size = 0
+    for chunk in chunks:
+        if requests and size + chunk.approx_bytes <= max_bytes:
+            requests[-1].append(chunk)
+            size += chunk.approx_bytes
+        else:
+            requests.append([chunk])
+            size = chunk.approx_bytes
+    return requests
+
+
+def _http_status(err: Exception) -> int:
+    resp = getattr(err, "resp", None)
+    try:
+        return int(getattr(resp, "status", 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _retry_after_s(err: Exception) -> float | None:
+    resp = getattr(err, "resp", None)
+    value = resp.get("retry-after") if hasattr(resp, "get") else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _AdaptiveLimit:
+    """Concurrency gate that halves on quota errors and grows back one slot at a time."""
+
+    def __init__(self, limit: int, grow_after: int = 4) -> None:
+        self.max_limit = max(1, limit)
+        self.limit = self.max_limit
+        self.grow_after = grow_after
+        self._in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def __enter__(self) -> "_AdaptiveLimit":
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def throttled(self) -> None:
+        with self._cond:
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+
+    def succeeded(self) -> None:
+        with self._cond:
+            self._successes += 1
+            if self.limit < self.max_limit and self._successes >= self.grow_after:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+
+class SheetsRangeWriter:
+    """Writes row ranges to a sheet with bounded, quota-aware concurrency.
+
+    googleapiclient service objects are not thread-safe, so every request leases
+    one through `lease_service` (e.g. google_clients.sheets_client).
+    """
+
+    def __init__(
+        self,
+        lease_service: Callable[[], AbstractContextManager[Any]],
+        spreadsheet_id: str,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        max_request_bytes: int = DEFAULT_CHUNK_BYTES,
+        value_input_option: str = "RAW",
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._lease_service = lease_service
+        self.spreadsheet_id = spreadsheet_id
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.max_request_bytes = max_request_bytes
+        self.value_input_option = value_input_option
+        self._sleep = sleep
+        self._limit = _AdaptiveLimit(self.concurrency)
+
+    def _backoff_s(self, err: Exception, attempt: int) -> float:
+        retry_after = _retry_after_s(err)
+        if retry_after is not None:
+            return min(retry_after, MAX_BACKOFF_S)
+        return min(MAX_BACKOFF_S, 2 ** (attempt - 1)) + random.uniform(0, 1)
+
+    def _write_request(self, chunks: list[ValueChunk], values: Sequence[Sequence[Any]]) -> ChunkTiming:
+        body = {
+            "valueInputOption": self.value_input_option,
+            "data": [
+                {"range": chunk.range, "values": values[chunk.offset : chunk.offset + chunk.rows]}
+                for chunk in chunks
+            ],
+        }
+        label = chunks[0].range if len(chunks) == 1 else f"{chunks[0].range} (+{len(chunks) - 1} ranges)"
+        started = time.perf_counter()
+        throttled_s = 0.0
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with self._limit, self._lease_service() as service:
+                    service.spreadsheets().values().batchUpdate(
+                        spreadsheetId=self.spreadsheet_id, body=body
+                    ).execute()
+            except (HttpError, ConnectionError, TimeoutError) as err:
+                status = _http_status(err)
+                retryable = status in RETRYABLE_STATUSES or not isinstance(err, HttpError)
+                if not retryable or attempt > self.max_retries:
+                    raise
+                if status == 429:
+                    self._limit.throttled()
+                delay = self._backoff_s(err, attempt)
+                logger.warning(
+                    "Sheets write %s failed (status=%s, attempt %d); retrying in %.1fs",
+                    label,
+                    status or type(err).__name__,
+                    attempt,
+                    delay,
+                )
+                throttled_s += delay
+                self._sleep(delay)
+                continue
+            self._limit.succeeded()
+            return ChunkTiming(
+                range=label,
+                ranges=len(chunks),
+                rows=sum(chunk.rows for chunk in chunks),
+                approx_bytes=sum(chunk.approx_bytes for chunk in chunks),
+                seconds=round(time.perf_counter() - started, 3),
+                attempts=attempt,
+                throttled_s=round(throttled_s, 3),
+            )
+
+    def write(self, values: Sequence[Sequence[Any]], chunks: Sequence[ValueChunk]) -> WriteReport:
+        """Write every chunk, packed into requests of up to `max_request_bytes`; on a
+        non-retryable error, cancel what is queued and re-raise."""
+        report = WriteReport(concurrency=self.concurrency)
+        if not chunks:
+            return report
+        requests = pack_requests(chunks, self.max_request_bytes)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="sheets-write") as executor:
+            futures = [executor.submit(self._write_request, group, values) for group in requests]
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = next((f for f in done if f.exception() is not None), None)
+            if failed is not None:
+                for future in pending:
+                    future.cancel()
+                raise failed.exception()
+        report.seconds = time.perf_counter() - started
+        for future in futures:
+            timing = future.result()
+            report.chunks.append(timing)
+            report.rows += timing.rows
+            report.approx_bytes += timing.approx_bytes
+            report.retries += timing.attempts - 1
+            report.throttled_s += timing.throttled_s
+        return report
@@ -0,0 +1,312 @@
+import math
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime, tzinfo
+from typing import Any
+
+from app.config import settings
+
+# Same order as backlogs_update.OUTPUT_COLUMNS.
+FIELDS = (
+    "to_number",
+    "spx_tracking_number",
+    "receiver_name",
+    "to_order_quantity",
+    "operator",
+    "create_time",
+    "complete_time",
+    "remark",
+    "receive_status",
+    "staging_area_id",
+)
+# Low-cardinality columns are stored as array('I') codes into a per-column vocabulary.
+ENCODED_FIELDS = ("receiver_name", "operator", "receive_status", "staging_area_id")
+# Plain text columns, one string per row.
+TEXT_FIELDS = ("to_number", "spx_tracking_number", "create_time", "complete_time", "remark")
+# Columns with a hash index from normalized value to row position(s).
+INDEXED_FIELDS = ("to_number", "spx_tracking_number", "receiver_name", "staging_area_id")
+
+MAX_LISTED_ROWS = 10
+
+# Timestamp layouts seen in exports besides ISO 8601 (which fromisoformat handles).
+TIMESTAMP_FORMATS = ("%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%d-%m-%Y %H:%M:%S", "%Y/%m/%d %H:%M:%S")
+
+
+def parse_export_datetime(value: Any, tz: tzinfo | None = None) -> datetime | None:
+    """Aware datetime for an export time cell; naive values are taken to be in `tz`."""
+    text = str(value or "").strip()
+    if not text:
+        return None
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        for fmt in TIMESTAMP_FORMATS:
+            try:
+                parsed = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+    if parsed.tzinfo is None and tz is not None:
+        parsed = parsed.replace(tzinfo=tz)
+    return parsed
+
+
+def _key(value: Any) -> str:
+    return str(value or "").strip().casefold()
+
+
+def _quantity(value: Any) -> int:
+    try:
+        return int(float(str(value).replace(",", "")))
+    except (TypeError, ValueError):
+        return 0
+
+
+class BacklogSnapshot:
+    """Read-only columnar copy of one backlog import with hash indexes for lookups.
+
+    Built by SnapshotBuilder and published with `publish_snapshot()`; readers take the
+    current reference from `current_snapshot()` and never see a half-built snapshot.
+    """
+
+    def __init__(
+        self,
+        source_file_id: str,
+        text: dict[str, list[str]],
+        codes: dict[str, array],
+        vocab: dict[str, list[str]],
+        quantity: array,
+        created: array,
+    ) -> None:
+        self.source_file_id = source_file_id
+        self.built_at = time.time()
+        self.rows = len(quantity)
+        self._text = text
+        self._codes = codes
+        self._vocab = vocab
+        self._quantity = quantity
+        # create_time as epoch seconds, NaN when blank or unparseable.
+        self.created = created
+        self._code_of = {
+            name: {_key(value): code for code, value in enumerate(values)} for name, values in vocab.items()
+        }
+        # Encoded columns: code -> row positions. Text columns: key -> row or rows.
+        self._groups: dict[str, list[array]] = {}
+        self._unique: dict[str, dict[str, int | array]] = {}
+        for name in INDEXED_FIELDS:
+            if name in codes:
+                groups = [array("I") for _ in vocab[name]]
+                for row, code in enumerate(codes[name]):
+                    groups[code].append(row)
+                self._groups[name] = groups
+            else:
+                index: dict[str, int | array] = {}
+                for row, value in enumerate(text[name]):
+                    key = _key(value)
+                    if not key:
+                        continue
+                    found = index.get(key)
+                    if found is None:
+                        index[key] = row
+                    elif isinstance(found, int):
+                        index[key] = array("I", (found, row))
+                    else:
+                        found.append(row)
+                self._unique[name] = index
+
+    def value(self, name: str, row: int) -> Any:
+        if name == "to_order_quantity":
+            return self._quantity[row]
+        if name in self._codes:
+            return self._vocab[name][self._codes[name][row]]
+        return self._text[name][row]
+
+    def row(self, row: int) -> dict[str, Any]:
+        return {name: self.value(name, row) for name in FIELDS}
+
+    def find(self, name: str, value: str) -> list[int]:
+        """Row positions whose `name` equals `value` (case-insensitive)."""
+        key = _key(value)
+        if name in self._groups:
+            code = self._code_of[name].get(key)
+            return list(self._groups[name][code]) if code is not None else []
+        if name in self._unique:
+            found = self._unique[name].get(key)
+            if found is None:
+                return []
+            return [found] if isinstance(found, int) else list(found)
+        raise KeyError(f"{name} is not indexed")
+
+    def counts(self, name: str, rows: Iterable[int] | None = None) -> Counter:
+        """Row counts per value of an encoded column, over `rows` or the whole snapshot."""
+        codes = self._codes[name]
+        vocab = self._vocab[name]
+        tally = Counter(codes) if rows is None else Counter(codes[row] for row in rows)
+        return Counter({vocab[code]: count for code, count in tally.items()})
+
+    def group_totals(self, name: str) -> list[tuple[str, int, int]]:
+        """`(value, rows, quantity)` per value of an encoded column, in one pass."""
+        vocab = self._vocab[name]
+        rows = [0] * len(vocab)
+        qty = [0] * len(vocab)
+        for code, amount in zip(self._codes[name], self._quantity):
+            rows[code] += 1
+            qty[code] += amount
+        return [(vocab[code], rows[code], qty[code]) for code in range(len(vocab)) if rows[code]]
+
+    def quantity(self, rows: Iterable[int] | None = None) -> int:
+        if rows is None:
+            return sum(self._quantity)
+        return sum(self._quantity[row] for row in rows)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "source_file_id": self.source_file_id,
+            "built_at": self.built_at,
+            "rows": self.rows,
+            "distinct": {name: len(values) for name, values in self._vocab.items()},
+        }
+
+
+class SnapshotBuilder:
+    """Accumulates output rows (lists in FIELDS order) into columns as they stream past."""
+
+    def __init__(self, source_file_id: str, tz: tzinfo | None = None) -> None:
+        self.source_file_id = source_file_id
+        self.tz = tz
+        self._text: dict[str, list[str]] = {name: [] for name in TEXT_FIELDS}
+        self._codes: dict[str, array] = {name: array("I") for name in ENCODED_FIELDS}
+        self._vocab: dict[str, list[str]] = {name: [] for name in ENCODED_FIELDS}
+        self._lookup: dict[str, dict[str, int]] = {name: {} for name in ENCODED_FIELDS}
+        self._quantity = array("q")
+        self._created = array("d")
+        self._last_created: tuple[str, float] = ("", math.nan)
+        self._positions = {name: FIELDS.index(name) for name in FIELDS}
+
+    def add(self, row: list) -> None:
+        width = len(row)
+        for name in TEXT_FIELDS:
+            pos = self._positions[name]
+            self._text[name].append(str(row[pos]) if pos < width else "")
+        for name in ENCODED_FIELDS:
+            pos = self._positions[name]
+            value = str(row[pos]) if pos < width else ""
+            lookup = self._lookup[name]
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(self._vocab[name])
+                self._vocab[name].append(value)
+            self._codes[name].append(code)
+        pos = self._positions["to_order_quantity"]
+        self._quantity.append(_quantity(row[pos]) if pos < width else 0)
+        self._created.append(self._epoch(self._text["create_time"][-1]))
+
+    def _epoch(self, text: str) -> float:
+        # Exports are grouped by creation, so consecutive rows often share a timestamp.
+        if text == self._last_created[0]:
+            return self._last_created[1]
+        parsed = parse_export_datetime(text, self.tz)
+        epoch = parsed.timestamp() if parsed is not None else math.nan
+        self._last_created = (text, epoch)
+        return epoch
+
+    def extend(self, rows: Iterable[list]) -> "SnapshotBuilder":
+        for row in rows:
+            self.add(row)
+        return self
+
+    def build(self) -> BacklogSnapshot:
+        return BacklogSnapshot(
+            self.source_file_id, self._text, self._codes, self._vocab, self._quantity, self._created
+        )
+
+
+_current: BacklogSnapshot | None = None
+_current_lock = threading.Lock()
+
+
+def publish_snapshot(snapshot: BacklogSnapshot) -> None:
+    global _current
+    with _current_lock:
+        _current = snapshot
+
+
+def current_snapshot() -> BacklogSnapshot | None:
+    return _current
+
+
+# "/backlogs receiver Juan Dela Cruz", "/backlog to TO123", "/backlogs summary", ...
+# Only an explicit command at the start of the message counts, so ordinary chat such as
+# "can you send the backlog to Juan?" still goes to the model.
+_QUERY_RE = re.compile(
+    r"^\s*/backlogs?\s+(to|tracking|receiver|area|summary)\b\s*(.*)$",
+    re.IGNORECASE | re.DOTALL,
+)
+_LEADING_MENTION_RE = re.compile(r"^\s*@\S+")
+_QUERY_FIELDS = {
+    "to": "to_number",
+    "tracking": "spx_tracking_number",
+    "receiver": "receiver_name",
+    "area": "staging_area_id",
+}
+
+
+def _match_query(text: str) -> re.Match[str] | None:
+    text = (text or "").lstrip()
+    # Group messages arrive as "@Bot Name /backlogs ..."; drop the mention first.
+    mention = settings.bot_mention_name.strip()
+    if mention and text.startswith(mention):
+        text = text[len(mention):]
+    else:
+        text = _LEADING_MENTION_RE.sub("", text, count=1)
+    return _QUERY_RE.match(text)
+
+
+def is_backlog_query(text: str) -> bool:
+    return _match_query(text) is not None
+
+
+def answer_backlog_query(text: str) -> str | None:
+    """Reply text for a backlog lookup command, or None if `text` is not one."""
+    match = _match_query(text)
+    if not match:
+        return None
+    command = match.group(1).lower()
+    argument = match.group(2).strip()
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return "No backlog snapshot loaded yet; it is built on the next import."
+    if command == "summary":
+        return _format_group(snapshot, "All backlogs", None)
+    if not argument:
+        return f"Usage: /backlogs {command} <value>"
+    rows = snapshot.find(_QUERY_FIELDS[command], argument)
+    if not rows:
+        return f"No backlog rows for {command} {argument}."
+    if command in ("to", "tracking"):
+        return "\n\n".join(_format_row(snapshot, row) for row in rows[:MAX_LISTED_ROWS])
+    return _format_group(snapshot, f"{command.capitalize()} {snapshot.value(_QUERY_FIELDS[command], rows[0])}", rows)
+
+
+def _format_row(snapshot: BacklogSnapshot, row: int) -> str:
+    data = snapshot.row(row)
+    return "\n".join(f"{name}: {value}" for name, value in data.items() if value not in ("", None))
+
+
+def _format_group(snapshot: BacklogSnapshot, title: str, rows: list[int] | None) -> str:
+    count = snapshot.rows if rows is None else len(rows)
+    lines = [f"{title}: {count} TOs, qty {snapshot.quantity(rows)}"]
+    for status, n in snapshot.counts("receive_status", rows).most_common():
+        lines.append(f"- {status or '(blank)'}: {n}")
+    if rows is not None:
+        listed = rows[:MAX_LISTED_ROWS]
+        lines.append("TOs: " + ", ".join(snapshot.value("to_number", row) for row in listed))
+        if count > len(listed):
+            lines.append(f"... and {count - len(listed)} more")
+    return "\n".join(lines)
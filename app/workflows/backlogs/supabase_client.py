@@ -1,45 +1,244 @@
-import os
+import gzip
+import itertools
+import json
 import logging
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date
+
 import httpx
 
+from app.workflows.backlogs.env import get_env
+
 logger = logging.getLogger("backlogs_supabase")
 
+# Upserts replace the existing row for the same TO in the same source file and import
+# day; the table is partitioned by import_date, so the unique key has to include it.
+UPSERT_KEY = ("source_file_id", "to_number", "import_date")
+# Throttled/unavailable responses never applied the batch, so they are safe to resend
+# even for plain inserts; gateway timeouts may have, so only upserts retry those.
+RETRY_STATUSES_INSERT = {429, 503}
+RETRY_STATUSES_UPSERT = {429, 500, 502, 503, 504}
 
-def _get_env(name, default=None):
-    value = os.environ.get(name)
-    return value if value not in (None, "") else default
+_client_lock = threading.Lock()
+_client: httpx.Client | None = None
+# Flipped off if the gateway rejects gzip request bodies.
+_gzip_supported = True
 
 
 def get_supabase_config():
-    url = _get_env("SUPABASE_URL")
-    key = _get_env("SUPABASE_SERVICE_ROLE_KEY")
-    table = _get_env("SUPABASE_BACKLOGS_TABLE", "backlogs_rows")
+    url = get_env("SUPABASE_URL")
+    key = get_env("SUPABASE_SERVICE_ROLE_KEY")
+    table = get_env("SUPABASE_BACKLOGS_TABLE", "backlogs_rows")
     if not url or not key:
         raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
     return url.rstrip("/"), key, table
 
 
-def insert_backlogs_rows(rows: list[dict], batch_size: int = 2000) -> int:
-    if not rows:
-        return 0
-    base_url, key, table = get_supabase_config()
-    endpoint = f"{base_url}/rest/v1/{table}"
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-        "Prefer": "return=representation",
-    }
-    inserted_total = 0
-    with httpx.Client(timeout=30) as client:
-        for offset in range(0, len(rows), batch_size):
-            chunk = rows[offset : offset + batch_size]
-            resp = client.post(endpoint, headers=headers, json=chunk)
+def _shared_client() -> httpx.Client:
+    """Process-wide client so connections to PostgREST are reused across imports."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(
+                timeout=httpx.Timeout(60, connect=10),
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+            )
+        return _client
+
+
+class SupabaseBulkWriter:
+    """Writes row dicts to a PostgREST table in concurrent batches.
+
+    Batches are sent with `Prefer: return=minimal` (nothing echoed back) and gzip'd
+    bodies, at most `concurrency` at a time while `rows` is consumed lazily. In
+    `upsert` mode rows merge on UPSERT_KEY, which needs the unique index from
+    supabase_schema.sql but makes a retried import idempotent.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 2000,
+        concurrency: int = 4,
+        mode: str = "insert",
+        compress: bool = True,
+        max_retries: int = 4,
+    ) -> None:
+        if mode not in ("insert", "upsert"):
+            raise ValueError("mode must be 'insert' or 'upsert'")
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.mode = mode
+        self.compress = compress
+        self.max_retries = max(0, max_retries)
+        base_url, key, table = get_supabase_config()
+        self.endpoint = f"{base_url}/rest/v1/{table}"
+        self.params = {"on_conflict": ",".join(UPSERT_KEY)} if mode == "upsert" else None
+        prefer = "return=minimal"
+        if mode == "upsert":
+            prefer += ",resolution=merge-duplicates"
+        self.headers = {
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+            "Prefer": prefer,
+        }
+        self.retry_statuses = RETRY_STATUSES_UPSERT if mode == "upsert" else RETRY_STATUSES_INSERT
+
+    def _encode(self, batch: list[dict]) -> tuple[bytes, int]:
+        """(request body, rows it carries); upsert mode collapses repeated keys first."""
+        if self.mode == "upsert":
+            # One statement cannot touch the same conflict key twice; the last row wins.
+            batch = list({tuple(row.get(k) for k in UPSERT_KEY): row for row in batch}.values())
+        return json.dumps(batch, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), len(batch)
+
+    def _post(self, body: bytes) -> None:
+        global _gzip_supported
+        client = _shared_client()
+        attempt = 0
+        while True:
+            attempt += 1
+            headers = self.headers
+            content = body
+            use_gzip = self.compress and _gzip_supported
+            if use_gzip:
+                headers = {**headers, "Content-Encoding": "gzip"}
+                content = gzip.compress(body, compresslevel=1)
+            try:
+                resp = client.post(self.endpoint, params=self.params, headers=headers, content=content)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as exc:
+                # The request never reached the server; always safe to resend.
+                if attempt > self.max_retries:
+                    raise
+                self._backoff(attempt, None, f"{type(exc).__name__}")
+                continue
+            if use_gzip and (resp.status_code == 415 or (resp.status_code == 400 and _looks_like_gzip_rejected(resp))):
+                logger.warning("Supabase rejected a gzip body (%s); sending uncompressed from now on.", resp.status_code)
+                _gzip_supported = False
+                continue
+            if resp.status_code in self.retry_statuses and attempt <= self.max_retries:
+                self._backoff(attempt, resp.headers.get("retry-after"), str(resp.status_code))
+                continue
             try:
                 resp.raise_for_status()
             except Exception:
-                logger.error("Supabase insert failed: %s %s", resp.status_code, resp.text)
+                logger.error("Supabase %s failed: %s %s", self.mode, resp.status_code, resp.text[:500])
                 raise
-            data = resp.json()
-            inserted_total += len(data) if isinstance(data, list) else 0
-    return inserted_total
+            return
+
+    def _backoff(self, attempt: int, retry_after: str | None, reason: str) -> None:
+        try:
+            delay = float(retry_after) if retry_after is not None else None
+        except ValueError:
+            delay = None
+        if delay is None:
+            delay = min(30.0, 0.5 * 2 ** (attempt - 1)) + random.uniform(0, 0.5)
+        logger.warning("Supabase batch failed (%s, attempt %d); retrying in %.1fs", reason, attempt, delay)
+        time.sleep(delay)
+
+    def write(self, rows: Iterable[dict]) -> int:
+        """Send every row; returns the number of rows accepted. At most `concurrency`
+        batches are in flight and `2 * concurrency` buffered, so memory stays bounded."""
+        rows = iter(rows)
+        written = 0
+        pending: deque[tuple[Future, int]] = deque()
+
+        def collect(block: bool) -> None:
+            nonlocal written
+            if not pending:
+                return
+            done, _ = wait([f for f, _ in pending], return_when=FIRST_COMPLETED, timeout=None if block else 0)
+            for _ in range(len(pending)):
+                future, count = pending.popleft()
+                if future in done:
+                    future.result()
+                    written += count
+                else:
+                    pending.append((future, count))
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="supabase-write") as executor:
+            try:
+                while True:
+                    batch = list(itertools.islice(rows, self.batch_size))
+                    if not batch:
+                        break
+                    while len(pending) >= 2 * self.concurrency:
+                        collect(block=True)
+                    body, count = self._encode(batch)
+                    pending.append((executor.submit(self._post, body), count))
+                    collect(block=False)
+                while pending:
+                    collect(block=True)
+            except BaseException:
+                for future, _ in pending:
+                    future.cancel()
+                raise
+        return written
+
+
+def _looks_like_gzip_rejected(resp: httpx.Response) -> bool:
+    # Our bodies are always valid JSON, so a parse error means the gzip was not decoded.
+    text = resp.text.lower()
+    return "json" in text and ("parse" in text or "invalid" in text or "unexpected" in text)
+
+
+def insert_backlogs_rows(rows: Iterable[dict], batch_size: int = 2000) -> int:
+    """Write rows in batches of `batch_size`; `rows` is consumed lazily, a few batches at a time."""
+    rows = iter(rows)
+    first = list(itertools.islice(rows, batch_size))
+    if not first:
+        return 0
+    writer = SupabaseBulkWriter(
+        batch_size=batch_size,
+        concurrency=int(get_env("SUPABASE_INSERT_CONCURRENCY", "4")),
+        mode=get_env("SUPABASE_WRITE_MODE", "insert").lower(),
+        compress=get_env("SUPABASE_GZIP", "1") not in ("0", "false", "no"),
+    )
+    return writer.write(itertools.chain(first, rows))
+
+
+def _rpc(function: str, payload: dict) -> object:
+    base_url, key, _ = get_supabase_config()
+    resp = _shared_client().post(
+        f"{base_url}/rest/v1/rpc/{function}",
+        headers={"apikey": key, "Authorization": f"Bearer {key}", "Content-Type": "application/json"},
+        json=payload,
+    )
+    if resp.status_code >= 400:
+        logger.error("Supabase rpc %s failed: %s %s", function, resp.status_code, resp.text[:500])
+    resp.raise_for_status()
+    return resp.json() if resp.content else None
+
+
+def existing_import_date(source_file_id: str) -> date | None:
+    """import_date of rows already written for `source_file_id`, if any (one indexed read)."""
+    base_url, key, table = get_supabase_config()
+    resp = _shared_client().get(
+        f"{base_url}/rest/v1/{table}",
+        params={"select": "import_date", "source_file_id": f"eq.{source_file_id}", "limit": "1"},
+        headers={"apikey": key, "Authorization": f"Bearer {key}"},
+    )
+    if resp.status_code >= 400:
+        logger.error("Supabase import_date lookup failed: %s %s", resp.status_code, resp.text[:500])
+    resp.raise_for_status()
+    data = resp.json()
+    return date.fromisoformat(data[0]["import_date"]) if data else None
+
+
+def ensure_backlogs_partition(day: date) -> str:
+    """Create the backlogs_rows partition for `day` if needed; returns its name."""
+    return str(_rpc("backlogs_rows_ensure_partition", {"day": day.isoformat()}))
+
+
+def prune_backlogs_rows(retain_days: int) -> list[str]:
+    """Drop backlogs_rows partitions older than `retain_days` days; returns the dropped names."""
+    resp = _rpc("backlogs_rows_prune", {"retain_days": retain_days}) or []
+    # setof text comes back as bare strings or as {"backlogs_rows_prune": ...} objects.
+    dropped = [str(item.get("backlogs_rows_prune") if isinstance(item, dict) else item) for item in resp]
+    if dropped:
+        logger.info("Pruned Supabase backlog partitions: %s", ", ".join(dropped))
+    return dropped
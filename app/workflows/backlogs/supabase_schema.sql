@@ -1,21 +1,100 @@
 -- Supabase schema for backlogs_update
--- Create table for filtered backlog rows
+-- Filtered backlog rows, typed and partitioned by import date so old imports can be
+-- dropped a whole partition at a time.
+--
+-- Migrating from the earlier untyped table (index names are per schema, so the old
+-- indexes are renamed too; otherwise the `if not exists` below skips the new ones):
+--   alter table backlogs_rows rename to backlogs_rows_legacy;
+--   alter index if exists idx_backlogs_rows_source_file_id rename to idx_backlogs_rows_legacy_source_file_id;
+--   alter index if exists uq_backlogs_rows_source_file_to_number rename to uq_backlogs_rows_legacy_source_file_to_number;
+--   (run this file, then drop backlogs_rows_legacy once it is no longer needed)
 
 create table if not exists backlogs_rows (
-  id bigserial primary key,
+  id bigint generated always as identity,
+  import_date date not null default current_date,
   source_file_id text not null,
   to_number text,
   spx_tracking_number text,
   receiver_name text,
-  to_order_quantity text,
+  to_order_quantity integer,
   operator text,
-  create_time text,
-  complete_time text,
+  create_time timestamptz,
+  complete_time timestamptz,
   remark text,
   receive_status text,
   staging_area_id text,
-  imported_at timestamptz default now()
-);
+  imported_at timestamptz not null default now(),
+  primary key (id, import_date)
+) partition by range (import_date);
 
-create index if not exists idx_backlogs_rows_source_file_id
-  on backlogs_rows (source_file_id);
+-- Indexes on the parent are created on every partition.
+create index if not exists idx_backlogs_rows_source_file_id on backlogs_rows (source_file_id);
+create index if not exists idx_backlogs_rows_to_number on backlogs_rows (to_number);
+create index if not exists idx_backlogs_rows_receiver_name on backlogs_rows (receiver_name);
+create index if not exists idx_backlogs_rows_staging_area_id on backlogs_rows (staging_area_id);
+create index if not exists idx_backlogs_rows_receive_status on backlogs_rows (receive_status);
+
+-- Needed for SUPABASE_WRITE_MODE=upsert: rows merge on (source_file_id, to_number,
+-- import_date), so a retried import rewrites its rows instead of duplicating them. The
+-- importer reuses the import_date of earlier rows for the same file, so this holds for
+-- a retry on a later day too.
+-- Unique indexes on a partitioned table must include the partition key.
+create unique index if not exists uq_backlogs_rows_source_file_to_number
+  on backlogs_rows (source_file_id, to_number, import_date);
+
+-- Creates the daily partition for `day` if it does not exist yet. The importer calls
+-- it (POST /rest/v1/rpc/backlogs_rows_ensure_partition) before writing.
+create or replace function backlogs_rows_ensure_partition(day date)
+returns text
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  part text := format('backlogs_rows_%s', to_char(day, 'YYYYMMDD'));
+begin
+  if to_regclass(part) is null then
+    execute format(
+      'create table if not exists %I partition of backlogs_rows for values from (%L) to (%L)',
+      part, day, day + 1
+    );
+  end if;
+  return part;
+end;
+$$;
+
+-- Drops daily partitions older than `retain_days` days; returns the dropped names.
+-- The importer calls it after each import (SUPABASE_RETENTION_DAYS); it can also be
+-- scheduled with pg_cron:
+--   select cron.schedule('backlogs-rows-prune', '15 3 * * *', 'select backlogs_rows_prune(14)');
+create or replace function backlogs_rows_prune(retain_days integer default 14)
+returns setof text
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  part record;
+  cutoff date := current_date - retain_days;
+begin
+  for part in
+    select c.relname
+    from pg_inherits i
+    join pg_class c on c.oid = i.inhrelid
+    join pg_class p on p.oid = i.inhparent
+    where p.relname = 'backlogs_rows'
+      and c.relname ~ '^backlogs_rows_[0-9]{8}$'
+      and to_date(right(c.relname, 8), 'YYYYMMDD') < cutoff
+  loop
+    execute format('drop table if exists %I', part.relname);
+    return next part.relname;
+  end loop;
+end;
+$$;
+
+revoke all on function backlogs_rows_ensure_partition(date) from public, anon, authenticated;
+revoke all on function backlogs_rows_prune(integer) from public, anon, authenticated;
+grant execute on function backlogs_rows_ensure_partition(date) to service_role;
+grant execute on function backlogs_rows_prune(integer) to service_role;
+
+select backlogs_rows_ensure_partition(current_date);
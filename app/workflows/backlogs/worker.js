@@ -162,18 +162,39 @@ async function streamZipAndFilter(zipStream, maxRows) {
 }
 
 async function sendToFastAPI(env, rows, fileId) {
-  const body = {
-    file_id: fileId,
-    rows,
+  // NDJSON (file_id line, then one row per line), gzip'd and streamed so neither
+  // side has to hold the whole request body in memory.
+  const encoder = new TextEncoder();
+  let index = -1;
+  const ndjson = new ReadableStream({
+    pull(controller) {
+      if (index < 0) {
+        controller.enqueue(encoder.encode(JSON.stringify({ file_id: fileId }) + "\n"));
+        index = 0;
+        return;
+      }
+      if (index >= rows.length) {
+        controller.close();
+        return;
+      }
+      const end = Math.min(index + 1000, rows.length);
+      let text = "";
+      for (; index < end; index++) text += JSON.stringify(rows[index]) + "\n";
+      controller.enqueue(encoder.encode(text));
+    },
+  });
+
+  const headers = {
+    "Content-Type": "application/x-ndjson",
+    "Content-Encoding": "gzip",
   };
-  const headers = { "Content-Type": "application/json" };
   if (env.FASTAPI_WEBHOOK_TOKEN) {
     headers["x-webhook-token"] = env.FASTAPI_WEBHOOK_TOKEN;
   }
   const resp = await fetch(env.FASTAPI_WEBHOOK_URL, {
     method: "POST",
     headers,
-    body: JSON.stringify(body),
+    body: ndjson.pipeThrough(new CompressionStream("gzip")),
   });
   if (!resp.ok) {
     throw new Error(`FastAPI webhook failed: ${resp.status}`);
@@ -3,9 +3,13 @@ from __future__ import annotations
 import logging
 from typing import Any
 
+from app.processing.jobs import CANCELLED, SUCCEEDED, Job, get_job_executor
 from app.seatalk.client import SeaTalkClient
+from app.seatalk.event_types import MESSAGE_EVENT_TYPES
+from app.workflows.backlogs.snapshot import answer_backlog_query
 from app.workflows.helpers import (
     build_sheet_update_text,
+    extract_context,
     send_text_from_workflow,
     supports_by_keyword,
 )
@@ -26,22 +30,45 @@ class BacklogsWorkflow:
         event = payload.get("event", {}) if isinstance(payload.get("event", {}), dict) else {}
         drive_file_id = str(event.get("drive_file_id", "") or event.get("file_id", "") or "").strip()
 
+        # Lookups ("/backlogs receiver X") are answered from the in-memory snapshot.
+        # Chat messages get their answer from the chat graph, so only reply to callbacks here.
+        ctx = extract_context(payload)
+        if not drive_file_id:
+            answer = answer_backlog_query(ctx.callback_value or ctx.text)
+            if answer is not None:
+                if ctx.event_type not in MESSAGE_EVENT_TYPES:
+                    send_text_from_workflow(self.seatalk_client, payload, answer)
+                return
+
         message = build_sheet_update_text(self.name, payload)
 
         # Optional: trigger the backlog Drive->Sheet pipeline when a file id is provided.
+        # Imports take minutes, so they run as a background job and report back when done.
         if drive_file_id:
-            try:
-                from app.workflows.backlogs.backlogs_update import process_backlogs_update
-
-                result = process_backlogs_update(drive_file_id)
-                status = str(result.get("status", "ok"))
-                rows = result.get("rows_written")
-                if rows is not None:
-                    message = f"{message}\nstatus: {status}\nrows_written: {rows}"
-                else:
-                    message = f"{message}\nstatus: {status}"
-            except Exception as exc:
-                logger.exception("Backlogs pipeline failed for file_id=%s", drive_file_id)
-                message = f"{message}\nstatus: failed\nerror: {exc}"
+            from app.workflows.backlogs.backlogs_update import process_backlogs_update
+
+            header = message
+
+            def report(job: Job) -> None:
+                send_text_from_workflow(self.seatalk_client, payload, _job_result_text(header, job))
+
+            job, created = get_job_executor().submit(
+                "backlogs_import", drive_file_id, process_backlogs_update, drive_file_id, on_done=report
+            )
+            state = "queued" if created else f"already {job.status}"
+            message = f"{message}\nstatus: {state}\njob_id: {job.job_id}"
 
         send_text_from_workflow(self.seatalk_client, payload, message)
+
+
+def _job_result_text(message: str, job: Job) -> str:
+    if job.status == SUCCEEDED:
+        result = job.result or {}
+        status = str(result.get("status", "ok"))
+        rows = result.get("rows_written")
+        if rows is not None:
+            return f"{message}\nstatus: {status}\nrows_written: {rows}"
+        return f"{message}\nstatus: {status}"
+    if job.status == CANCELLED:
+        return f"{message}\nstatus: cancelled\njob_id: {job.job_id}"
+    return f"{message}\nstatus: failed\nerror: {job.error}"
@@ -1,23 +1,35 @@
-from langgraph.graph import END, START, StateGraph
-
-from app.workflows.chat.nodes import call_model_node, check_message_node
+from app.workflows.chat.nodes import backlog_lookup_node, call_model_node, check_message_node
 from app.workflows.chat.state import ChatState
+from app.workflows.direct_graph import END, START, new_state_graph
 
 
 def _route_after_check(state: ChatState) -> str:
-    return "call_model" if state.get("should_reply") else "end"
+    return "backlog_lookup" if state.get("should_reply") else "end"
+
 
+def _route_after_lookup(state: ChatState) -> str:
+    return "end" if state.get("reply_text") else "call_model"
 
-def build_chat_graph():
-    graph = StateGraph(ChatState)
+
+def build_chat_graph(engine: str | None = None):
+    graph = new_state_graph(ChatState, engine)
 
     graph.add_node("check_message", check_message_node)
+    graph.add_node("backlog_lookup", backlog_lookup_node)
     graph.add_node("call_model", call_model_node)
 
     graph.add_edge(START, "check_message")
     graph.add_conditional_edges(
         "check_message",
         _route_after_check,
+        {
+            "backlog_lookup": "backlog_lookup",
+            "end": END,
+        },
+    )
+    graph.add_conditional_edges(
+        "backlog_lookup",
+        _route_after_lookup,
         {
             "call_model": "call_model",
             "end": END,
@@ -1,19 +1,12 @@
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+import time
 
 from app.config import settings
+from app.llm import get_llm
+from app.observability import metrics, tracing
 from app.seatalk.event_types import EVENT_NEW_MENTIONED_MESSAGE
 from app.workflows.chat.state import ChatState
 
 
-_llm = ChatOpenAI(
-    api_key=settings.llm_api_key,
-    model=settings.llm_model,
-    base_url=settings.llm_base_url,
-    temperature=0.2,
-)
-
-
 def check_message_node(state: ChatState) -> ChatState:
     text = (state.get("incoming_text") or "").strip()
     should_reply = bool(text)
@@ -28,7 +21,19 @@ def check_message_node(state: ChatState) -> ChatState:
     return state
 
 
+def backlog_lookup_node(state: ChatState) -> ChatState:
+    # Backlog lookups are answered from the in-memory snapshot without calling the model.
+    from app.workflows.backlogs.snapshot import answer_backlog_query
+
+    reply = answer_backlog_query(state.get("incoming_text") or "")
+    if reply is not None:
+        state["reply_text"] = reply
+    return state
+
+
 def call_model_node(state: ChatState) -> ChatState:
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
     history = state.get("messages", [])
 
     chat_messages = [SystemMessage(content=settings.llm_system_prompt)]
@@ -42,6 +47,19 @@ def call_model_node(state: ChatState) -> ChatState:
 
     chat_messages.append(HumanMessage(content=state.get("incoming_text", "")))
 
-    response = _llm.invoke(chat_messages)
+    model = settings.llm_model
+    started = time.perf_counter()
+    try:
+        with tracing.span("llm", model=model):
+            response = get_llm().invoke(chat_messages)
+    except Exception:
+        metrics.LLM_ERRORS.inc(model)
+        raise
+    finally:
+        metrics.LLM_LATENCY.observe(time.perf_counter() - started, model)
+    usage = getattr(response, "usage_metadata", None) or {}
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            metrics.LLM_TOKENS.inc(model, kind.removesuffix("_tokens"), amount=usage[kind])
     state["reply_text"] = str(response.content)
     return state
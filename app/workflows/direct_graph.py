@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from app.config import settings
+
+# Same sentinel values as langgraph.graph.START / END so builders can switch engines freely.
+START = "__start__"
+END = "__end__"
+
+NodeFn = Callable[[dict[str, Any]], dict[str, Any] | None]
+PathFn = Callable[[dict[str, Any]], str]
+
+
+class DirectStateGraph:
+    """Minimal StateGraph-compatible builder for linear or branching graphs.
+
+    Nodes are plain functions run in-thread; their returned dict is merged into
+    the state exactly like LangGraph's last-value channels. Fan-out (several
+    static edges from one node) is not supported and rejected at compile time.
+    """
+
+    def __init__(self, state_schema: type | None = None) -> None:
+        self.state_schema = state_schema
+        self.nodes: dict[str, NodeFn] = {}
+        self.edges: dict[str, str] = {}
+        self.branches: dict[str, tuple[PathFn, dict[str, str] | None]] = {}
+
+    def add_node(self, name: str, fn: NodeFn) -> None:
+        if name in (START, END):
+            raise ValueError(f"Node name '{name}' is reserved")
+        if name in self.nodes:
+            raise ValueError(f"Node '{name}' already added")
+        self.nodes[name] = fn
+
+    def add_edge(self, source: str, target: str) -> None:
+        if source in self.edges or source in self.branches:
+            raise ValueError(f"Node '{source}' already has an outgoing edge; fan-out is not supported")
+        self.edges[source] = target
+
+    def add_conditional_edges(
+        self,
+        source: str,
+        path: PathFn,
+        path_map: dict[str, str] | None = None,
+    ) -> None:
+        if source in self.edges or source in self.branches:
+            raise ValueError(f"Node '{source}' already has an outgoing edge; fan-out is not supported")
+        self.branches[source] = (path, dict(path_map) if path_map is not None else None)
+
+    def compile(self) -> CompiledDirectGraph:
+        if START not in self.edges and START not in self.branches:
+            raise ValueError("Graph must have an entrypoint edge from START")
+
+        known = set(self.nodes) | {END}
+        for source, target in self.edges.items():
+            if source != START and source not in self.nodes:
+                raise ValueError(f"Edge source '{source}' is not a node")
+            if target not in known:
+                raise ValueError(f"Edge target '{target}' is not a node")
+        for source, (_, path_map) in self.branches.items():
+            if source != START and source not in self.nodes:
+                raise ValueError(f"Branch source '{source}' is not a node")
+            for target in (path_map or {}).values():
+                if target not in known:
+                    raise ValueError(f"Branch target '{target}' is not a node")
+
+        channels: frozenset[str] | None = None
+        if self.state_schema is not None:
+            channels = frozenset(getattr(self.state_schema, "__annotations__", {}))
+
+        return CompiledDirectGraph(
+            nodes=dict(self.nodes),
+            edges=dict(self.edges),
+            branches=dict(self.branches),
+            channels=channels,
+        )
+
+
+class CompiledDirectGraph:
+    def __init__(
+        self,
+        nodes: dict[str, NodeFn],
+        edges: dict[str, str],
+        branches: dict[str, tuple[PathFn, dict[str, str] | None]],
+        channels: frozenset[str] | None,
+        recursion_limit: int = 25,
+    ) -> None:
+        self.nodes = nodes
+        self.edges = edges
+        self.branches = branches
+        self.channels = channels
+        self.recursion_limit = recursion_limit
+
+    def invoke(self, input_state: dict[str, Any]) -> dict[str, Any]:
+        state = self._filter(input_state)
+        current = self._next(START, state)
+        steps = 0
+        while current != END:
+            steps += 1
+            if steps > self.recursion_limit:
+                raise RuntimeError(f"Recursion limit of {self.recursion_limit} reached without hitting END")
+            update = self.nodes[current](dict(state))
+            if update:
+                state.update(self._filter(update))
+            current = self._next(current, state)
+        return state
+
+    def _next(self, source: str, state: dict[str, Any]) -> str:
+        target = self.edges.get(source)
+        if target is not None:
+            return target
+        branch = self.branches.get(source)
+        if branch is None:
+            # Nodes without outgoing edges terminate the run, as in LangGraph.
+            return END
+        path, path_map = branch
+        key = path(state)
+        if path_map is None:
+            return key
+        if key not in path_map:
+            raise ValueError(f"Branch from '{source}' returned unknown key '{key}'")
+        return path_map[key]
+
+    def _filter(self, values: dict[str, Any]) -> dict[str, Any]:
+        if self.channels is None:
+            return dict(values)
+        return {key: value for key, value in values.items() if key in self.channels}
+
+
+def new_state_graph(state_schema: type, engine: str | None = None) -> Any:
+    """Return a graph builder for `engine` (defaults to `WORKFLOW_GRAPH_ENGINE`).
+
+    `direct` runs nodes in-process without LangGraph's Pregel runtime;
+    `langgraph` keeps the full StateGraph for graphs that need its features.
+    """
+    selected = (engine or settings.workflow_graph_engine).strip().lower()
+    if selected == "langgraph":
+        from langgraph.graph import StateGraph
+
+        return StateGraph(state_schema)
+    return DirectStateGraph(state_schema)
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import logging
+import time
 from typing import Any
 
+from app.observability import metrics, tracing
 from app.seatalk.client import SeaTalkClient
 from app.workflows.automation.workflow import AutomationWorkflow
 from app.workflows.backlogs.workflow import BacklogsWorkflow
@@ -26,11 +28,27 @@ class AutomationWorkflowManager:
 
     def process(self, payload: dict[str, Any]) -> None:
         # Keep existing platform-automation behavior (typing, welcome, click response).
-        self.base_automation.process(payload)
+        started = time.perf_counter()
+        try:
+            with tracing.span("workflow:automation"):
+                self.base_automation.process(payload)
+        except Exception:
+            metrics.WORKFLOW_ERRORS.inc("automation")
+            raise
+        finally:
+            metrics.WORKFLOW_DURATION.observe(time.perf_counter() - started, "automation")
 
         for workflow in self.workflows:
             try:
-                if workflow.supports(payload):
-                    workflow.process(payload)
+                with tracing.span(f"supports:{workflow.name}"):
+                    supported = workflow.supports(payload)
+                if supported:
+                    started = time.perf_counter()
+                    try:
+                        with tracing.span(f"workflow:{workflow.name}"):
+                            workflow.process(payload)
+                    finally:
+                        metrics.WORKFLOW_DURATION.observe(time.perf_counter() - started, workflow.name)
             except Exception:
+                metrics.WORKFLOW_ERRORS.inc(workflow.name)
                 logger.exception("workflow '%s' failed", workflow.name)
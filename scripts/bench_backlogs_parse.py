@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Iterator
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.workflows.backlogs import backlogs_update  # noqa: E402
+
+EXTRA_COLUMNS = ["Sort Code", "Weight", "Length", "Width", "Height", "Seller ID", "Buyer Region", "Batch"]
+
+
+def write_sample_export(path: Path, members: int, rows_per_member: int, match_ratio: float, seed: int = 7) -> int:
+    """Write a ZIP shaped like a real export (UTF-8 with BOM plus one UTF-16LE member)."""
+    rnd = random.Random(seed)
+    header = ["Receiver type", "Current Station", *backlogs_update.OUTPUT_COLUMNS, *EXTRA_COLUMNS]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for member in range(members):
+            buf = io.StringIO()
+            writer = csv.writer(buf, lineterminator="\r\n")
+            writer.writerow(header)
+            for i in range(rows_per_member):
+                matched = rnd.random() < match_ratio
+                writer.writerow(
+                    [
+                        "Station" if matched or rnd.random() < 0.3 else "Hub",
+                        "SOC 5" if matched else f"SOC {rnd.randint(1, 4)}",
+                        f"TO{member:02d}{i:07d}",
+                        f"SPXPH{rnd.randint(10**9, 10**10)}",
+                        f"Receiver, {i % 997}",
+                        str(rnd.randint(1, 40)),
+                        f"ops{i % 31}@example.com",
+                        "2026-01-01 08:00:00",
+                        "2026-01-01 09:30:00",
+                        "" if i % 5 else "late",
+                        rnd.choice(["Received", "Pending"]),
+                        f"SA{i % 64}",
+                        *(str(rnd.randint(0, 9999)) for _ in EXTRA_COLUMNS),
+                    ]
+                )
+            encoding = "utf-16le" if member == 1 else "utf-8"
+            zf.writestr(f"export_{member:02d}.csv", ("﻿" + buf.getvalue()).encode(encoding))
+    return members * rows_per_member
+
+
+def legacy_rows(zip_file: Any, max_rows: int) -> Iterator[list[Any]]:
+    """The previous path: DictReader over every column, then per-row key lookups."""
+    values: list[dict[str, Any]] = []
+    with zipfile.ZipFile(zip_file) as zf:
+        for name in sorted(n for n in zf.namelist() if n.lower().endswith(".csv")):
+            with zf.open(name) as raw:
+                text = backlogs_update._open_csv_text(raw)
+                for row in csv.DictReader(line.replace("\x00", "") for line in text):
+                    values.append(row)
+                    if len(values) >= max_rows:
+                        break
+            if len(values) >= max_rows:
+                break
+    if not values:
+        return
+
+    def find_key(row: dict[str, Any], wanted: str) -> str | None:
+        normalized = backlogs_update._normalize_column(wanted)
+        return next((k for k in row if backlogs_update._normalize_column(k) == normalized), None)
+
+    keys = [find_key(values[0], name) for name in backlogs_update.OUTPUT_COLUMNS]
+    rt_key, cs_key = (find_key(values[0], name) for name in backlogs_update.FILTER_COLUMNS)
+    for row in values:
+        rt = str(row.get(rt_key) or "").strip().lower()
+        cs = str(row.get(cs_key) or "").strip().lower()
+        if rt == "station" and cs == "soc 5":
+            yield [row.get(key, "") if key else "" for key in keys]
+
+
+def _time(fn: Any, repeat: int) -> tuple[float, list[Any]]:
+    best = float("inf")
+    result: list[Any] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark backlog export parsing (rows/sec).")
+    parser.add_argument("--zip", type=Path, help="existing export to parse instead of a generated one")
+    parser.add_argument("--members", type=int, default=6)
+    parser.add_argument("--rows", type=int, default=50_000, help="rows per generated member")
+    parser.add_argument("--match-ratio", type=float, default=0.02)
+    parser.add_argument("--max-rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes for the parallel path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.zip
+        if path is None:
+            path = Path(tmp) / "export.zip"
+            write_sample_export(path, args.members, args.rows, args.match_ratio)
+        with zipfile.ZipFile(path) as zf:
+            total = 0
+            for name in zf.namelist():
+                if name.lower().endswith(".csv"):
+                    with zf.open(name) as raw:
+                        total += sum(1 for _ in backlogs_update._open_csv_text(raw)) - 1
+        total = min(total, args.max_rows)
+
+        paths = {
+            "dictreader": lambda: list(legacy_rows(path, args.max_rows)),
+            "projected": lambda: list(backlogs_update._iter_zip_filtered_rows(path, args.max_rows)),
+        }
+        if args.workers > 1:
+            paths[f"parallel x{args.workers}"] = lambda: list(
+                backlogs_update._iter_zip_filtered_rows_parallel(str(path), args.max_rows, args.workers)
+            )
+        results: dict[str, list[Any]] = {}
+        print(f"{total} data rows from {path.name}")
+        for name, fn in paths.items():
+            elapsed, results[name] = _time(fn, args.repeat)
+            print(f"{name:>12}: {elapsed:7.3f}s  {total / elapsed:12,.0f} rows/s  ({len(results[name])} matched)")
+
+    legacy = [list(row) for row in results["dictreader"]]
+    for name, rows in results.items():
+        if [list(row) for row in rows] != legacy:
+            raise SystemExit(f"{name} output differs from the DictReader path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.workflows.automation.graph import build_automation_graph  # noqa: E402
+
+SAMPLE_EVENTS: list[dict[str, Any]] = [
+    {
+        "event_type": "new_mentioned_message_received_from_group_chat",
+        "event": {"group_id": "g1", "message": {"thread_id": "t1", "text": {"plain_text": "hi"}}},
+    },
+    {"event_type": "bot_added_to_group_chat", "event": {"group": {"group_id": "g2"}}},
+    {"event_type": "user_enter_chatroom_with_bot", "event": {"employee_code": "e1"}},
+    {"event_type": "interactive_message_click", "event": {"value": "ok", "employee_code": "e2"}},
+    {"event_type": "unknown_event", "event": {}},
+]
+
+
+class _NullSeaTalkClient:
+    def set_group_typing_status(self, **_: Any) -> dict[str, Any]:
+        return {}
+
+    def send_group_text(self, **_: Any) -> dict[str, Any]:
+        return {}
+
+    def send_single_text(self, **_: Any) -> dict[str, Any]:
+        return {}
+
+
+def _initial_state(payload: dict[str, Any], client: Any) -> dict[str, Any]:
+    return {
+        "event_type": str(payload.get("event_type", "") or ""),
+        "payload": payload,
+        "seatalk_client": client,
+        "action": "noop",
+        "group_id": "",
+        "employee_code": "",
+        "thread_id": "",
+        "response_text": "",
+    }
+
+
+def _run(graph: Any, client: Any, iterations: int) -> float:
+    states = [_initial_state(p, client) for p in SAMPLE_EVENTS]
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for state in states:
+            graph.invoke(dict(state))
+    elapsed = time.perf_counter() - started
+    return elapsed / (iterations * len(states)) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-event overhead of graph engines.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    client = _NullSeaTalkClient()
+    graphs = {"direct": build_automation_graph("direct")}
+    try:
+        graphs["langgraph"] = build_automation_graph("langgraph")
+    except ImportError:
+        print("langgraph not installed; benchmarking direct engine only")
+
+    if "langgraph" in graphs:
+        for payload in SAMPLE_EVENTS:
+            direct = graphs["direct"].invoke(_initial_state(payload, client))
+            reference = graphs["langgraph"].invoke(_initial_state(payload, client))
+            if direct != reference:
+                raise SystemExit(f"Engine mismatch for {payload['event_type']}: {direct} != {reference}")
+
+    for name, graph in graphs.items():
+        per_event_us = _run(graph, client, args.iterations)
+        print(f"{name:>10}: {per_event_us:8.1f} us/event")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.workflows.backlogs.pdf_raster import PdfRasterizer, parse_crop  # noqa: E402
+
+
+def sample_pdf() -> bytes:
+    """A one-page PDF shaped like the dashboard export (table on a page with margins)."""
+    from PIL import Image, ImageDraw
+
+    page = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(page)
+    for row in range(58):
+        y = 120 + row * 24
+        draw.line((100, y, 1140, y), fill=(200, 200, 200))
+        for col in range(17):
+            draw.text((104 + col * 61, y + 5), f"{row * col % 997}", fill=(20, 20, 20))
+    out = io.BytesIO()
+    page.save(out, format="PDF", resolution=150)
+    return out.getvalue()
+
+
+def _timings(fn: Callable[[], Any], repeat: int) -> tuple[float, list[float], Any]:
+    """(first call, following calls, last result); the first call includes warm-up."""
+    started = time.perf_counter()
+    result = fn()
+    first = time.perf_counter() - started
+    rest = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        rest.append(time.perf_counter() - started)
+    return first, rest, result
+
+
+def _report(name: str, first: float, rest: list[float], png: bytes) -> None:
+    median = statistics.median(rest) if rest else first
+    print(f"{name:>8}: first {first * 1000:8.1f} ms  median {median * 1000:8.1f} ms  png {len(png):,} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark local PDF->PNG rendering against the remote renderer.")
+    parser.add_argument("--pdf", type=Path, help="dashboard PDF to render instead of a generated one")
+    parser.add_argument("--remote", help="renderer URL (BACKLOGS_PDF_RENDERER_URL) to compare against")
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--crop", default="auto", help="'auto', 'none' or 'left,top,right,bottom' points")
+    parser.add_argument("--workers", type=int, default=1, help="pool processes; 0 renders in-process")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", type=Path, help="write the locally rendered PNG here")
+    args = parser.parse_args()
+
+    pdf_bytes = args.pdf.read_bytes() if args.pdf else sample_pdf()
+    print(f"{len(pdf_bytes):,} byte PDF, {args.dpi} dpi, crop={args.crop}")
+
+    rasterizer = PdfRasterizer(workers=args.workers, dpi=args.dpi, crop=parse_crop(args.crop))
+    try:
+        first, rest, png = _timings(lambda: rasterizer.render(pdf_bytes), args.repeat)
+    finally:
+        rasterizer.shutdown()
+    _report("local", first, rest, png)
+    if args.out:
+        args.out.write_bytes(png)
+
+    if args.remote:
+        import httpx
+
+        with httpx.Client(timeout=60) as client:
+
+            def remote() -> bytes:
+                resp = client.post(args.remote, headers={"Content-Type": "application/pdf"}, content=pdf_bytes)
+                resp.raise_for_status()
+                return base64.b64decode(resp.json()["png_base64"])
+
+            first, rest, png = _timings(remote, args.repeat)
+        _report("remote", first, rest, png)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$")
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Return (module, self_us, cumulative_us, depth) rows from `-X importtime` output."""
+    rows: list[tuple[str, int, int, int]] = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        depth = max((len(indent) - 1) // 2, 0)
+        rows.append((module.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report import-time cost of a module.")
+    parser.add_argument("module", nargs="?", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parents[1]
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    wall_s = time.perf_counter() - started
+    rows = parse_importtime(proc.stderr)
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        print("\n".join(errors[-10:]))
+        raise SystemExit(proc.returncode)
+
+    top_level = [row for row in rows if row[3] == 0]
+    total_us = sum(row[2] for row in top_level)
+    print(f"import {args.module}: {total_us / 1000:.1f} ms in imports, {wall_s * 1000:.1f} ms process wall time")
+
+    by_package: dict[str, int] = {}
+    for module, self_us, _, _ in rows:
+        package = module.split(".", 1)[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    print("")
+    print(f"{'self ms':>10}  package")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"{self_us / 1000:10.1f}  {package}")
+
+    print("")
+    print(f"{'cumulative ms':>14} {'self ms':>10}  module")
+    for module, self_us, cumulative_us, _ in sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:10.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+from app.processing.async_webhook import AsyncWebhookProcessor
+from app.processing.spool import EventSpool
+
+
+class SlowRouter:
+    def __init__(self, delay_s: float) -> None:
+        self.delay_s = delay_s
+        self.handled: list[str] = []
+        self.started = threading.Event()
+
+    def handle_event(self, payload):
+        self.started.set()
+        time.sleep(self.delay_s)
+        self.handled.append(payload["event_id"])
+
+
+def _processor(tmp_path, router, **kwargs):
+    spool = EventSpool(str(tmp_path / "spool.jsonl"))
+    return AsyncWebhookProcessor(router, worker_count=1, spool=spool, **kwargs), spool
+
+
+async def _wait_started(router):
+    while not router.started.is_set():
+        await asyncio.sleep(0.01)
+
+
+def test_drain_spools_only_unstarted_events(tmp_path):
+    async def run():
+        router = SlowRouter(0.3)
+        processor, spool = _processor(tmp_path, router)
+        await processor.start()
+        for i in range(3):
+            assert await processor.enqueue({"event_id": f"e{i}"})
+        await _wait_started(router)
+        result = await processor.drain(0.05)
+        # e0 was running and is allowed to finish; e1/e2 never started.
+        assert result["completed"] is False
+        assert result["spooled"] == 2
+        assert result["stuck"] == 0
+        assert router.handled == ["e0"]
+        assert [p["event_id"] for p in spool.take()] == ["e1", "e2"]
+        assert not await processor.enqueue({"event_id": "late"})
+        await processor.stop()
+
+    asyncio.run(run())
+
+
+def test_drain_grace_bound_spools_stuck_events(tmp_path):
+    async def run():
+        router = SlowRouter(1.0)
+        processor, spool = _processor(tmp_path, router, drain_grace_s=0.1)
+        await processor.start()
+        await processor.enqueue({"event_id": "e0"})
+        await _wait_started(router)
+        started = time.monotonic()
+        result = await processor.drain(0.05)
+        assert time.monotonic() - started < 0.8
+        assert result["completed"] is False
+        assert result["stuck"] == 1
+        assert result["spooled"] == 1
+        assert [p["event_id"] for p in spool.take()] == ["e0"]
+        await processor.stop()
+
+    asyncio.run(run())
+
+
+def test_resume_replays_the_spool(tmp_path):
+    async def run():
+        router = SlowRouter(0.2)
+        processor, _ = _processor(tmp_path, router)
+        await processor.start()
+        await processor.enqueue({"event_id": "e0"})
+        await processor.enqueue({"event_id": "e1"})
+        await _wait_started(router)
+        await processor.drain(0.05)
+        status = await processor.resume()
+        assert status["draining"] is False
+        assert await processor.enqueue({"event_id": "e2"})
+        await asyncio.wait_for(processor.backend.join(), 2.0)
+        assert sorted(router.handled) == ["e0", "e1", "e2"]
+        await processor.stop()
+
+    asyncio.run(run())
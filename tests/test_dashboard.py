@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+
+from app.workflows.backlogs.dashboard import compute_aggregates
+from app.workflows.backlogs.snapshot import SnapshotBuilder
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc).timestamp()
+
+
+def _row(to, receiver, qty, created, status, area):
+    return [to, f"SPX-{to}", receiver, qty, "op", created, "", "", status, area]
+
+
+def _snapshot(rows):
+    return SnapshotBuilder("file-1", timezone.utc).extend(rows).build()
+
+
+def test_totals_and_groups():
+    snapshot = _snapshot(
+        [
+            _row("TO1", "Juan", "3", "2026-10-19 11:00:00", "Pending", "A1"),
+            _row("TO2", "Juan", "2", "2026-10-19 11:30:00", "Received", "A1"),
+            _row("TO3", "Maria", "5", "2026-10-19 10:00:00", "Pending", "B2"),
+            _row("TO4", "Ana", "1,000", "2026-10-19 10:00:00", "Pending", "B2"),
+        ]
+    )
+    agg = compute_aggregates(snapshot, now=NOW)
+    assert (agg.rows, agg.quantity) == (4, 1010)
+    assert agg.by_status == [("Pending", 3, 1008), ("Received", 1, 2)]
+    assert agg.by_area == [("A1", 2, 5), ("B2", 2, 1005)]
+    # Ties on row count are broken by name.
+    assert agg.by_receiver == [("Juan", 2, 5), ("Ana", 1, 1000), ("Maria", 1, 5)]
+    assert agg.source_file_id == "file-1"
+
+
+def test_top_limits_receivers_and_areas_but_not_statuses():
+    rows = [_row(f"TO{i}", f"R{i}", "1", "", f"S{i}", f"A{i}") for i in range(5)]
+    agg = compute_aggregates(_snapshot(rows), now=NOW, top=2)
+    assert len(agg.by_receiver) == 2
+    assert len(agg.by_area) == 2
+    assert len(agg.by_status) == 5
+
+
+def test_aging_buckets():
+    rows = [
+        _row("TO1", "R", "1", "2026-10-19 10:00:00", "P", "A"),  # 2h
+        _row("TO2", "R", "1", "2026-10-19 06:00:00", "P", "A"),  # 6h
+        _row("TO3", "R", "1", "2026-10-18 18:00:00", "P", "A"),  # 18h
+        _row("TO4", "R", "1", "2026-10-18 00:00:00", "P", "A"),  # 36h
+        _row("TO5", "R", "1", "2026-10-17 00:00:00", "P", "A"),  # 60h
+        _row("TO6", "R", "1", "2026-10-10 00:00:00", "P", "A"),  # 9 days
+        _row("TO7", "R", "1", "10/19/2026 11:00:00", "P", "A"),  # 1h, US layout
+        _row("TO8", "R", "1", "", "P", "A"),
+        _row("TO9", "R", "1", "not a date", "P", "A"),
+    ]
+    agg = compute_aggregates(_snapshot(rows), now=NOW)
+    assert dict(agg.aging) == {"0-4h": 2, "4-8h": 1, "8-24h": 1, "24-48h": 1, "48-72h": 1, ">72h": 1}
+    assert agg.no_create_time == 2
+
+
+def test_empty_snapshot():
+    agg = compute_aggregates(_snapshot([]), now=NOW)
+    assert (agg.rows, agg.quantity, agg.no_create_time) == (0, 0, 0)
+    assert agg.by_status == []
+    assert all(count == 0 for _, count in agg.aging)
+    assert agg.to_dict()["aging"][">72h"] == 0
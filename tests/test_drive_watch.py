@@ -0,0 +1,124 @@
+import json
+from contextlib import nullcontext
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from app.workflows.backlogs.drive_watch import DriveChangesWatcher  # noqa: E402
+
+FOLDER = "folder-1"
+
+
+class _Call:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeDrive:
+    """Serves `changes()` pages from a list of change batches; one batch per page token."""
+
+    def __init__(self):
+        self.batches: list[list[dict]] = []
+        self.list_calls: list[str] = []
+
+    def changes(self):
+        return self
+
+    def getStartPageToken(self, **kwargs):
+        return _Call({"startPageToken": "0"})
+
+    def list(self, pageToken, **kwargs):
+        self.list_calls.append(pageToken)
+        index = int(pageToken)
+        changes = self.batches[index] if index < len(self.batches) else []
+        return _Call({"changes": changes, "newStartPageToken": str(min(index + 1, len(self.batches)))})
+
+
+def _change(file_id, parents=(FOLDER,), name=None, **extra):
+    file_meta = {"id": file_id, "name": name or f"{file_id}.zip", "parents": list(parents), **extra}
+    return {"fileId": file_id, "file": file_meta}
+
+
+def _watcher(tmp_path, drive, **kwargs):
+    return DriveChangesWatcher(FOLDER, str(tmp_path / "watch.json"), lambda: nullcontext(drive), **kwargs)
+
+
+def test_first_poll_only_records_the_start_token(tmp_path):
+    drive = FakeDrive()
+    watcher = _watcher(tmp_path, drive)
+    assert watcher.poll() == []
+    assert watcher.page_token == "0"
+    assert drive.list_calls == []
+
+
+def test_new_exports_in_the_folder_are_emitted_once(tmp_path):
+    drive = FakeDrive()
+    drive.batches = [
+        [
+            _change("a"),
+            _change("other-folder", parents=("folder-2",)),
+            _change("not-a-zip", name="notes.txt"),
+            _change("trashed", trashed=True),
+            {"fileId": "gone", "removed": True},
+            _change("a"),
+        ],
+        [_change("a"), _change("b")],
+    ]
+    watcher = _watcher(tmp_path, drive)
+    watcher.poll()
+    assert [event.file_id for event in watcher.poll()] == ["a"]
+    assert watcher.settle()
+    # A later metadata touch of "a" is not an import again.
+    assert [event.file_id for event in watcher.poll()] == ["b"]
+
+
+def test_token_is_persisted_after_settle(tmp_path):
+    drive = FakeDrive()
+    drive.batches = [[_change("a")], [_change("b")]]
+    watcher = _watcher(tmp_path, drive)
+    watcher.poll()
+    watcher.poll()
+    watcher.settle()
+    state = json.loads((tmp_path / "watch.json").read_text())
+    assert state["page_token"] == "1"
+    assert "a" in state["recent"]
+
+    restarted = _watcher(tmp_path, drive)
+    assert restarted.page_token == "1"
+    assert [event.file_id for event in restarted.poll()] == ["b"]
+
+
+def test_failed_import_keeps_the_token_and_is_offered_again(tmp_path):
+    drive = FakeDrive()
+    drive.batches = [[_change("a"), _change("b")]]
+    watcher = _watcher(tmp_path, drive)
+    watcher.poll()
+    assert len(watcher.poll()) == 2
+    assert not watcher.settle(failed=["a"])
+    assert watcher.page_token == "0"
+
+    # Only the failed export comes back; "b" was handled. The attempt count survives a restart.
+    restarted = _watcher(tmp_path, drive)
+    assert [event.file_id for event in restarted.poll()] == ["a"]
+    assert json.loads((tmp_path / "watch.json").read_text())["failures"] == {"a": 1}
+    assert restarted.settle()
+    assert restarted.page_token == "1"
+
+
+def test_export_that_keeps_failing_is_skipped_after_max_attempts(tmp_path, caplog):
+    drive = FakeDrive()
+    drive.batches = [[_change("bad")]]
+    watcher = _watcher(tmp_path, drive, max_attempts=2)
+    watcher.poll()
+    watcher.poll()
+    assert not watcher.settle(failed=["bad"])
+    assert [event.file_id for event in watcher.poll()] == ["bad"]
+    with caplog.at_level("ERROR", logger="backlogs_update"):
+        assert watcher.settle(failed=["bad"])
+    assert "Giving up on backlog export bad" in caplog.text
+    assert watcher.page_token == "1"
+    assert watcher.poll() == []
@@ -0,0 +1,54 @@
+import base64
+import io
+import random
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from app.seatalk.images import ImageOptimizer
+
+
+def _png(size: tuple[int, int], noisy: bool = False) -> str:
+    image = Image.new("RGB", size, (255, 255, 255))
+    if noisy:
+        rng = random.Random(0)
+        image.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(size[0] * size[1])])
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+    return base64.b64encode(out.getvalue()).decode("ascii")
+
+
+def _decode(content: str):
+    return Image.open(io.BytesIO(base64.b64decode(content)))
+
+
+def test_small_image_passes_through():
+    content = _png((100, 50))
+    assert ImageOptimizer(target_bytes=100_000).optimize_base64(content) == content
+
+
+def test_oversized_image_is_shrunk_under_target():
+    content = _png((400, 400), noisy=True)
+    optimizer = ImageOptimizer(target_bytes=40_000, max_side=300)
+    optimized = optimizer.optimize_base64(content)
+    assert len(base64.b64decode(optimized)) <= 40_000
+    assert max(_decode(optimized).size) <= 300
+
+
+def test_not_an_image_passes_through():
+    assert ImageOptimizer().optimize_base64("not base64!") == "not base64!"
+    garbage = base64.b64encode(b"garbage").decode("ascii")
+    assert ImageOptimizer().optimize_base64(garbage) == garbage
+
+
+def test_results_are_cached_by_content(monkeypatch):
+    optimizer = ImageOptimizer(target_bytes=1, cache_size=1)
+    calls = []
+    monkeypatch.setattr(optimizer, "_encode", lambda content: calls.append(content) or content.lower())
+    first, second = _png((10, 10)), _png((20, 20))
+    assert optimizer.optimize_base64(first) == optimizer.optimize_base64(first)
+    assert calls == [first]
+    optimizer.optimize_base64(second)
+    optimizer.optimize_base64(first)
+    assert calls == [first, second, first]
@@ -0,0 +1,58 @@
+from app.workflows.backlogs.import_ledger import FAILED, OK, SKIPPED, ImportLedger
+
+META = {"name": "backlogs.zip", "md5Checksum": "abc123", "size": "2048"}
+
+
+def _ledger(tmp_path):
+    return ImportLedger(str(tmp_path / "imports.sqlite3"))
+
+
+def test_nothing_completed_in_an_empty_ledger(tmp_path):
+    ledger = _ledger(tmp_path)
+    assert ledger.is_empty()
+    assert ledger.find_completed("file-1", META) is None
+
+
+def test_finds_the_same_file_id(tmp_path):
+    ledger = _ledger(tmp_path)
+    run_id = ledger.start("file-1", {})
+    ledger.finish(run_id, OK, {"rows_written": 10})
+    found = ledger.find_completed("file-1", {})
+    assert found["id"] == run_id
+    assert found["rows_written"] == 10
+    assert found["result"] == {"rows_written": 10}
+
+
+def test_finds_a_reupload_with_the_same_content(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.finish(ledger.start("file-1", META), OK, {"rows_written": 10})
+    found = ledger.find_completed("file-2", dict(META, name="copy.zip"))
+    assert found["file_id"] == "file-1"
+
+
+def test_same_checksum_with_another_size_is_not_a_match(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.finish(ledger.start("file-1", META), OK)
+    assert ledger.find_completed("file-2", dict(META, size="4096")) is None
+
+
+def test_missing_checksums_never_match_each_other(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.finish(ledger.start("file-1", {"size": "2048"}), OK)
+    assert ledger.find_completed("file-2", {"size": "2048"}) is None
+
+
+def test_only_successful_runs_count(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.finish(ledger.start("file-1", META), FAILED, error="boom")
+    ledger.record("file-1", META, SKIPPED, {"reason": "duplicate"})
+    ledger.start("file-1", META)
+    assert ledger.find_completed("file-1", META) is None
+
+
+def test_latest_success_wins(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.finish(ledger.start("file-1", META), OK, {"rows_written": 1})
+    latest = ledger.start("file-2", META)
+    ledger.finish(latest, OK, {"rows_written": 2})
+    assert ledger.find_completed("file-3", META)["id"] == latest
@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.workflows.backlogs import pdf_raster
+from app.workflows.backlogs.pdf_raster import PdfRasterizer, parse_crop
+
+
+class FakePool:
+    def __init__(self, broken: bool) -> None:
+        self.broken = broken
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future: Future = Future()
+        if self.broken:
+            future.set_exception(BrokenProcessPool("worker died"))
+        else:
+            future.set_result(b"png")
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def _rasterizer(pools):
+    rasterizer = PdfRasterizer(workers=1)
+    created = iter(pools)
+
+    def pool():
+        with rasterizer._lock:
+            if rasterizer._executor is None:
+                rasterizer._executor = next(created)
+            return rasterizer._executor
+
+    rasterizer._pool = pool
+    return rasterizer
+
+
+def test_parse_crop():
+    assert parse_crop("auto") == "auto"
+    assert parse_crop("none") is None
+    assert parse_crop("1,2,3,4") == (1.0, 2.0, 3.0, 4.0)
+    with pytest.raises(ValueError):
+        parse_crop("1,2")
+
+
+def test_render_replaces_broken_pool():
+    broken, fresh = FakePool(broken=True), FakePool(broken=False)
+    rasterizer = _rasterizer([broken, fresh])
+    assert rasterizer.render(b"%PDF") == b"png"
+    assert broken.shut_down
+    assert rasterizer._executor is fresh
+
+
+def test_render_async_replaces_broken_pool():
+    broken, fresh = FakePool(broken=True), FakePool(broken=False)
+    rasterizer = _rasterizer([broken, fresh])
+    assert asyncio.run(rasterizer.render_async(b"%PDF")) == b"png"
+    assert broken.shut_down
+
+
+def test_render_retries_only_once():
+    rasterizer = _rasterizer([FakePool(broken=True), FakePool(broken=True)])
+    with pytest.raises(BrokenProcessPool):
+        rasterizer.render(b"%PDF")
+
+
+def test_shutdown_rasterizer_without_instance(monkeypatch):
+    monkeypatch.setattr(pdf_raster, "_rasterizer", None)
+    pdf_raster.shutdown_rasterizer()
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+from app.processing.queue_backends import DUPLICATE, FULL, QUEUED, SQLiteQueueBackend, SQLiteQueueStore
+
+
+def _backend(tmp_path, **kwargs):
+    return SQLiteQueueBackend(SQLiteQueueStore(str(tmp_path / "queue.sqlite3"), **kwargs), poll_interval_s=0.01)
+
+
+def _get(backend, consumer="c1", timeout=2.0):
+    return asyncio.wait_for(backend.get(consumer), timeout)
+
+
+def test_lease_and_ack(tmp_path):
+    async def run():
+        backend = _backend(tmp_path)
+        assert await backend.put({"event_id": "e1"}, "chat-1") == QUEUED
+        delivery = await _get(backend)
+        assert delivery.payload == {"event_id": "e1"}
+        assert delivery.attempts == 1
+        await backend.ack(delivery)
+        assert backend.store.stats() == (0, 0)
+        await backend.close()
+
+    asyncio.run(run())
+
+
+def test_duplicate_event_id_is_not_queued_twice(tmp_path):
+    async def run():
+        backend = _backend(tmp_path)
+        statuses = [
+            await backend.put({"event_id": event_id}, dedup_id=event_id) for event_id in ("e1", "e1", "e2")
+        ]
+        assert statuses == [QUEUED, DUPLICATE, QUEUED]
+        assert backend.store.stats()[0] == 2
+        await backend.close()
+
+    asyncio.run(run())
+
+
+def test_full_queue_rejects(tmp_path):
+    async def run():
+        backend = _backend(tmp_path, max_size=1)
+        assert await backend.put({"n": 1}) == QUEUED
+        assert await backend.put({"n": 2}) == FULL
+        await backend.close()
+
+    asyncio.run(run())
+
+
+def test_same_conversation_is_leased_in_order(tmp_path):
+    async def run():
+        backend = _backend(tmp_path)
+        await backend.put({"n": 1}, "chat-1")
+        await backend.put({"n": 2}, "chat-1")
+        await backend.put({"n": 3}, "chat-2")
+        first = await _get(backend, "c1")
+        other = await _get(backend, "c2")
+        # n=2 waits until n=1 of the same chat is acked.
+        assert (first.payload, other.payload) == ({"n": 1}, {"n": 3})
+        assert backend.store.lease("c3") == []
+        await backend.ack(first)
+        assert (await _get(backend, "c3")).payload == {"n": 2}
+        await backend.close()
+
+    asyncio.run(run())
+
+
+def test_nack_makes_the_message_visible_again(tmp_path):
+    async def run():
+        backend = _backend(tmp_path)
+        await backend.put({"n": 1})
+        delivery = await _get(backend)
+        await backend.nack(delivery)
+        again = await _get(backend, "c2")
+        assert again.message_id == delivery.message_id
+        assert again.attempts == 2
+        # The first lease is stale and can no longer ack.
+        assert not backend.store.ack(delivery.message_id, delivery.lease_token)
+        await backend.close()
+
+    asyncio.run(run())
+
+
+def test_exhausted_message_is_dead_lettered(tmp_path):
+    store = SQLiteQueueStore(str(tmp_path / "queue.sqlite3"), visibility_timeout_s=0.0, max_attempts=2)
+    store.put({"n": 1})
+    assert len(store.lease("c1")) == 1
+    assert len(store.lease("c1")) == 1
+    time.sleep(0.01)
+    assert store.lease("c1") == []
+    assert store.stats() == (0, 0)
+    (dead,) = store._conn.execute("select count(*) from queue_dead_letters").fetchone()
+    assert dead == 1
+    store.close()
+
+
+def test_lease_landing_after_cancel_is_released(tmp_path):
+    async def run():
+        backend = _backend(tmp_path)
+        await backend.put({"n": 1})
+        lease = backend.store.lease
+
+        def slow_lease(*args):
+            time.sleep(0.2)
+            return lease(*args)
+
+        backend.store.lease = slow_lease
+        getter = asyncio.create_task(backend.get("c1"))
+        await asyncio.sleep(0.05)
+        getter.cancel()
+        await asyncio.gather(getter, return_exceptions=True)
+        await asyncio.sleep(0.3)
+        backend.store.lease = lease
+        delivery = await _get(backend, "c2")
+        assert delivery.payload == {"n": 1}
+        assert delivery.attempts == 2
+        await backend.close()
+
+    asyncio.run(run())
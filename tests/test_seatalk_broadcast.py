@@ -0,0 +1,94 @@
+import pytest
+import requests
+import urllib3
+
+from app.seatalk import client as client_module
+from app.seatalk.client import SeaTalkClient
+
+
+class FakeAuth:
+    session = None
+
+    def __init__(self) -> None:
+        self.token_calls = 0
+
+    def get_token(self) -> str:
+        self.token_calls += 1
+        return "token"
+
+
+def _http_error(status: int, retry_after: str | None = None) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+    return requests.HTTPError(response=response)
+
+
+def _refused() -> requests.ConnectionError:
+    reason = urllib3.exceptions.NewConnectionError(None, "Connection refused")
+    return requests.ConnectionError(urllib3.exceptions.MaxRetryError(None, "/", reason=reason))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept: list[float] = []
+    monkeypatch.setattr(client_module.time, "sleep", slept.append)
+    return slept
+
+
+def _client(failures: dict[str, list[Exception]]) -> tuple[SeaTalkClient, list[dict]]:
+    client = SeaTalkClient(FakeAuth())
+    posted: list[dict] = []
+
+    def post(url, payload, token=None):
+        queued = failures.get(payload["group_id"])
+        if queued:
+            raise queued.pop(0)
+        posted.append(payload)
+        return {"code": 0}
+
+    client._post = post
+    return client, posted
+
+
+@pytest.mark.parametrize(
+    "error",
+    [_http_error(429), _http_error(503), requests.ConnectTimeout(), _refused()],
+    ids=["429", "503", "connect-timeout", "refused"],
+)
+def test_retries_when_message_was_not_delivered(sleeps, error):
+    client, posted = _client({"g1": [error]})
+    [result] = client.broadcast_group_text(["g1"], "hi", max_retries=2)
+    assert result.ok and result.attempts == 2
+    assert len(posted) == 1
+
+
+@pytest.mark.parametrize(
+    "error",
+    [_http_error(500), _http_error(502), _http_error(504), requests.ReadTimeout(), requests.ConnectionError("aborted")],
+    ids=["500", "502", "504", "read-timeout", "aborted"],
+)
+def test_does_not_retry_when_message_may_have_been_posted(sleeps, error):
+    client, posted = _client({"g1": [error]})
+    [result] = client.broadcast_group_text(["g1"], "hi", max_retries=2)
+    assert not result.ok and result.attempts == 1
+    assert posted == [] and sleeps == []
+
+
+def test_honours_retry_after_and_gives_up(sleeps):
+    client, _ = _client({"g1": [_http_error(429, "2") for _ in range(3)]})
+    [result] = client.broadcast_group_text(["g1"], "hi", max_retries=2)
+    assert not result.ok and result.status_code == 429
+    assert result.attempts == 3 and sleeps == [2.0, 2.0]
+
+
+def test_failing_group_does_not_affect_others(sleeps):
+    client, posted = _client({"g2": [_http_error(500)]})
+    messages = [{"tag": "text", "text": {"content": "a"}}, {"tag": "text", "text": {"content": "b"}}]
+    results = client.broadcast_group_messages(["g1", "g2", "g3", "g1", ""], messages, max_retries=1)
+    assert [r.group_id for r in results] == ["g1", "g2", "g3"]
+    assert [r.ok for r in results] == [True, False, True]
+    assert [r.sent for r in results] == [2, 0, 2]
+    assert sorted(p["group_id"] for p in posted) == ["g1", "g1", "g3", "g3"]
+    assert client.auth_manager.token_calls == 1
@@ -0,0 +1,82 @@
+from app.workflows.backlogs.sheet_sync import plan_sync, row_fingerprint
+
+
+def _rows(*tos):
+    return [[to, f"SPX-{to}", "Juan", "1"] for to in tos]
+
+
+def _fps(rows):
+    return [row_fingerprint(row) for row in rows]
+
+
+def _apply(previous_rows, plan):
+    """Sheet contents after writing `plan.runs` and clearing the slots past the layout."""
+    sheet = list(previous_rows)
+    sheet.extend([None] * (len(plan.layout) - len(sheet)))
+    for start, end in plan.runs:
+        sheet[start:end] = plan.layout[start:end]
+    return sheet[: len(plan.layout)]
+
+
+def test_first_sync_writes_everything():
+    rows = _rows("TO1", "TO2", "TO3")
+    plan = plan_sync([], rows)
+    assert plan.runs == [(0, 3)]
+    assert plan.inserted == 3
+    assert plan.layout == rows
+
+
+def test_unchanged_rows_write_nothing():
+    rows = _rows("TO1", "TO2", "TO3")
+    plan = plan_sync(_fps(rows), list(rows))
+    assert plan.runs == []
+    assert plan.unchanged == 3
+    assert plan.summary()["rows_cleared"] == 0
+
+
+def test_reordered_export_keeps_slots():
+    rows = _rows("TO1", "TO2", "TO3")
+    plan = plan_sync(_fps(rows), list(reversed(rows)))
+    assert plan.runs == []
+    assert plan.layout == rows
+
+
+def test_updated_row_is_rewritten_in_its_old_slot():
+    old = _rows("TO1", "TO2", "TO3")
+    new = [list(row) for row in old]
+    new[1][3] = "5"
+    plan = plan_sync(_fps(old), new)
+    assert plan.runs == [(1, 2)]
+    assert plan.updated == 1
+    assert plan.layout[1] == new[1]
+
+
+def test_inserted_row_is_appended():
+    old = _rows("TO1", "TO2")
+    new = _rows("TO0", "TO1", "TO2")
+    plan = plan_sync(_fps(old), new)
+    assert plan.runs == [(2, 3)]
+    assert plan.inserted == 1
+    assert _apply(old, plan) == old + _rows("TO0")
+
+
+def test_deleted_row_hole_is_filled_from_the_bottom():
+    old = _rows("TO1", "TO2", "TO3", "TO4")
+    new = _rows("TO1", "TO3", "TO4")
+    plan = plan_sync(_fps(old), new)
+    assert plan.deleted == 1
+    assert plan.moved == 1
+    assert plan.runs == [(1, 2)]
+    assert plan.summary()["rows_cleared"] == 1
+    sheet = _apply(old, plan)
+    assert sorted(row[0] for row in sheet) == ["TO1", "TO3", "TO4"]
+    assert plan.fingerprints == _fps(sheet)
+
+
+def test_duplicate_rows_each_get_a_slot():
+    old = _rows("TO1", "TO1")
+    new = _rows("TO1", "TO1", "TO1")
+    plan = plan_sync(_fps(old), new)
+    assert plan.unchanged == 2
+    assert plan.inserted == 1
+    assert plan.runs == [(2, 3)]
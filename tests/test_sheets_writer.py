@@ -0,0 +1,87 @@
+from contextlib import nullcontext
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from googleapiclient.errors import HttpError  # noqa: E402
+from httplib2 import Response  # noqa: E402
+
+from app.workflows.backlogs import sheets_writer  # noqa: E402
+from app.workflows.backlogs.sheets_writer import SheetsRangeWriter, plan_chunks  # noqa: E402
+
+
+def _http_error(status, **headers):
+    return HttpError(Response({"status": status, **headers}), b"{}")
+
+
+class FakeService:
+    """Stands in for `spreadsheets().values().batchUpdate(...).execute()`."""
+
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.calls = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.calls.append(body["data"][0]["range"])
+        return self
+
+    def execute(self):
+        if self.failures:
+            raise self.failures.pop(0)
+        return {}
+
+
+def _writer(service, **kwargs):
+    sleeps = []
+    writer = SheetsRangeWriter(lambda: nullcontext(service), "sheet-id", concurrency=1, sleep=sleeps.append, **kwargs)
+    return writer, sleeps
+
+
+def test_plan_chunks_splits_by_bytes():
+    values = [["x" * 10] for _ in range(5)]
+    chunks = list(plan_chunks(values, "Data", max_bytes=30))
+    assert [c.range for c in chunks] == ["Data!A2:J3", "Data!A4:J5", "Data!A6:J6"]
+    assert sum(c.rows for c in chunks) == 5
+
+
+def test_quota_error_is_retried_with_retry_after_and_halves_concurrency():
+    service = FakeService([_http_error(429, **{"retry-after": "3"}), _http_error(503)])
+    writer, sleeps = _writer(service)
+    writer._limit.limit = writer._limit.max_limit = 4
+    report = writer.write([["a"]], list(plan_chunks([["a"]], "Data")))
+    assert report.retries == 2
+    assert sleeps[0] == 3.0
+    assert 2.0 <= sleeps[1] < 3.0
+    assert writer._limit.limit == 2
+    assert len(service.calls) == 3
+
+
+def test_backoff_is_capped(monkeypatch):
+    monkeypatch.setattr(sheets_writer.random, "uniform", lambda a, b: 0.0)
+    writer, _ = _writer(FakeService([]))
+    assert writer._backoff_s(_http_error(500), 1) == 1.0
+    assert writer._backoff_s(_http_error(500), 20) == sheets_writer.MAX_BACKOFF_S
+    assert writer._backoff_s(_http_error(429, **{"retry-after": "999"}), 1) == sheets_writer.MAX_BACKOFF_S
+
+
+def test_non_retryable_error_is_raised_immediately():
+    service = FakeService([_http_error(400)])
+    writer, sleeps = _writer(service)
+    with pytest.raises(HttpError):
+        writer.write([["a"]], list(plan_chunks([["a"]], "Data")))
+    assert sleeps == []
+
+
+def test_gives_up_after_max_retries():
+    service = FakeService([_http_error(503)] * 3)
+    writer, sleeps = _writer(service, max_retries=2)
+    with pytest.raises(HttpError):
+        writer.write([["a"]], list(plan_chunks([["a"]], "Data")))
+    assert len(sleeps) == 2
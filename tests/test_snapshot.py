@@ -0,0 +1,71 @@
+import pytest
+
+from app.config import settings
+from app.workflows.backlogs import snapshot as snapshot_module
+from app.workflows.backlogs.snapshot import SnapshotBuilder, answer_backlog_query, publish_snapshot
+
+ROWS = [
+    ["TO1", "SPX1", "Juan Dela Cruz", "3", "op1", "2026-10-19 08:00:00", "", "", "Pending", "A1"],
+    ["TO2", "SPX2", "Juan Dela Cruz", "2", "op1", "2026-10-19 09:00:00", "", "", "Received", "A1"],
+    ["TO3", "SPX3", "Maria", "5", "op2", "2026-10-19 10:00:00", "", "", "Pending", "B2"],
+]
+
+
+@pytest.fixture(autouse=True)
+def published(monkeypatch):
+    monkeypatch.setattr(settings, "bot_mention_name", "@SPX Bot")
+    monkeypatch.setattr(snapshot_module, "_current", None)
+    publish_snapshot(SnapshotBuilder("file-1").extend(ROWS).build())
+
+
+def test_lookup_by_to_number():
+    reply = answer_backlog_query("/backlogs to to2")
+    assert "to_number: TO2" in reply
+    assert "receive_status: Received" in reply
+
+
+def test_lookup_by_tracking_number():
+    assert "to_number: TO3" in answer_backlog_query("/backlog tracking SPX3")
+
+
+def test_receiver_group_summary():
+    reply = answer_backlog_query("/backlogs receiver juan dela cruz")
+    assert reply.startswith("Receiver Juan Dela Cruz: 2 TOs, qty 5")
+    assert "TOs: TO1, TO2" in reply
+
+
+def test_area_and_summary():
+    assert answer_backlog_query("/backlogs area B2").startswith("Area B2: 1 TOs, qty 5")
+    assert answer_backlog_query("/BACKLOGS summary").startswith("All backlogs: 3 TOs, qty 10")
+
+
+@pytest.mark.parametrize("text", ["@SPX Bot /backlogs to TO1", "@bot /backlogs to TO1", "  /backlogs to TO1"])
+def test_leading_mention_is_ignored(text):
+    assert "to_number: TO1" in answer_backlog_query(text)
+
+
+def test_unknown_value_and_missing_argument():
+    assert answer_backlog_query("/backlogs to TO9") == "No backlog rows for to TO9."
+    assert answer_backlog_query("/backlogs receiver") == "Usage: /backlogs receiver <value>"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "@SPX Bot can you send the backlog to Juan?",
+        "backlog to TO123",
+        "backlogs summary please",
+        "please run /backlogs to TO1",
+        "what is /backlogs summary?",
+        "/backlogger to TO1",
+        "/backlogs",
+        "",
+    ],
+)
+def test_ordinary_chat_is_not_a_query(text):
+    assert answer_backlog_query(text) is None
+
+
+def test_no_snapshot_yet(monkeypatch):
+    monkeypatch.setattr(snapshot_module, "_current", None)
+    assert "No backlog snapshot" in answer_backlog_query("/backlogs summary")
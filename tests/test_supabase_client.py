@@ -0,0 +1,100 @@
+import gzip
+import json
+import threading
+from datetime import date
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.workflows.backlogs import supabase_client
+from app.workflows.backlogs.supabase_client import SupabaseBulkWriter
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Routes the shared client to an in-process handler; `responses` holds status codes to return first."""
+    monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service-key")
+    state = SimpleNamespace(requests=[], responses=[], sleeps=[], stored=[], lock=threading.Lock())
+
+    def handle(request):
+        if request.method == "GET":
+            file_id = request.url.params["source_file_id"].removeprefix("eq.")
+            return httpx.Response(200, json=[row for row in state.stored if row["source_file_id"] == file_id][:1])
+        body = request.content
+        if request.headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+        with state.lock:
+            state.requests.append((request, json.loads(body)))
+            status = state.responses.pop(0) if state.responses else 201
+        return httpx.Response(status, headers={"retry-after": "2"} if status == 429 else None)
+
+    monkeypatch.setattr(supabase_client, "_client", httpx.Client(transport=httpx.MockTransport(handle)))
+    monkeypatch.setattr(supabase_client, "_gzip_supported", True)
+    monkeypatch.setattr(supabase_client, "time", SimpleNamespace(sleep=state.sleeps.append))
+    return state
+
+
+def _rows(n, file_id="f1"):
+    return [{"source_file_id": file_id, "to_number": f"TO{i}", "status": "x"} for i in range(n)]
+
+
+def test_writes_every_batch_gzipped(server):
+    writer = SupabaseBulkWriter(batch_size=4, concurrency=2)
+    assert writer.write(iter(_rows(10))) == 10
+    assert sorted(len(rows) for _, rows in server.requests) == [2, 4, 4]
+    request, _ = server.requests[0]
+    assert request.headers["content-encoding"] == "gzip"
+    assert request.headers["prefer"] == "return=minimal"
+    assert "on_conflict" not in request.url.params
+
+
+def test_upsert_merges_on_key_and_dedupes_within_a_batch(server):
+    rows = _rows(3) + [{"source_file_id": "f1", "to_number": "TO0", "status": "latest"}]
+    writer = SupabaseBulkWriter(batch_size=10, mode="upsert")
+    assert writer.write(rows) == 3
+    request, sent = server.requests[0]
+    assert request.url.params["on_conflict"] == ",".join(supabase_client.UPSERT_KEY)
+    assert "resolution=merge-duplicates" in request.headers["prefer"]
+    assert {row["to_number"]: row["status"] for row in sent}["TO0"] == "latest"
+
+
+def test_throttled_batch_is_retried_with_retry_after(server):
+    server.responses = [429, 503]
+    writer = SupabaseBulkWriter(batch_size=10)
+    assert writer.write(_rows(2)) == 2
+    assert len(server.requests) == 3
+    assert server.sleeps[0] == 2.0
+    assert 1.0 <= server.sleeps[1] <= 1.5
+
+
+def test_insert_does_not_resend_after_a_gateway_timeout(server):
+    # The insert may already have been applied, so only upserts retry a 504.
+    server.responses = [504]
+    with pytest.raises(httpx.HTTPStatusError):
+        SupabaseBulkWriter(batch_size=10).write(_rows(2))
+    assert len(server.requests) == 1
+
+    server.responses = [504]
+    assert SupabaseBulkWriter(batch_size=10, mode="upsert").write(_rows(2)) == 2
+
+
+def test_gives_up_after_max_retries(server):
+    server.responses = [503] * 3
+    with pytest.raises(httpx.HTTPStatusError):
+        SupabaseBulkWriter(batch_size=10, max_retries=2).write(_rows(1))
+    assert len(server.sleeps) == 2
+
+
+def test_rejected_gzip_falls_back_to_plain_bodies(server):
+    server.responses = [415]
+    assert SupabaseBulkWriter(batch_size=10).write(_rows(2)) == 2
+    assert [r.headers.get("content-encoding") for r, _ in server.requests] == ["gzip", None]
+    assert supabase_client._gzip_supported is False
+
+
+def test_existing_import_date_reuses_the_earlier_partition(server):
+    server.stored = [{"source_file_id": "f1", "import_date": "2026-03-01"}]
+    assert supabase_client.existing_import_date("f1") == date(2026, 3, 1)
+    assert supabase_client.existing_import_date("f2") is None
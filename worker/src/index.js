@@ -25,23 +25,37 @@ export default {
       return json({ seatalk_challenge: challenge }, 200);
     }
 
-    const targetBase = (env.BOT_SERVER_URL || "").trim();
-    if (!targetBase) {
+    const targetBases = [env.BOT_SERVER_URL, ...(env.BOT_SERVER_FALLBACK_URLS || "").split(",")]
+      .map((value) => (value || "").trim())
+      .filter(Boolean);
+    if (targetBases.length === 0) {
       return json({ ok: true, warning: "BOT_SERVER_URL is not configured" }, 200);
     }
-    const targetUrl = new URL(targetBase);
-    if (targetUrl.host === url.host) {
-      return json(
-        {
-          ok: false,
-          error: "invalid_bot_server_url",
-          detail: "BOT_SERVER_URL points to this Worker host and would cause a forwarding loop.",
-        },
-        500
-      );
+    for (const targetBase of targetBases) {
+      if (new URL(targetBase).host === url.host) {
+        return json(
+          {
+            ok: false,
+            error: "invalid_bot_server_url",
+            detail: "BOT_SERVER_URL points to this Worker host and would cause a forwarding loop.",
+          },
+          500
+        );
+      }
+    }
+
+    const batchWindowMs = Number(env.BATCH_WINDOW_MS || 0);
+    if (batchWindowMs > 0) {
+      const result = await forwardBatched(body, targetBases, env, batchWindowMs);
+      if (result.status === 503) {
+        return new Response(JSON.stringify({ ok: false, error: "upstream_draining" }), {
+          status: 503,
+          headers: { "Content-Type": "application/json", "Retry-After": "1" },
+        });
+      }
+      return json(result.payload, result.status);
     }
 
-    const upstream = `${targetBase.replace(/\/$/, "")}/seatalk/callback`;
     const headers = new Headers({ "Content-Type": "application/json" });
 
     const signature = request.headers.get("Signature");
@@ -49,23 +63,108 @@ export default {
       headers.set("Signature", signature);
     }
 
-    try {
-      const response = await fetch(upstream, {
-        method: "POST",
-        headers,
-        body: JSON.stringify(body),
+    // A draining backend answers 503; try the next one, and if every backend is
+    // draining return 503 so SeaTalk redelivers the event later.
+    const upstream = await postWithFallback(targetBases, "/seatalk/callback", headers, JSON.stringify(body));
+    if (upstream.status === 503) {
+      return new Response(JSON.stringify({ ok: false, error: "upstream_draining" }), {
+        status: 503,
+        headers: { "Content-Type": "application/json", "Retry-After": "1" },
       });
+    }
+    if (upstream.error) {
+      return json({ ok: false, error: "upstream_unreachable", detail: upstream.error }, 502);
+    }
+    if (!upstream.response.ok) {
+      return json({ ok: false, error: "upstream_failed", status: upstream.status }, 502);
+    }
+    return json({ ok: true }, 200);
+  },
+};
 
-      if (!response.ok) {
-        return json({ ok: false, error: "upstream_failed", status: response.status }, 502);
+async function postWithFallback(targetBases, path, headers, payload) {
+  let lastStatus = 0;
+  let lastError = "";
+  for (const targetBase of targetBases) {
+    const upstream = `${targetBase.replace(/\/$/, "")}${path}`;
+    try {
+      const response = await fetch(upstream, { method: "POST", headers, body: payload });
+      if (response.status === 503) {
+        lastStatus = 503;
+        continue;
       }
-
-      return json({ ok: true }, 200);
+      return { response, status: response.status };
     } catch (err) {
-      return json({ ok: false, error: "upstream_unreachable", detail: String(err) }, 502);
+      lastError = String(err);
     }
-  },
-};
+  }
+  if (lastStatus === 503) {
+    return { status: 503 };
+  }
+  return { status: 0, error: lastError || "no backend reachable" };
+}
+
+// Events arriving within BATCH_WINDOW_MS in the same isolate are sent as one gzip'd
+// NDJSON request to /seatalk/callback/batch; each caller waits for its own result.
+let pendingBatch = null;
+
+function forwardBatched(body, targetBases, env, windowMs) {
+  const maxEvents = Number(env.BATCH_MAX_EVENTS || 100);
+  if (!pendingBatch) {
+    const batch = { events: [], waiters: [] };
+    batch.timer = setTimeout(() => flushBatch(batch, targetBases, env), windowMs);
+    pendingBatch = batch;
+  }
+  const batch = pendingBatch;
+  const result = new Promise((resolve) => batch.waiters.push(resolve));
+  batch.events.push(body);
+  if (batch.events.length >= maxEvents) {
+    clearTimeout(batch.timer);
+    flushBatch(batch, targetBases, env);
+  }
+  return result;
+}
+
+async function flushBatch(batch, targetBases, env) {
+  if (pendingBatch === batch) {
+    pendingBatch = null;
+  }
+  const resolveAll = (status, payload) => batch.waiters.forEach((resolve) => resolve({ status, payload }));
+  try {
+    const ndjson = batch.events.map((event) => JSON.stringify(event)).join("\n");
+    const compressed = await new Response(
+      new Blob([ndjson]).stream().pipeThrough(new CompressionStream("gzip"))
+    ).arrayBuffer();
+    const headers = new Headers({
+      "Content-Type": "application/x-ndjson",
+      "Content-Encoding": "gzip",
+    });
+    if (env.BATCH_TOKEN) {
+      headers.set("X-Batch-Token", env.BATCH_TOKEN);
+    }
+
+    const upstream = await postWithFallback(targetBases, "/seatalk/callback/batch", headers, compressed);
+    if (upstream.status === 503) {
+      resolveAll(503, { ok: false, error: "upstream_draining" });
+      return;
+    }
+    if (upstream.error) {
+      resolveAll(502, { ok: false, error: "upstream_unreachable", detail: upstream.error });
+      return;
+    }
+    if (!upstream.response.ok) {
+      resolveAll(502, { ok: false, error: "upstream_failed", status: upstream.status });
+      return;
+    }
+    const { results = [] } = await upstream.response.json();
+    batch.waiters.forEach((resolve, index) => {
+      const result = results[index] || {};
+      resolve({ status: 200, payload: { ok: true, status: result.status || "unknown" } });
+    });
+  } catch (err) {
+    resolveAll(502, { ok: false, error: "batch_failed", detail: String(err) });
+  }
+}
 
 function json(payload, status = 200) {
   return new Response(JSON.stringify(payload), {